@@ -18,6 +18,17 @@ class GPTModel(OpenAI):
                 "Please set the OPENAI_API_KEY environment variable")
         super().__init__(api_key=self.api_key)
 
+    def analyze(self, sqlquerries, queries_data) -> List[Dict]:
+        """
+        Анализирует новый набор запросов тем же клиентом (без повторного
+        создания подключения к API). Используется сервером main.py --serve.
+        """
+        self.sqlquerries = sqlquerries
+        self.queries_data = queries_data
+        self._parsed_queries = None
+        self.is_data_processed = False
+        return self.get_queries
+
     def _get_raw_gpt_output(self, sqlquerries) -> str:
         prompt = (f'''
                 Это входящие SQL запросы взятые из реального проекта:{sqlquerries}. Твоя задача определить их правильность 
@@ -27,24 +27,65 @@
 import ast
 import sys
 import os
+import re
 import difflib
+from collections import Counter
+from functools import lru_cache
 
+from line_index import LineIndex
 
-def get_absolute_position(file_text, lineno, col_offset):
+
+def get_absolute_position(file_text, lineno, col_offset, line_index=None):
     """
     Преобразовать (lineno, col_offset) в абсолютный индекс в тексте.
     lineno базируется на 1, col_offset — на 0.
+    line_index — готовый LineIndex для file_text (иначе строится на месте).
+    """
+    if line_index is None:
+        line_index = LineIndex(file_text)
+    return line_index.line_col_to_offset(lineno, col_offset)
+
+
+# Порог фаззи-сравнения слова с ключевым словом (SequenceMatcher.ratio() > 0.8)
+FUZZY_RATIO = 0.8
+
+
+@lru_cache(maxsize=None)
+def _keyword_buckets(keywords):
+    """Ключевые слова с их длиной и мультимножеством символов для быстрых оценок."""
+    return tuple((keyword, len(keyword), Counter(keyword)) for keyword in keywords)
+
+
+@lru_cache(maxsize=65536)
+def is_fuzzy_keyword(word, keywords):
+    """
+    Похоже ли слово на одно из ключевых слов: то же правило, что
+    difflib.SequenceMatcher(None, word, keyword).ratio() > 0.8, но дорогое
+    сравнение выполняется только для пар, прошедших оценки сверху по длине
+    и по общему набору символов. Результаты кэшируются на весь процесс.
     """
-    lines = file_text.splitlines(True)
-    if lineno <= 0 or lineno > len(lines):
-        return 0
-    return sum(len(lines[i]) for i in range(lineno - 1)) + col_offset
+    word_len = len(word)
+    word_chars = None
+    for keyword, keyword_len, keyword_chars in _keyword_buckets(keywords):
+        total = word_len + keyword_len
+        # ratio = 2*M/total, а M не больше длины более короткой строки
+        if 2.0 * min(word_len, keyword_len) / total <= FUZZY_RATIO:
+            continue
+        # M не больше числа общих символов (как SequenceMatcher.quick_ratio)
+        if word_chars is None:
+            word_chars = Counter(word)
+        common = sum(min(count, word_chars[char]) for char, count in keyword_chars.items())
+        if 2.0 * common / total <= FUZZY_RATIO:
+            continue
+        if difflib.SequenceMatcher(None, word, keyword).ratio() > FUZZY_RATIO:
+            return True
+    return False
 
 
 class SQLCallVisitor(ast.NodeVisitor):
     SQL_KEYWORDS = ("SELECT", "INSERT", "UPDATE", "DELETE", "CREATE", "DROP", "ALTER")
 
-    def __init__(self, file_content=""):
+    def __init__(self, file_content="", typo_index=None):
         super().__init__()
         # Словарь: имя_переменной -> список словарей {'text':..., 'start':..., 'end':...}
         self.sql_variables = {}
@@ -53,6 +94,10 @@ class SQLCallVisitor(ast.NodeVisitor):
 
         # Сырой текст файла для вычисления позиций
         self.file_content = file_content
+        self._line_index = None
+
+        # Необязательный KeywordTypoIndex для фаззи-проверки вместо difflib
+        self.typo_index = typo_index
 
 
     def visit_Assign(self, node):
@@ -98,15 +143,33 @@ class SQLCallVisitor(ast.NodeVisitor):
         for keyword in self.SQL_KEYWORDS:
             if keyword in upper_text:
                 return True
-        # Фаззи-проверка по отдельным словам
-        words = upper_text.split()
-        for keyword in self.SQL_KEYWORDS:
-            for word in words:
-                if difflib.SequenceMatcher(None, word, keyword).ratio() > 0.8:
+        # Фаззи-проверка по индексу опечаток (если передан)
+        if self.typo_index is not None:
+            for word in re.findall(r"\w+", upper_text):
+                match = self.typo_index.lookup(word)
+                if match is not None and match.keyword in self.SQL_KEYWORDS:
                     return True
+            return False
+        # Фаззи-проверка по отдельным словам
+        for word in set(upper_text.split()):
+            if is_fuzzy_keyword(word, self.SQL_KEYWORDS):
+                return True
         return False
 
 
+    @property
+    def line_index(self):
+        """Индекс строк для текущего file_content (строится один раз на файл)."""
+        if self._line_index is None or self._line_index.content is not self.file_content:
+            self._line_index = LineIndex(self.file_content)
+        return self._line_index
+
+
+    def _position(self, lineno, col_offset):
+        """Абсолютная позиция (lineno, col_offset) в текущем файле."""
+        return get_absolute_position(self.file_content, lineno, col_offset, self.line_index)
+
+
     def _get_func_full_name(self, func):
         """Собираем полное имя функции (например, 'conn.cursor.execute')."""
         if isinstance(func, ast.Name):
@@ -131,8 +194,8 @@ class SQLCallVisitor(ast.NodeVisitor):
         if isinstance(node, ast.Constant) and isinstance(node.value, str):
             return {
                 "text": node.value,
-                "start": get_absolute_position(self.file_content, node.lineno, node.col_offset),
-                "end": get_absolute_position(self.file_content, node.end_lineno, node.end_col_offset)
+                "start": self._position(node.lineno, node.col_offset),
+                "end": self._position(node.end_lineno, node.end_col_offset)
             }
         elif isinstance(node, ast.JoinedStr):
             # f-строка
@@ -144,8 +207,8 @@ class SQLCallVisitor(ast.NodeVisitor):
                     text_parts.append(val.value)
             return {
                 "text": "".join(text_parts),
-                "start": get_absolute_position(self.file_content, node.lineno, node.col_offset),
-                "end": get_absolute_position(self.file_content, node.end_lineno, node.end_col_offset)
+                "start": self._position(node.lineno, node.col_offset),
+                "end": self._position(node.end_lineno, node.end_col_offset)
             }
         elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
             # Конкатенация (string1 + string2)
@@ -1,37 +1,367 @@
 from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+import contextlib
+import time
 import torch
 from pathlib import Path
-from typing import Union, Optional
+from typing import Dict, List, Union, Optional
+
+from adaptive_decoding import (CONFIDENCE_THRESHOLD, ESCALATION_BEAMS, accept_greedy, adaptive_stats,
+                               output_limit, summarize)
+from correction_cache import CorrectionCache, normalize_query
+from length_batching import merge_padding_stats, padding_stats, plan_batches
+from prompt_lookup import accepted_prefix, find_draft, lookup_stats
+
+
+# Наибольшее число запросов в одном вызове generate в predict_batch
+DEFAULT_BATCH_SIZE = 16
+# Бюджет пакета predict_batch: строки, умноженные на длину самого длинного запроса (в токенах)
+DEFAULT_MAX_BATCH_TOKENS = 2048
+# Бэкенды генерации: PyTorch или ONNX Runtime (модель экспортируется через onnx_export.py)
+BACKENDS = ("torch", "onnx")
+# Точность вычислений бэкенда torch: int8 - динамическая квантизация Linear, bf16 - autocast
+PRECISIONS = ("fp32", "bf16", "int8")
+# Черновик prompt lookup: наибольшая длина и длина n-граммы, по которой он ищется во входе
+DRAFT_TOKENS = 10
+DRAFT_MAX_NGRAM = 3
+
+
+def bf16_supported(device: torch.device) -> bool:
+    """Поддерживает ли устройство вычисления в bfloat16 (на CPU - через oneDNN, AVX512-BF16/AMX)."""
+    if device.type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
 
 
 class SQLinterModel:
-    def __init__(self) -> None:
+    def __init__(self, use_cache: bool = True, cache_file: Optional[str] = None,
+                 backend: str = "torch", onnx_dir: Optional[str] = None,
+                 precision: str = "fp32") -> None:
+        """
+        Args:
+            use_cache: Кэшировать исправления (в памяти и на диске, см. correction_cache)
+            cache_file: Путь к файлу кэша исправлений (по умолчанию в каталоге кэша sqlinter)
+            backend: "torch" или "onnx" (ONNX Runtime на CPU, нужен optimum[onnxruntime])
+            onnx_dir: Каталог экспортированной модели (по умолчанию sqlinter/model/onnx)
+            precision: "fp32", "bf16" (autocast; без поддержки bf16 процессором - fp32)
+                или "int8" (динамическая квантизация Linear, только CPU); только для torch
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Неизвестный бэкенд: {backend} (доступны: {', '.join(BACKENDS)})")
+        if precision not in PRECISIONS:
+            raise ValueError(f"Неизвестная точность: {precision} (доступны: {', '.join(PRECISIONS)})")
+        if backend != "torch" and precision != "fp32":
+            raise ValueError(f"Точность {precision} поддерживается только бэкендом torch")
         current_dir: Path = Path(__file__).parent
         self.model_path: Union[str, Path] = current_dir.parent / "model"
-        self.device: torch.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.backend: str = backend
         self.tokenizer: AutoTokenizer = AutoTokenizer.from_pretrained(self.model_path)
-        self.model: AutoModelForSeq2SeqLM = AutoModelForSeq2SeqLM.from_pretrained(self.model_path).to(self.device)
+        if backend == "onnx":
+            from onnx_export import default_onnx_dir, load_onnx_model
+            self.device: torch.device = torch.device("cpu")
+            self.model = load_onnx_model(onnx_dir or default_onnx_dir(self.model_path))
+        elif precision == "int8":
+            # Квантизованные ядра Linear есть только для CPU
+            self.device: torch.device = torch.device("cpu")
+            model = AutoModelForSeq2SeqLM.from_pretrained(self.model_path).eval()
+            self.model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            self.device: torch.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            self.model: AutoModelForSeq2SeqLM = AutoModelForSeq2SeqLM.from_pretrained(self.model_path).to(self.device)
+            if precision == "bf16" and not bf16_supported(self.device):
+                precision = "fp32"
+        # Фактическая точность (bf16 без поддержки устройством заменяется на fp32)
+        self.precision: str = precision
+        # Статистика паддинга последнего вызова predict_batch, с adaptive - по обоим проходам
+        # (см. length_batching.padding_stats)
+        self.batch_stats: Dict[str, float] = {}
+        # Накопленные счетчики декодирования с prompt lookup (см. prompt_lookup.lookup_stats)
+        self.lookup_stats: Dict[str, int] = lookup_stats()
+        # Накопленные счетчики адаптивного декодирования (см. adaptive_summary)
+        self.adaptive_stats: Dict[str, float] = adaptive_stats()
+        self.cache: Optional[CorrectionCache] = None
+        if use_cache:
+            # Лучевой поиск на разных бэкендах может расходиться в равных по весу гипотезах,
+            # поэтому исправления бэкендов (и режимов точности) хранятся раздельно
+            variant = backend if precision == "fp32" else f"{backend}:{precision}"
+            self.cache = CorrectionCache.for_checkpoint(
+                str(Path(self.model_path) / "model.safetensors"), variant, cache_file
+            )
+
+    def _inference(self):
+        """Контекст генерации: без градиентов, для bf16 - с autocast."""
+        stack = contextlib.ExitStack()
+        stack.enter_context(torch.inference_mode())
+        if self.precision == "bf16":
+            stack.enter_context(torch.autocast(self.device.type, dtype=torch.bfloat16))
+        return stack
+
+    @staticmethod
+    def _generation_params(max_length: Optional[int], num_beams: int = 5) -> dict:
+        """
+        Параметры generate; входят в ключ кэша исправлений.
+        max_new_tokens=None - предел выводится из длины запроса (см. _generate_kwargs).
+        """
+        return {"max_new_tokens": max_length, "num_beams": num_beams, "early_stopping": num_beams > 1}
+
+    @staticmethod
+    def _generate_kwargs(params: dict, input_lengths: List[int]) -> dict:
+        """Параметры вызова generate; предел пакета - предел самого длинного запроса в нем."""
+        if params["max_new_tokens"] is not None:
+            return params
+        return dict(params, max_new_tokens=output_limit(max(input_lengths)))
+
+    def adaptive_summary(self) -> dict:
+        """Доля запросов, принятых после жадного декодирования, и оценка сэкономленного времени."""
+        return summarize(self.adaptive_stats)
+
+    def predict(self, input_text: str, max_length: Optional[int] = None, num_beams: int = 5,
+                prompt_lookup: bool = False, adaptive: bool = False) -> str:
+        """
+        Исправляет запрос.
+
+        Args:
+            input_text: Запрос
+            max_length: Наибольшее число генерируемых токенов (None - по длине запроса)
+            num_beams: Ширина луча (1 - жадное декодирование)
+            prompt_lookup: Жадное декодирование с черновиками, скопированными из запроса
+                (результат совпадает с num_beams=1; num_beams игнорируется, только torch)
+            adaptive: Сначала жадное декодирование, лучевой поиск - только при низкой
+                уверенности (см. adaptive_decoding)
+        """
+        if adaptive:
+            return self.predict_batch([input_text], max_length=max_length, adaptive=True)[0]
+        params = self._generation_params(max_length, 1 if prompt_lookup else num_beams)
+        if self.cache is not None:
+            cached = self.cache.get(input_text, params)
+            if cached is not None:
+                return cached
+
+        if prompt_lookup:
+            result = self._prompt_lookup_decode(input_text, max_length)
+            if self.cache is not None:
+                self.cache.put(input_text, params, result)
+                self.cache.commit()
+            return result
 
-    def predict(self, input_text: str, max_length: int = 200) -> str:
         inputs: dict = self.tokenizer(input_text, return_tensors="pt").to(self.device)
-        outputs: torch.Tensor = self.model.generate(
-            inputs["input_ids"],
-            max_new_tokens=max_length,
-            pad_token_id=self.tokenizer.pad_token_id,
-            num_beams=5,
-            early_stopping=True
-        )
+        with self._inference():
+            outputs: torch.Tensor = self.model.generate(
+                inputs["input_ids"],
+                pad_token_id=self.tokenizer.pad_token_id,
+                **self._generate_kwargs(params, [inputs["input_ids"].shape[1]])
+            )
         # Декодируем результат
         result = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-        
-        # print("Исправленный SQL:", result)  # убираем отладочный вывод
-        
+
+        if self.cache is not None:
+            self.cache.put(input_text, params, result)
+            self.cache.commit()
         return result
 
+    def predict_batch(self, texts: List[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                      max_length: Optional[int] = None, max_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+                      num_beams: int = 5, prompt_lookup: bool = False, adaptive: bool = False,
+                      threshold: float = CONFIDENCE_THRESHOLD) -> List[str]:
+        """
+        Исправляет несколько запросов за несколько вызовов generate.
+        Запросы группируются по длине в токенах: пакет содержит не больше
+        batch_size запросов и не больше max_tokens токенов с учетом паддинга.
+
+        Исправления из кэша не пересчитываются, одинаковые запросы генерируются один раз.
+        num_beams=1 - жадное декодирование; с prompt_lookup запросы декодируются
+        по одному (см. predict). С adaptive лучевой поиск шириной ESCALATION_BEAMS
+        выполняется только для запросов, жадный результат которых не принят
+        (уверенность ниже threshold и исправление отличается от запроса).
+
+        Returns:
+            Исправленные запросы в порядке texts
+        """
+        if adaptive:
+            params = {"max_new_tokens": max_length, "adaptive": threshold, "num_beams": ESCALATION_BEAMS}
+        else:
+            params = self._generation_params(max_length, 1 if prompt_lookup else num_beams)
+        results: List[Optional[str]] = [None] * len(texts)
+        # Запросы без исправления в кэше: текст (нормализованный, если кэш включен) -> позиции
+        pending: Dict[str, List[int]] = {}
+        for index, text in enumerate(texts):
+            if self.cache is not None:
+                results[index] = self.cache.get(text, params)
+                if results[index] is not None:
+                    continue
+            key = normalize_query(text) if self.cache is not None else text
+            pending.setdefault(key, []).append(index)
+
+        unique = [texts[indices[0]] for indices in pending.values()]
+        if not unique:
+            corrections = []
+        elif adaptive:
+            corrections = self._adaptive_generate(unique, max_length, batch_size, max_tokens, threshold)
+        elif prompt_lookup:
+            corrections = [self._prompt_lookup_decode(text, max_length) for text in unique]
+        else:
+            corrections = self._generate_batch(unique, params, batch_size, max_tokens)
+        for indices, text, result in zip(pending.values(), unique, corrections):
+            for index in indices:
+                results[index] = result
+            if self.cache is not None:
+                self.cache.put(text, params, result)
+        if self.cache is not None:
+            self.cache.commit()
+        return results
+
+    def _adaptive_generate(self, texts: List[str], max_length: Optional[int], batch_size: int,
+                           max_tokens: int, threshold: float) -> List[str]:
+        """Жадное декодирование всех запросов и лучевой поиск для непринятых."""
+        started = time.perf_counter()
+        results, confidences = self._generate_batch(
+            texts, self._generation_params(max_length, 1), batch_size, max_tokens, with_scores=True
+        )
+        greedy_seconds = time.perf_counter() - started
+        pass_stats = [self.batch_stats]
+
+        escalated = [index for index, text in enumerate(texts)
+                     if not accept_greedy(text, results[index], confidences[index], threshold)]
+        started = time.perf_counter()
+        if escalated:
+            beams = self._generate_batch([texts[index] for index in escalated],
+                                         self._generation_params(max_length, ESCALATION_BEAMS),
+                                         batch_size, max_tokens)
+            for index, result in zip(escalated, beams):
+                results[index] = result
+            pass_stats.append(self.batch_stats)
+        beam_seconds = time.perf_counter() - started
+        # Паддинг обоих проходов, а не только лучевого поиска
+        self.batch_stats = merge_padding_stats(pass_stats)
+
+        stats = self.adaptive_stats
+        stats["queries"] += len(texts)
+        stats["accepted"] += len(texts) - len(escalated)
+        stats["escalated"] += len(escalated)
+        stats["greedy_seconds"] += greedy_seconds
+        stats["beam_seconds"] += beam_seconds
+        return results
+
+    def _sequence_confidence(self, outputs) -> List[float]:
+        """
+        Уверенность жадного результата: среднее геометрическое вероятностей
+        сгенерированных токенов до EOS включительно (паддинг после EOS не учитывается).
+        """
+        scores = self.model.compute_transition_scores(outputs.sequences, outputs.scores, normalize_logits=True)
+        # sequences начинается со стартового токена декодера, scores - с первого сгенерированного
+        tokens = outputs.sequences[:, 1:1 + scores.shape[1]]
+        is_eos = (tokens == self.model.config.eos_token_id).int()
+        valid = (is_eos.cumsum(dim=1) - is_eos) == 0
+        log_probs = (scores.float() * valid).sum(dim=1) / valid.sum(dim=1).clamp(min=1)
+        return log_probs.exp().tolist()
+
+    def _generate_batch(self, texts: List[str], params: dict, batch_size: int, max_tokens: int,
+                        with_scores: bool = False):
+        """
+        Генерация исправлений пакетами, сгруппированными по длине.
+
+        Returns:
+            Исправления в порядке texts, а с with_scores - пара (исправления, уверенности)
+        """
+        input_ids: List[List[int]] = self.tokenizer(list(texts))["input_ids"]
+        lengths = [len(ids) for ids in input_ids]
+        batches = plan_batches(lengths, max_tokens, batch_size)
+        self.batch_stats = padding_stats(lengths, batches)
+
+        results: List[str] = [""] * len(texts)
+        confidences: List[float] = [0.0] * len(texts)
+        for batch in batches:
+            inputs: dict = self.tokenizer.pad(
+                {"input_ids": [input_ids[i] for i in batch]}, padding=True, return_tensors="pt"
+            ).to(self.device)
+            with self._inference():
+                outputs = self.model.generate(
+                    inputs["input_ids"],
+                    # Маска нужна, чтобы паддинг коротких запросов не влиял на результат
+                    attention_mask=inputs["attention_mask"],
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    output_scores=with_scores,
+                    return_dict_in_generate=with_scores,
+                    **self._generate_kwargs(params, [lengths[i] for i in batch])
+                )
+                if with_scores:
+                    for index, confidence in zip(batch, self._sequence_confidence(outputs)):
+                        confidences[index] = confidence
+                    outputs = outputs.sequences
+            for index, result in zip(batch, self.tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                results[index] = result
+        if with_scores:
+            return results, confidences
+        return results
+
+    @staticmethod
+    def _crop_past(past, length: int):
+        """Обрезает кэш self-attention декодера до length позиций (кэш cross-attention не меняется)."""
+        if hasattr(past, "crop"):
+            past.crop(length)
+            return past
+        # Старый формат: по слою (self_k, self_v, cross_k, cross_v)
+        return tuple((layer[0][:, :, :length], layer[1][:, :, :length]) + tuple(layer[2:]) for layer in past)
+
+    def _prompt_lookup_decode(self, input_text: str, max_length: Optional[int],
+                              draft_tokens: int = DRAFT_TOKENS, max_ngram: int = DRAFT_MAX_NGRAM) -> str:
+        """
+        Жадное декодирование с черновиками из входа (как assisted generation, но
+        черновик берется из запроса, а не из вспомогательной модели). За проход
+        декодера проверяется весь черновик: принимается совпавший с argmax модели
+        префикс и следующий токен модели, поэтому результат совпадает с жадным.
+        """
+        if self.backend != "torch":
+            raise ValueError("prompt_lookup поддерживается только бэкендом torch")
+        inputs: dict = self.tokenizer(input_text, return_tensors="pt").to(self.device)
+        source: List[int] = inputs["input_ids"][0].tolist()
+        if max_length is None:
+            max_length = output_limit(len(source))
+        eos_token_id = self.model.config.eos_token_id
+        generated: List[int] = []
+        stats = self.lookup_stats
+
+        with self._inference():
+            encoder_outputs = self.model.get_encoder()(
+                input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"], return_dict=True
+            )
+            past = None
+            past_length = 0
+            last = self.model.config.decoder_start_token_id
+            while len(generated) < max_length:
+                # Черновик и токен модели за ним не должны превысить max_length
+                draft = find_draft(source, generated, max_ngram, min(draft_tokens, max_length - len(generated) - 1))
+                outputs = self.model(
+                    encoder_outputs=encoder_outputs,
+                    attention_mask=inputs["attention_mask"],
+                    decoder_input_ids=torch.tensor([[last] + draft], device=self.device),
+                    past_key_values=past,
+                    use_cache=True,
+                    return_dict=True,
+                )
+                predicted: List[int] = outputs.logits[0].argmax(-1).tolist()
+                accepted = accepted_prefix(draft, predicted)
+                new_tokens = draft[:accepted] + [predicted[accepted]]
+                stats["steps"] += 1
+                stats["drafted"] += len(draft)
+                stats["accepted"] += accepted
+
+                # В кэше остаются last и принятая часть черновика
+                past_length += 1 + accepted
+                past = self._crop_past(outputs.past_key_values, past_length)
+                if eos_token_id in new_tokens:
+                    generated.extend(new_tokens[:new_tokens.index(eos_token_id) + 1])
+                    break
+                generated.extend(new_tokens)
+                last = new_tokens[-1]
+
+        stats["tokens"] += len(generated)
+        return self.tokenizer.decode(generated, skip_special_tokens=True)
+
 if __name__ == "__main__":
-    current_dir: Path = Path(__file__).parent
-    model_path: Path = current_dir.parent / "model"
-    model: SQLinterModel = SQLinterModel(model_path)
+    model: SQLinterModel = SQLinterModel()
     
     while True:
         user_input: str = input("Введите SQL запрос (или 'exit' для выхода): ")
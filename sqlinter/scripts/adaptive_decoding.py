@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Адаптивная ширина луча для исправления запросов.
+Сначала запросы декодируются жадно с оценками токенов; результат
+принимается, если модель уверена в нем (среднее геометрическое вероятностей
+токенов не ниже порога) или если исправление совпадает с запросом.
+Лучевой поиск запускается только для остальных запросов. Предел длины
+исправления выводится из длины запроса: исправление почти всегда близко
+к нему по длине.
+"""
+
+from typing import Any, Dict, Optional
+
+from correction_cache import normalize_query
+
+
+# Порог уверенности жадного результата (среднее геометрическое вероятностей токенов)
+CONFIDENCE_THRESHOLD = 0.85
+# Ширина луча для запросов, не прошедших порог
+ESCALATION_BEAMS = 5
+# Предел длины исправления: длина запроса в токенах * RATIO + MARGIN
+OUTPUT_LENGTH_RATIO = 1.5
+OUTPUT_LENGTH_MARGIN = 16
+
+
+def output_limit(input_length: int) -> int:
+    """Наибольшее число генерируемых токенов для запроса длиной input_length токенов."""
+    return int(input_length * OUTPUT_LENGTH_RATIO) + OUTPUT_LENGTH_MARGIN
+
+
+def accept_greedy(query: str, correction: str, confidence: float,
+                  threshold: float = CONFIDENCE_THRESHOLD) -> bool:
+    """Принимается ли жадный результат без лучевого поиска."""
+    return confidence >= threshold or normalize_query(correction) == normalize_query(query)
+
+
+def adaptive_stats() -> Dict[str, float]:
+    """Пустые счетчики: запросы, принятые жадно, переданные лучевому поиску, время этапов."""
+    return {'queries': 0, 'accepted': 0, 'escalated': 0, 'greedy_seconds': 0.0, 'beam_seconds': 0.0}
+
+
+def summarize(stats: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Сводка адаптивного декодирования.
+
+    Экономия оценивается так: принятые жадно запросы обошлись бы в среднее
+    время лучевого поиска на запрос, а жадный проход по всем запросам -
+    дополнительные затраты. Пока лучевой поиск не запускался, оценки нет.
+    """
+    queries = stats['queries']
+    saved: Optional[float] = None
+    if stats['escalated']:
+        beam_per_query = stats['beam_seconds'] / stats['escalated']
+        saved = stats['accepted'] * beam_per_query - stats['greedy_seconds']
+    return {
+        'queries': queries,
+        'accepted': stats['accepted'],
+        'escalated': stats['escalated'],
+        'acceptance_rate': stats['accepted'] / queries if queries else 0.0,
+        'greedy_seconds': stats['greedy_seconds'],
+        'beam_seconds': stats['beam_seconds'],
+        'estimated_saved_seconds': saved,
+    }
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Двухуровневый кэш исправлений модели SQLinter: LRU в памяти и SQLite на диске.
+Ключ - нормализованный текст запроса (пробельные символы вне кавычек
+схлопываются), хеш весов модели (model.safetensors) и параметры генерации,
+поэтому после замены модели или параметров старые исправления не используются.
+Хеш весов запоминается в той же базе по (путь, размер, mtime) и пересчитывается
+только при изменении файла.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from detection_cache import file_digest
+from scan_cache import default_cache_dir
+
+
+CORRECTION_CACHE_FILE = 'corrections.sqlite'
+DEFAULT_MEMORY_SIZE = 4096
+
+# Строковые литералы SQL ('...' и "..." с удвоенными кавычками) и пробельные последовательности
+_LITERAL_OR_SPACE_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Схлопывает пробельные символы вне кавычек и обрезает их по краям."""
+    def replace(match):
+        token = match.group(0)
+        return token if token[0] in '\'"' else ' '
+    return _LITERAL_OR_SPACE_RE.sub(replace, text).strip()
+
+
+class CorrectionCache:
+    """
+    Кэш исправлений запросов.
+
+    get() ищет исправление сначала в памяти, затем на диске (найденное на
+    диске поднимается в память). Счетчики: memory_hits, disk_hits, misses.
+    """
+
+    def __init__(self, checkpoint: str, cache_file: Optional[str] = None,
+                 memory_size: int = DEFAULT_MEMORY_SIZE):
+        """
+        Args:
+            checkpoint: Хеш весов модели
+            cache_file: Путь к файлу SQLite (по умолчанию в default_cache_dir())
+            memory_size: Число исправлений в памяти
+        """
+        self.cache_file = cache_file or os.path.join(default_cache_dir(), CORRECTION_CACHE_FILE)
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+
+        self.checkpoint = checkpoint
+        self.memory_size = memory_size
+        self._memory: 'OrderedDict[str, str]' = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # Модель загружается в фоновом потоке, а используется в другом;
+        # одновременно кэшем пользуется только один поток
+        self._connection = sqlite3.connect(self.cache_file, check_same_thread=False)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS corrections (key TEXT PRIMARY KEY, correction TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL
+            );
+        """)
+
+    @classmethod
+    def for_checkpoint(cls, checkpoint_file: str, variant: str = '', cache_file: Optional[str] = None,
+                       memory_size: int = DEFAULT_MEMORY_SIZE) -> Optional['CorrectionCache']:
+        """
+        Кэш для файла весов модели.
+
+        Args:
+            checkpoint_file: Путь к model.safetensors
+            variant: Вариант вычислений (бэкенд, точность), входящий в ключ
+            cache_file, memory_size: См. __init__
+
+        Returns:
+            CorrectionCache или None, если файл весов не прочитать
+        """
+        cache = cls('', cache_file, memory_size)
+        digest = cache.checkpoint_digest(checkpoint_file)
+        if digest is None:
+            cache.close()
+            return None
+        cache.checkpoint = f"{digest}:{variant}" if variant else digest
+        return cache
+
+    def checkpoint_digest(self, file_path: str) -> Optional[str]:
+        """
+        SHA-256 файла весов. Хеш хранится в базе и пересчитывается (чтение
+        сотен мегабайт) только если изменились размер или mtime файла.
+        """
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        row = self._connection.execute(
+            "SELECT size, mtime_ns, sha256 FROM checkpoints WHERE path = ?", (path,)
+        ).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        digest = file_digest(path)
+        if digest is None:
+            return None
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, digest),
+            )
+        return digest
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_ratio(self) -> float:
+        """Доля запросов, исправление которых взято из кэша."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def key(self, text: str, params: Dict[str, Any]) -> str:
+        """Ключ записи: запрос, веса модели и параметры генерации."""
+        payload = json.dumps([self.checkpoint, params, normalize_query(text)],
+                             ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _remember(self, key: str, correction: str):
+        self._memory[key] = correction
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, text: str, params: Dict[str, Any]) -> Optional[str]:
+        """Исправление запроса или None, если его нет в кэше."""
+        key = self.key(text, params)
+        correction = self._memory.get(key)
+        if correction is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return correction
+        row = self._connection.execute(
+            "SELECT correction FROM corrections WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, row[0])
+        return row[0]
+
+    def put(self, text: str, params: Dict[str, Any], correction: str):
+        """Сохраняет исправление запроса."""
+        key = self.key(text, params)
+        self._remember(key, correction)
+        self._connection.execute(
+            "INSERT OR REPLACE INTO corrections (key, correction) VALUES (?, ?)", (key, correction)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_ratio': self.hit_ratio,
+        }
+
+    def commit(self):
+        """Записывает изменения на диск."""
+        self._connection.commit()
+
+    def close(self):
+        """Записывает изменения и закрывает базу."""
+        self._connection.commit()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Персистентный кэш подготовленного состояния детектора SQL.
+Сохраняет скомпилированные матчеры рядом с sql_typo_patterns.json, чтобы
+SQLSearcher не разбирал 300KB JSON и не строил лексикон при каждом запуске.
+Кэш привязан к хешу содержимого JSON и версии Python и пересобирается,
+если устарел.
+
+Запуск (сборка кэша заранее для всех бэкендов опечаток):
+    python detection_cache.py [путь_к_sql_typo_patterns.json]
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+from typing import Any, Callable, Dict, Optional
+
+
+# Увеличивать при изменении формата сохраняемого состояния
+CACHE_FORMAT_VERSION = 1
+CACHE_SUFFIX = '.cache.pickle'
+
+
+def default_cache_path(source_file: str, backend: str = '') -> str:
+    """
+    Путь к файлу кэша рядом с исходным JSON. У каждого бэкенда опечаток
+    свой файл (sql_typo_patterns.<backend>.cache.pickle), чтобы смена
+    бэкенда не затирала кэш другого.
+    """
+    base, _ = os.path.splitext(source_file)
+    return f"{base}.{backend}{CACHE_SUFFIX}" if backend else base + CACHE_SUFFIX
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> Optional[str]:
+    """SHA-256 содержимого файла (читается частями) или None, если файл не прочитать."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def cache_key(source_file: str, extra_key: str = '') -> Optional[Dict[str, Any]]:
+    """Ключ кэша: хеш JSON, версия Python, формат кэша и доп. ключ вызывающего."""
+    digest = file_digest(source_file)
+    if digest is None:
+        return None
+    return {
+        'format': CACHE_FORMAT_VERSION,
+        'source_sha256': digest,
+        'python': f"{sys.implementation.name}-{sys.version_info[0]}.{sys.version_info[1]}.{sys.version_info[2]}",
+        'extra': extra_key,
+    }
+
+
+def load_cached_state(cache_file: str, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Загружает состояние из кэша, если его ключ совпадает с ожидаемым."""
+    try:
+        with open(cache_file, 'rb') as f:
+            payload = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(payload, dict) or payload.get('key') != key:
+        return None
+    return payload.get('state')
+
+
+def save_cached_state(cache_file: str, key: Dict[str, Any], state: Dict[str, Any]) -> bool:
+    """Атомарно записывает состояние в кэш. Возвращает False при ошибке записи."""
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(cache_file))
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.detection-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump({'key': key, 'state': state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, cache_file)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+    except Exception:
+        # Каталог может быть только для чтения - тогда просто работаем без кэша
+        return False
+    return True
+
+
+def load_or_build(source_file: str, build: Callable[[], Dict[str, Any]], extra_key: str = '',
+                  cache_file: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Возвращает подготовленное состояние из кэша или строит и сохраняет его.
+
+    Args:
+        source_file: Исходный файл паттернов (по его хешу проверяется свежесть)
+        build: Функция, строящая состояние заново
+        extra_key: Дополнительная часть ключа (например, отпечаток ключевых слов)
+        cache_file: Путь к кэшу (по умолчанию рядом с source_file)
+
+    Returns:
+        Словарь с подготовленным состоянием
+    """
+    cache_file = cache_file or default_cache_path(source_file)
+    key = cache_key(source_file, extra_key)
+    if key is None:
+        return build()
+
+    state = load_cached_state(cache_file, key)
+    if state is not None:
+        return state
+
+    state = build()
+    save_cached_state(cache_file, key, state)
+    return state
+
+
+def main():
+    """Собирает кэш детектора для SQLSearcher (для каждого бэкенда опечаток)."""
+    from sql_searcher import TYPO_BACKENDS, SQLSearcher
+
+    if len(sys.argv) > 1:
+        typo_file = sys.argv[1]
+    else:
+        typo_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sql_typo_patterns.json')
+
+    for backend in TYPO_BACKENDS:
+        searcher = SQLSearcher(typo_file=typo_file, use_cache=False, typo_backend=backend)
+        cache_file = default_cache_path(typo_file, backend)
+        if save_cached_state(cache_file, cache_key(typo_file, searcher.detection_cache_key()),
+                             searcher.detection_state()):
+            print(f"[OK] Кэш детектора сохранен: {cache_file}")
+        else:
+            print(f"Не удалось сохранить кэш детектора: {cache_file}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
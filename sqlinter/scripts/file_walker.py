@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Обход дерева файлов для поиска SQL на основе os.scandir.
+Каталоги отсекаются до спуска в них: стандартные служебные каталоги
+(node_modules, .venv, .git, __pycache__, build...), пользовательский список
+исключений и правила .gitignore. Циклы символических ссылок и повторные
+пути к одному файлу (жесткие ссылки, ссылки на каталоги) отсекаются по inode.
+"""
+
+import os
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+
+# Каталоги, в которые поиск не спускается по умолчанию
+DEFAULT_EXCLUDES = (
+    '.git', '.hg', '.svn', 'node_modules', '.venv', 'venv', '__pycache__',
+    '.tox', '.nox', '.mypy_cache', '.pytest_cache', '.ruff_cache',
+    'build', 'dist', '*.egg-info',
+)
+
+
+class IgnoreRule(NamedTuple):
+    """Правило в стиле .gitignore, привязанное к каталогу, где оно задано."""
+    regex: 're.Pattern'
+    negate: bool       # Правило вида !pattern (возвращает исключенный путь)
+    dir_only: bool     # Правило вида pattern/ (только каталоги)
+    base: str          # Каталог правила относительно корня обхода ('' - корень)
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Переводит glob в стиле .gitignore (*, ?, [...], **) в регулярное выражение."""
+    result = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            result.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('/**', i) and i + 3 == len(pattern):
+            result.append('/.*')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            result.append('.*')
+            i += 2
+            continue
+        if char == '*':
+            result.append('[^/]*')
+        elif char == '?':
+            result.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                result.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                result.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif char == '\\' and i + 1 < len(pattern):
+            i += 1
+            result.append(re.escape(pattern[i]))
+        else:
+            result.append(re.escape(char))
+        i += 1
+    return ''.join(result)
+
+
+def parse_ignore_pattern(line: str, base: str = '') -> Optional[IgnoreRule]:
+    """
+    Разбирает строку .gitignore (или шаблон исключения).
+
+    Args:
+        line: Строка шаблона
+        base: Каталог, в котором задано правило (относительно корня обхода)
+
+    Returns:
+        IgnoreRule или None для пустых строк и комментариев
+    """
+    line = line.rstrip('\n').rstrip('\r')
+    # Хвостовые пробелы незначимы, если не экранированы
+    while line.endswith(' ') and not line.endswith('\\ '):
+        line = line[:-1]
+    if not line or line.startswith('#'):
+        return None
+
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+
+    # Шаблон со слешем в начале или середине привязан к каталогу правила,
+    # без слеша - совпадает с именем на любой глубине
+    anchored = '/' in line
+    line = line.lstrip('/')
+    regex = _glob_to_regex(line)
+    if not anchored:
+        regex = '(?:.*/)?' + regex
+    return IgnoreRule(re.compile(regex + r'\Z', re.DOTALL), negate, dir_only, base)
+
+
+def load_gitignore(directory: str, base: str) -> List[IgnoreRule]:
+    """Правила из .gitignore каталога (пустой список, если файла нет)."""
+    try:
+        with open(os.path.join(directory, '.gitignore'), 'r', encoding='utf-8', errors='ignore') as f:
+            lines = f.readlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        rule = parse_ignore_pattern(line, base)
+        if rule is not None:
+            rules.append(rule)
+    return rules
+
+
+def is_ignored(rules: Iterable[IgnoreRule], rel_path: str, is_dir: bool) -> bool:
+    """
+    Проверяет путь (относительно корня обхода, через '/') по правилам.
+    Как и в git, решает последнее совпавшее правило.
+    """
+    ignored = False
+    for rule in rules:
+        if rule.dir_only and not is_dir:
+            continue
+        if rule.base:
+            if not rel_path.startswith(rule.base + '/'):
+                continue
+            candidate = rel_path[len(rule.base) + 1:]
+        else:
+            candidate = rel_path
+        if rule.regex.match(candidate):
+            ignored = not rule.negate
+    return ignored
+
+
+class FileWalker:
+    """
+    Обходчик дерева файлов с отсечением каталогов до спуска.
+
+    После обхода доступны directories (пройденные каталоги) и статистика:
+    files (выдано файлов), skipped_dirs
+    (отсечено каталогов), skipped_files и skipped_bytes (подходящие по
+    расширению файлы, исключенные правилами или повторами по inode).
+    Размер содержимого отсеченных каталогов не считается - в них обход
+    не спускается.
+    """
+
+    def __init__(self, exclude: Iterable[str] = DEFAULT_EXCLUDES, use_gitignore: bool = True,
+                 extensions: Tuple[str, ...] = ('.py',), follow_symlinks: bool = False):
+        """
+        Args:
+            exclude: Шаблоны исключений в синтаксисе .gitignore (относительно корня обхода)
+            use_gitignore: Учитывать файлы .gitignore в обходимых каталогах
+            extensions: Расширения выдаваемых файлов
+            follow_symlinks: Спускаться в каталоги по символическим ссылкам (с защитой
+                от циклов); ссылки на файлы выдаются всегда, как в os.walk
+        """
+        self.exclude = tuple(exclude)
+        self.exclude_rules = [rule for rule in (parse_ignore_pattern(pattern) for pattern in self.exclude)
+                              if rule is not None]
+        self.use_gitignore = use_gitignore
+        self.extensions = tuple(extensions)
+        self.follow_symlinks = follow_symlinks
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Обнуляет статистику и список каталогов обхода."""
+        self.directories: List[str] = []
+        self.files = 0
+        self.skipped_dirs = 0
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+
+    def _skip_file(self, entry: os.DirEntry):
+        self.skipped_files += 1
+        try:
+            self.skipped_bytes += entry.stat().st_size
+        except OSError:
+            pass
+
+    def walk(self, root: str, recursive: bool = True) -> Iterator[str]:
+        """
+        Выдает пути подходящих файлов в порядке обхода в глубину: сначала
+        файлы каталога (по имени), затем содержимое подкаталогов (по имени).
+
+        Args:
+            root: Корневой каталог
+            recursive: Спускаться ли в подкаталоги
+        """
+        self.reset_stats()
+        seen_dirs = set()
+        seen_files = set()
+        try:
+            root_stat = os.stat(root)
+        except OSError:
+            return
+        seen_dirs.add((root_stat.st_dev, root_stat.st_ino))
+
+        base_rules = list(self.exclude_rules)
+        # Стек: (путь, путь относительно корня, устройство каталога, действующие правила)
+        stack = [(root, '', root_stat.st_dev, base_rules)]
+        while stack:
+            directory, rel_dir, device, rules = stack.pop()
+            self.directories.append(directory)
+            if self.use_gitignore:
+                own_rules = load_gitignore(directory, rel_dir)
+                if own_rules:
+                    rules = rules + own_rules
+            try:
+                with os.scandir(directory) as iterator:
+                    entries = sorted(iterator, key=lambda entry: entry.name)
+            except OSError:
+                continue
+
+            subdirs = []
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=self.follow_symlinks)
+                except OSError:
+                    continue
+
+                if is_dir:
+                    if not recursive:
+                        continue
+                    if is_ignored(rules, rel_path, True):
+                        self.skipped_dirs += 1
+                        continue
+                    try:
+                        stat = entry.stat(follow_symlinks=self.follow_symlinks)
+                    except OSError:
+                        continue
+                    key = (stat.st_dev, stat.st_ino)
+                    # Цикл символических ссылок или второй путь к тому же каталогу
+                    if key in seen_dirs:
+                        self.skipped_dirs += 1
+                        continue
+                    seen_dirs.add(key)
+                    subdirs.append((entry.path, rel_path, stat.st_dev, rules))
+                    continue
+
+                if not entry.name.endswith(self.extensions):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    if is_ignored(rules, rel_path, False):
+                        self._skip_file(entry)
+                        continue
+                    # Для обычных файлов inode известен из scandir без лишнего stat
+                    if entry.is_symlink():
+                        stat = entry.stat()
+                        key = (stat.st_dev, stat.st_ino)
+                    else:
+                        key = (device, entry.inode())
+                except OSError:
+                    continue
+                if key in seen_files:
+                    self._skip_file(entry)
+                    continue
+                seen_files.add(key)
+                self.files += 1
+                yield entry.path
+
+            stack.extend(reversed(subdirs))
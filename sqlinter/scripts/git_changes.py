@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Измененные файлы и строки по данным локального git.
+Используется режимами --changed-since <rev> и --staged поиска SQL:
+сканируются только затронутые изменением .py файлы, а при необходимости
+в отчет попадают только запросы, пересекающиеся с измененными строками.
+"""
+
+import os
+import re
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+from interval_index import IntervalIndex
+
+
+# Заголовок ханка в выводе git diff -U0: @@ -a[,b] +c[,d] @@
+_HUNK_RE = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+# Escape-последовательность в пути, заключенном git в кавычки: \ooo или \<символ>
+_QUOTED_ESCAPE_RE = re.compile(rb'\\([0-7]{3}|.)', re.DOTALL)
+_C_ESCAPES = {b'a': b'\a', b'b': b'\b', b't': b'\t', b'n': b'\n', b'v': b'\v', b'f': b'\f', b'r': b'\r'}
+
+
+class GitError(RuntimeError):
+    """Ошибка вызова git (не репозиторий, неизвестная ревизия и т.п.)."""
+
+
+def _run_git(repo_dir: str, args: List[str]) -> str:
+    try:
+        completed = subprocess.run(
+            ['git', '-C', repo_dir, '-c', 'core.quotePath=false'] + args,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False,
+        )
+    except OSError as error:
+        raise GitError(f"Не удалось запустить git: {error}") from error
+    if completed.returncode != 0:
+        raise GitError(completed.stderr.decode('utf-8', errors='replace').strip())
+    return completed.stdout.decode('utf-8', errors='surrogateescape')
+
+
+def repository_root(repo_dir: str) -> str:
+    """Корень рабочего дерева git, содержащего repo_dir."""
+    return _run_git(repo_dir, ['rev-parse', '--show-toplevel']).strip()
+
+
+def unquote_path(path: str) -> str:
+    """
+    Снимает кавычки, в которые git заключает пути с кавычками, табуляцией,
+    переводами строк и обратной косой чертой ("b/a\\tb.py"), даже при
+    core.quotePath=false. Байты в восьмеричной записи собираются обратно
+    в UTF-8. Пути без кавычек возвращаются как есть.
+    """
+    if len(path) < 2 or not (path.startswith('"') and path.endswith('"')):
+        return path
+
+    def replace(match):
+        escape = match.group(1)
+        if len(escape) == 3:
+            return bytes([int(escape, 8)])
+        return _C_ESCAPES.get(escape, escape)
+
+    raw = path[1:-1].encode('utf-8', errors='surrogateescape')
+    return _QUOTED_ESCAPE_RE.sub(replace, raw).decode('utf-8', errors='surrogateescape')
+
+
+def _diff_args(since: Optional[str], staged: bool) -> List[str]:
+    args = ['diff', '--no-color', '--no-ext-diff', '--diff-filter=ACMR']
+    if staged:
+        args.append('--cached')
+    if since:
+        args.append(since)
+    return args
+
+
+def changed_line_ranges(repo_dir: str, since: Optional[str] = None,
+                        staged: bool = False) -> Dict[str, Optional[List[Tuple[int, int]]]]:
+    """
+    Измененные .py файлы и диапазоны измененных строк в них.
+
+    Args:
+        repo_dir: Каталог внутри репозитория
+        since: Ревизия, с которой сравнивается рабочее дерево (или индекс при staged)
+        staged: Сравнивать индекс (git diff --cached) вместо рабочего дерева
+
+    Returns:
+        Словарь: абсолютный путь -> список диапазонов строк [начало, конец)
+        (1-based) или None, если новым считается весь файл (неотслеживаемые файлы)
+    """
+    root = repository_root(repo_dir)
+    output = _run_git(root, _diff_args(since, staged) + ['-U0', '--', '*.py'])
+
+    changes: Dict[str, Optional[List[Tuple[int, int]]]] = {}
+    current = None
+    in_header = False
+    for line in output.splitlines():
+        # Заголовок файла идет от 'diff --git' до первого ханка; строки
+        # содержимого тоже могут начинаться с '+++', поэтому смотрим только в заголовке
+        if line.startswith('diff --git '):
+            in_header = True
+            current = None
+            continue
+        if in_header and line.startswith('+++ '):
+            # Для путей с пробелами git добавляет в заголовок завершающую табуляцию
+            target = unquote_path(line[4:].rstrip('\t'))
+            current = None
+            if target.startswith('b/'):
+                current = os.path.join(root, target[2:])
+                changes.setdefault(current, [])
+            continue
+        if current is None:
+            continue
+        match = _HUNK_RE.match(line)
+        if match:
+            in_header = False
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            # Чистое удаление строк (count == 0) новых строк не добавляет
+            if count:
+                changes[current].append((start, start + count))
+
+    # Новые файлы, еще не добавленные в git, в режиме рабочего дерева изменены целиком
+    if not staged:
+        # -z: имена без кавычек, разделенные нулевым байтом
+        untracked = _run_git(root, ['ls-files', '-z', '--others', '--exclude-standard', '--', '*.py'])
+        for name in untracked.split('\0'):
+            if name:
+                changes[os.path.join(root, name)] = None
+    return changes
+
+
+def filter_changed_queries(queries: List[Dict], line_ranges: Optional[List[Tuple[int, int]]]) -> List[Dict]:
+    """
+    Оставляет запросы, строки которых пересекаются с измененными.
+
+    Args:
+        queries: Запросы, найденные в файле
+        line_ranges: Диапазоны измененных строк [начало, конец) или None (весь файл)
+    """
+    if line_ranges is None:
+        return queries
+    changed = IntervalIndex(line_ranges)
+    return [query for query in queries
+            if changed.overlaps(query['start_line'], query['end_line'] + 1)]
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Упорядоченный набор непересекающихся интервалов позиций в файле.
+Интервалы хранятся отсортированными по началу (два параллельных списка,
+поддерживаемых через bisect), поэтому проверка пересечения и точного
+совпадения выполняется за O(log n) вместо перебора всех найденных диапазонов.
+"""
+
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, Tuple
+
+
+class IntervalIndex:
+    """
+    Непересекающиеся интервалы [start, end] по абсолютным позициям.
+    Пересечение понимается так же, как в SQLSearcher:
+    start < other_end and end > other_start (касание концами не пересечение).
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int]] = ()):
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        for start, end in sorted(intervals):
+            self.add(start, end)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self._starts, self._ends)
+
+    def __contains__(self, interval: Tuple[int, int]) -> bool:
+        """Есть ли в индексе ровно такой интервал (start, end)."""
+        start, end = interval
+        i = bisect_left(self._starts, start)
+        while i < len(self._starts) and self._starts[i] == start:
+            if self._ends[i] == end:
+                return True
+            i += 1
+        return False
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Пересекается ли интервал [start, end] с каким-либо сохраненным."""
+        # Кандидаты - интервалы, начинающиеся раньше end; так как интервалы не
+        # пересекаются, их концы тоже упорядочены и достаточно проверить последний
+        i = bisect_left(self._starts, end)
+        return i > 0 and self._ends[i - 1] > start
+
+    def add(self, start: int, end: int) -> bool:
+        """
+        Добавляет интервал, если он не пересекается с уже сохраненными.
+
+        Returns:
+            True, если интервал добавлен; False, если он пересекается
+            с существующим или уже есть в индексе
+        """
+        if self.overlaps(start, end) or (start, end) in self:
+            return False
+        i = bisect_left(self._starts, start)
+        while i < len(self._starts) and self._starts[i] == start and self._ends[i] < end:
+            i += 1
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+        return True
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Индекс SQL ключевых слов для поиска опечаток методом симметричного удаления
+(SymSpell). Вместо перечисления опечаток заранее индекс хранит варианты
+ключевых слов с удаленными символами и для любого токена находит ближайшее
+ключевое слово в пределах расстояния редактирования 2.
+
+Замены на соседние клавиши стоят дешевле обычных, символы русской раскладки
+переводятся в латиницу до поиска (таблицы берутся из TypoGenerator).
+"""
+
+import re
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set
+
+from typo_generator import TypoGenerator
+
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# Стоимость правок во взвешенном расстоянии
+NEIGHBOR_SUBSTITUTION_COST = 0.5
+DOUBLED_CHAR_COST = 0.5
+EDIT_COST = 1.0
+
+
+class KeywordMatch(NamedTuple):
+    """Результат поиска ближайшего ключевого слова."""
+    keyword: str
+    distance: float          # Взвешенное расстояние (0 - точное совпадение)
+    edits: int               # Число правок (расстояние Дамерау-Левенштейна)
+    layout_switched: bool    # Токен набран (частично) в русской раскладке
+
+    @property
+    def is_typo(self) -> bool:
+        """True, если токен отличается от ключевого слова."""
+        return self.edits > 0 or self.layout_switched
+
+
+class KeywordTypoIndex:
+    """
+    Индекс симметричного удаления над TypoGenerator.sql_keywords.
+
+    Для каждого ключевого слова заранее строятся все варианты с удалением до
+    max_distance символов. Поиск генерирует удаления для токена и проверяет
+    только ключевые слова, у которых есть общий вариант, поэтому стоимость
+    запроса не зависит от размера словаря.
+    """
+
+    def __init__(self, keywords: Optional[Iterable[str]] = None, max_distance: int = 2,
+                 generator: Optional[TypoGenerator] = None, cache_size: int = 65536):
+        generator = generator or TypoGenerator()
+        self.max_distance = max_distance
+        self.sql_contexts: Dict[str, List[str]] = generator.sql_contexts
+        self.sql_keywords: FrozenSet[str] = frozenset(keywords or generator.sql_keywords)
+        # Индексируем и контекстные слова (ADD, MODIFY, TABLES...), чтобы
+        # правила совместной встречаемости работали и для них
+        context_words = {word for words in self.sql_contexts.values() for word in words}
+        self.keywords: FrozenSet[str] = self.sql_keywords | set(self.sql_contexts) | context_words
+        self.max_keyword_length = max(len(keyword) for keyword in self.keywords)
+
+        self.keyboard_neighbors: Dict[str, FrozenSet[str]] = {
+            key: frozenset(neighbors) for key, neighbors in generator.keyboard_neighbors.items()
+        }
+        # Обратная таблица: русская буква -> латинская клавиша
+        self._layout_table = {}
+        for latin, russian in generator.russian_layout.items():
+            self._layout_table[ord(russian)] = latin
+            self._layout_table[ord(russian.lower())] = latin
+
+        self.deletes: Dict[str, FrozenSet[str]] = self._build_deletes()
+        self.cache_size = cache_size
+        self._cache: Dict[str, Optional[KeywordMatch]] = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_cache'] = {}
+        return state
+
+    def _build_deletes(self) -> Dict[str, FrozenSet[str]]:
+        """Строит словарь: вариант с удаленными символами -> ключевые слова."""
+        deletes: Dict[str, Set[str]] = {}
+        for keyword in self.keywords:
+            for variant in self._delete_variants(keyword):
+                deletes.setdefault(variant, set()).add(keyword)
+        return {variant: frozenset(words) for variant, words in deletes.items()}
+
+    def _delete_variants(self, word: str) -> Set[str]:
+        """Все варианты слова с удалением от 0 до max_distance символов."""
+        variants = {word}
+        for count in range(1, min(self.max_distance, len(word) - 1) + 1):
+            for positions in combinations(range(len(word)), count):
+                variants.add(''.join(char for i, char in enumerate(word) if i not in positions))
+        return variants
+
+    def allowed_distance(self, keyword: str) -> float:
+        """Допустимое взвешенное расстояние для ключевого слова заданной длины."""
+        if len(keyword) <= 2:
+            return 0.5
+        if len(keyword) <= 4:
+            return 1.0
+        return float(self.max_distance)
+
+    def normalize(self, token: str) -> str:
+        """Верхний регистр и перевод русской раскладки в латинскую."""
+        return token.upper().translate(self._layout_table)
+
+    def weighted_distance(self, token: str, keyword: str) -> float:
+        """
+        Взвешенное расстояние Дамерау-Левенштейна (вариант OSA).
+        Замена на соседнюю клавишу и удвоение символа дешевле обычной правки.
+        """
+        rows, cols = len(token) + 1, len(keyword) + 1
+        prev_prev: List[float] = []
+        prev = [float(j) for j in range(cols)]
+        for i in range(1, rows):
+            current = [float(i)] + [0.0] * (cols - 1)
+            token_char = token[i - 1]
+            # Лишний символ в токене дешевле, если он повторяет предыдущий
+            extra_cost = DOUBLED_CHAR_COST if i > 1 and token[i - 2] == token_char else EDIT_COST
+            for j in range(1, cols):
+                keyword_char = keyword[j - 1]
+                if token_char == keyword_char:
+                    substitution = 0.0
+                elif token_char in self.keyboard_neighbors.get(keyword_char, ()):
+                    substitution = NEIGHBOR_SUBSTITUTION_COST
+                else:
+                    substitution = EDIT_COST
+                best = min(prev[j] + extra_cost, current[j - 1] + EDIT_COST, prev[j - 1] + substitution)
+                if (i > 1 and j > 1 and token_char == keyword[j - 2]
+                        and token[i - 2] == keyword_char):
+                    best = min(best, prev_prev[j - 2] + EDIT_COST)
+                current[j] = best
+            prev_prev, prev = prev, current
+        return prev[-1]
+
+    def edit_distance(self, token: str, keyword: str) -> int:
+        """Невзвешенное расстояние Дамерау-Левенштейна (вариант OSA)."""
+        rows, cols = len(token) + 1, len(keyword) + 1
+        prev_prev: List[int] = []
+        prev = list(range(cols))
+        for i in range(1, rows):
+            current = [i] + [0] * (cols - 1)
+            for j in range(1, cols):
+                cost = 0 if token[i - 1] == keyword[j - 1] else 1
+                best = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+                if (i > 1 and j > 1 and token[i - 1] == keyword[j - 2]
+                        and token[i - 2] == keyword[j - 1]):
+                    best = min(best, prev_prev[j - 2] + 1)
+                current[j] = best
+            prev_prev, prev = prev, current
+        return prev[-1]
+
+    def lookup(self, token: str) -> Optional[KeywordMatch]:
+        """
+        Находит ближайшее ключевое слово для токена.
+
+        Args:
+            token: Слово из текста (в любом регистре и раскладке)
+
+        Returns:
+            KeywordMatch или None, если подходящего ключевого слова нет
+        """
+        if token in self._cache:
+            return self._cache[token]
+        result = self._lookup(token)
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[token] = result
+        return result
+
+    def _lookup(self, token: str) -> Optional[KeywordMatch]:
+        normalized = self.normalize(token)
+        if len(normalized) > self.max_keyword_length + self.max_distance:
+            return None
+        layout_switched = normalized != token.upper()
+
+        if normalized in self.keywords:
+            return KeywordMatch(normalized, 0.0, 0, layout_switched)
+        if len(normalized) < 2:
+            return None
+
+        candidates: Set[str] = set()
+        for variant in self._delete_variants(normalized):
+            words = self.deletes.get(variant)
+            if words:
+                candidates.update(words)
+
+        best = None
+        for keyword in candidates:
+            if abs(len(keyword) - len(normalized)) > self.max_distance:
+                continue
+            edits = self.edit_distance(normalized, keyword)
+            if edits > self.max_distance:
+                continue
+            distance = self.weighted_distance(normalized, keyword)
+            if distance > self.allowed_distance(keyword):
+                continue
+            match = KeywordMatch(keyword, distance, edits, layout_switched)
+            # При равном расстоянии предпочитаем меньше правок, затем алфавит (детерминизм)
+            if best is None or (distance, edits, keyword) < (best.distance, best.edits, best.keyword):
+                best = match
+        return best
+
+    def find_typo(self, token: str) -> Optional[str]:
+        """Ключевое слово, опечаткой которого является токен, или None."""
+        match = self.lookup(token)
+        if match is not None and match.is_typo:
+            return match.keyword
+        return None
+
+    def matches(self, text: str) -> bool:
+        """
+        Проверяет текст на опечатки в SQL ключевых словах по тем же правилам,
+        что и паттерны sql_typo_patterns.json.
+
+        Args:
+            text: Очищенный текст строки
+
+        Returns:
+            True, если опечатка в команде встречается с ее контекстом
+            или найдены опечатки в 2+ разных ключевых словах
+        """
+        # (ключевое слово, это опечатка) для каждого распознанного токена
+        tokens = []
+        for token in _TOKEN_RE.findall(text):
+            match = self.lookup(token)
+            if match is not None:
+                tokens.append((match.keyword, match.is_typo))
+
+        # Контекстные правила: команда раньше контекстного слова, хотя бы одно с опечаткой
+        seen_main: Dict[str, bool] = {}
+        for keyword, is_typo in tokens:
+            for main_word, context_words in self.sql_contexts.items():
+                if keyword in context_words and main_word in seen_main:
+                    if is_typo or seen_main[main_word]:
+                        return True
+            if keyword in self.sql_contexts:
+                seen_main[keyword] = seen_main.get(keyword, False) or is_typo
+
+        # Словарные правила: опечатки в 2 или более разных ключевых словах
+        typo_keywords = {keyword for keyword, is_typo in tokens
+                         if is_typo and keyword in self.sql_keywords}
+        return len(typo_keywords) >= 2
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Формирование пакетов для генерации по длине входа.
+Запросы сортируются по числу токенов, и соседние по длине объединяются
+в пакет, пока пакет с паддингом до самого длинного запроса укладывается
+в бюджет токенов. Так короткие запросы не дополняются до длины больших
+CTE, и лучевой поиск не тратит вычисления на паддинг.
+"""
+
+from typing import Dict, Iterable, List, Sequence
+
+
+def plan_batches(lengths: Sequence[int], max_tokens: int, max_batch_size: int,
+                 sort_by_length: bool = True) -> List[List[int]]:
+    """
+    Разбивает входы на пакеты.
+
+    Args:
+        lengths: Длины входов в токенах
+        max_tokens: Бюджет пакета: число строк, умноженное на длину самого длинного входа
+        max_batch_size: Наибольшее число входов в пакете
+        sort_by_length: Группировать входы по длине (False - в исходном порядке)
+
+    Returns:
+        Пакеты индексов входов. Вход длиннее бюджета попадает в пакет один.
+    """
+    order = range(len(lengths))
+    if sort_by_length:
+        order = sorted(order, key=lambda i: lengths[i])
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    longest = 0
+    for index in order:
+        candidate = max(longest, lengths[index])
+        if batch and (len(batch) >= max_batch_size or (len(batch) + 1) * candidate > max_tokens):
+            batches.append(batch)
+            batch, candidate = [], lengths[index]
+        batch.append(index)
+        longest = candidate
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def padding_stats(lengths: Sequence[int], batches: Sequence[Sequence[int]]) -> Dict[str, float]:
+    """
+    Доля полезных токенов в пакетах.
+
+    Returns:
+        {'batches', 'tokens' (без паддинга), 'padded_tokens' (с паддингом),
+         'padding_efficiency' (tokens / padded_tokens)}
+    """
+    tokens = sum(lengths[i] for batch in batches for i in batch)
+    padded = sum(len(batch) * max(lengths[i] for i in batch) for batch in batches if batch)
+    return {
+        'batches': len(batches),
+        'tokens': tokens,
+        'padded_tokens': padded,
+        'padding_efficiency': tokens / padded if padded else 1.0,
+    }
+
+
+def merge_padding_stats(stats: Iterable[Dict[str, float]]) -> Dict[str, float]:
+    """Суммарная статистика нескольких проходов генерации (см. padding_stats)."""
+    merged = {'batches': 0, 'tokens': 0, 'padded_tokens': 0}
+    for item in stats:
+        for key in merged:
+            merged[key] += item[key]
+    padded = merged['padded_tokens']
+    merged['padding_efficiency'] = merged['tokens'] / padded if padded else 1.0
+    return merged
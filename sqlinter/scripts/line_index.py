@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Индекс начал строк файла для быстрых преобразований позиций.
+Строится один раз на файл (массив префиксных сумм длин строк) и переводит
+абсолютную позицию в (строка, колонка) и обратно бинарным поиском,
+вместо content.split('\\n') и линейного суммирования на каждый запрос.
+"""
+
+from bisect import bisect_right
+from typing import List, Tuple
+
+
+class LineIndex:
+    """
+    Смещения начал строк в тексте (строки разделяются символом '\\n').
+    Номера строк начинаются с 1, колонки - с 0, как в ast.
+    """
+
+    def __init__(self, content: str):
+        self.content = content
+        # line_starts[i] - абсолютная позиция первого символа строки i + 1
+        starts = [0]
+        find = content.find
+        pos = find('\n')
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = find('\n', pos + 1)
+        self.line_starts: List[int] = starts
+
+    @property
+    def line_count(self) -> int:
+        """Количество строк (как len(content.split('\\n')))."""
+        return len(self.line_starts)
+
+    def line_start(self, line: int) -> int:
+        """Абсолютная позиция начала строки (1-based)."""
+        return self.line_starts[line - 1]
+
+    def line_end(self, line: int) -> int:
+        """Абсолютная позиция конца строки (позиция '\\n' или конец текста)."""
+        if line < self.line_count:
+            return self.line_starts[line] - 1
+        return len(self.content)
+
+    def line_text(self, line: int) -> str:
+        """Содержимое строки без '\\n' (1-based)."""
+        return self.content[self.line_start(line):self.line_end(line)]
+
+    def offset_to_line_col(self, pos: int) -> Tuple[int, int]:
+        """
+        Преобразует абсолютную позицию в (строка, колонка).
+        Позиция символа '\\n' относится к строке, которую он завершает.
+        """
+        line_idx = max(bisect_right(self.line_starts, pos) - 1, 0)
+        return line_idx + 1, pos - self.line_starts[line_idx]
+
+    def line_col_to_offset(self, line: int, column: int) -> int:
+        """
+        Преобразует номер строки (1-based) и колонку (0-based) в абсолютную позицию.
+        Для несуществующей строки возвращает 0.
+        """
+        if line <= 0 or line > len(self.line_starts):
+            return 0
+        return self.line_starts[line - 1] + column
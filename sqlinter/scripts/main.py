@@ -1,10 +1,17 @@
-from GPT_model import GPTModel
 import os
 import json
 import sys
-from SQLinterModel import SQLinterModel
+from typing import TYPE_CHECKING
 from sql_searcher import SQLSearcher
 import locale
+import threading
+import time
+
+# openai, torch и transformers импортируются только при первом использовании
+# (load_sqlinter_model, create_gpt), чтобы этап извлечения запросов не ждал их загрузки
+if TYPE_CHECKING:
+    from GPT_model import GPTModel
+    from SQLinterModel import SQLinterModel
 
 # Настройка кодировки для корректного вывода
 if sys.platform == "win32":
@@ -12,6 +19,9 @@ if sys.platform == "win32":
     sys.stdout.reconfigure(encoding='utf-8')
     sys.stderr.reconfigure(encoding='utf-8')
 
+# Этапы обработки: извлечение запросов, вердикты GPT, исправления моделью SQLinter
+STAGES = ("extract", "gpt", "sqlinter")
+
 query_data_template = {
     "id": 0,
     "query": "",
@@ -23,21 +33,108 @@ query_data_template = {
 }
 
 
+def parse_stages(value):
+    """Разбирает список этапов вида "extract,gpt" (извлечение выполняется всегда)."""
+    stages = {stage.strip() for stage in value.split(",") if stage.strip()}
+    unknown = stages - set(STAGES)
+    if unknown:
+        raise ValueError(f"Неизвестные этапы: {', '.join(sorted(unknown))}")
+    stages.add("extract")
+    return tuple(stage for stage in STAGES if stage in stages)
+
+
+def load_sqlinter_model():
+    """
+    Загружает модель SQLinter (импорт torch и transformers происходит здесь).
+    Бэкенд генерации и точность задаются переменными окружения
+    SQLINTER_BACKEND (torch или onnx) и SQLINTER_PRECISION (fp32, bf16 или int8).
+    """
+    from SQLinterModel import SQLinterModel
+    return SQLinterModel(backend=os.getenv("SQLINTER_BACKEND", "torch"),
+                         precision=os.getenv("SQLINTER_PRECISION", "fp32"))
+
+
+def create_gpt(api_key, sqlquerries, queries_data):
+    """Создает клиент GPT (импорт openai происходит здесь)."""
+    from GPT_model import GPTModel
+    return GPTModel(api_key, sqlquerries, queries_data)
+
+
+class BackgroundTask:
+    """
+    Выполняет функцию в фоновом потоке сразу при создании (загрузка модели, этап анализа).
+    result() ждет завершения и возвращает результат (или пробрасывает ошибку функции).
+    """
+
+    def __init__(self, func, name="background-task"):
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(func,), name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self, func):
+        try:
+            self._result = func()
+        except BaseException as error:
+            self._error = error
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def failed(self):
+        return self.done() and self._error is not None
+
+    def result(self):
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
 class SQLQueryProcessor:
-    def __init__(self, filename, api_key):
+    def __init__(self, filename, api_key, sqlinter_model=None, sql_searcher=None, gpt=None,
+                 stages=STAGES, model_loader=None):
+        """
+        Args:
+            filename: Анализируемый файл
+            api_key: Ключ OpenAI
+            sqlinter_model, sql_searcher, gpt: Уже созданные модель, поисковик и
+                клиент GPT (сервер --serve переиспользует их между запросами)
+            stages: Выполняемые этапы из STAGES
+            model_loader: Уже запущенная фоновая загрузка модели (BackgroundTask)
+        """
         self.api_key: str = api_key
         self.operating_file: str = filename
-        self.sqlinter_model: SQLinterModel = SQLinterModel()
-        self.sql_searcher: SQLSearcher = None
-        self.gpt: GPTModel = None
+        self.stages: tuple = tuple(stages)
+        self._sqlinter_model: "SQLinterModel" = sqlinter_model
+        # Модель грузится в фоне с самого начала: извлечение запросов и запрос к GPT
+        # идут параллельно с загрузкой, а process_with_sqlinter ждет ее только при необходимости
+        self._model_loader: BackgroundTask = model_loader
+        # Длительность этапов в секундах (extract, gpt, sqlinter) и общее время анализа (total)
+        self.stage_timings: dict = {}
+        if self._sqlinter_model is None and self._model_loader is None and "sqlinter" in self.stages:
+            self._model_loader = BackgroundTask(load_sqlinter_model, name="sqlinter-model-loader")
+        self.sql_searcher: SQLSearcher = sql_searcher
+        self.gpt: "GPTModel" = gpt
         self.original_queries: list = None
         self.parsed_queries: list = None
         self.queries_data: list[dict] = []
         self.queries_count: int = None
 
+    @property
+    def sqlinter_model(self) -> "SQLinterModel":
+        """Модель SQLinter; если она еще загружается в фоне, ждет окончания загрузки."""
+        if self._sqlinter_model is None:
+            if self._model_loader is not None:
+                self._sqlinter_model = self._model_loader.result()
+            else:
+                self._sqlinter_model = load_sqlinter_model()
+        return self._sqlinter_model
+
     def extract_queries(self):
         """Extract SQL queries using sql_searcher"""
-        self.sql_searcher = SQLSearcher()
+        if self.sql_searcher is None:
+            self.sql_searcher = SQLSearcher()
         searcher_results = self.sql_searcher.find_sql_in_file(
             self.operating_file)
 
@@ -83,23 +180,66 @@ class SQLQueryProcessor:
 
     def process_with_gpt(self):
         """Process SQL queries using GPT model"""
-        self.gpt = GPTModel(
-            self.api_key, self.parsed_queries, self.queries_data)
-        self.queries_data = self.gpt.get_queries
+        if self.gpt is None:
+            self.gpt = create_gpt(
+                self.api_key, self.parsed_queries, self.queries_data)
+            self.queries_data = self.gpt.get_queries
+        else:
+            self.queries_data = self.gpt.analyze(self.parsed_queries, self.queries_data)
 
-    def process_with_sqlinter(self):
-        """Process SQL queries using SQLinter model"""
-        for i, query in enumerate(self.parsed_queries):
-            corrected_query = self.sqlinter_model.predict(query)
+    def correct_queries(self):
+        """Исправления запросов моделью SQLinter (queries_data не изменяется)"""
+        if not self.parsed_queries:
+            return []
+        # Лучевой поиск только для запросов, в жадном исправлении которых модель не уверена
+        return self.sqlinter_model.predict_batch(self.parsed_queries, adaptive=True)
+
+    def _merge_corrections(self, corrections):
+        for i, corrected_query in enumerate(corrections):
             self.queries_data[i].update({
                 "correction": corrected_query,
             })
 
+    def process_with_sqlinter(self):
+        """Process SQL queries using SQLinter model"""
+        self._merge_corrections(self.correct_queries())
+
+    def _timed(self, stage, func):
+        """Выполняет этап и записывает его длительность в stage_timings."""
+        started = time.perf_counter()
+        try:
+            return func()
+        finally:
+            self.stage_timings[stage] = time.perf_counter() - started
+
+    def analyze(self):
+        """Main processing pipeline, returns queries data"""
+        started = time.perf_counter()
+        self._timed("extract", self.extract_queries)
+        run_gpt = "gpt" in self.stages
+        run_sqlinter = "sqlinter" in self.stages
+        if run_gpt and run_sqlinter:
+            # GPT ждет ответа сети, SQLinter занят вычислениями - выполняем их одновременно.
+            # Модель пишет исправления в свой список, GPT - вердикты в queries_data;
+            # исправления добавляются после завершения обоих этапов
+            corrections = BackgroundTask(lambda: self._timed("sqlinter", self.correct_queries),
+                                         name="sqlinter-stage")
+            try:
+                self._timed("gpt", self.process_with_gpt)
+            finally:
+                # Даже при ошибке GPT дожидаемся модели: она не должна работать после выхода
+                corrected = corrections.result()
+            self._merge_corrections(corrected)
+        elif run_gpt:
+            self._timed("gpt", self.process_with_gpt)
+        elif run_sqlinter:
+            self._timed("sqlinter", self.process_with_sqlinter)
+        self.stage_timings["total"] = time.perf_counter() - started
+        return self.queries_data
+
     def process(self):
         """Main processing pipeline"""
-        self.extract_queries()
-        self.process_with_gpt()
-        self.process_with_sqlinter()
+        self.analyze()
 
         # Убеждаемся, что вывод в UTF-8
         json_output = json.dumps(
@@ -107,11 +247,195 @@ class SQLQueryProcessor:
         return json_output
 
 
+# Коды ошибок JSON-RPC 2.0
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+ANALYSIS_ERROR = -32000
+
+
+class AnalysisServer:
+    """
+    Долгоживущий сервер анализа (main.py --serve).
+    Принимает запросы JSON-RPC 2.0, по одному JSON-объекту на строку, и держит
+    модель SQLinter, SQLSearcher и клиентов OpenAI загруженными между запросами.
+
+    Методы:
+        analyze  {"file": путь, "api_key": ключ (необязательно),
+                  "stages": ["extract", "gpt", ...] (необязательно)} -> список запросов
+        ping     {} -> "pong"
+        shutdown {} -> null, сервер завершает работу
+    """
+
+    def __init__(self, api_key=None, load_model=load_sqlinter_model):
+        """
+        Args:
+            api_key: Ключ OpenAI по умолчанию (иначе из OPENAI_API_KEY)
+            load_model: Функция загрузки модели SQLinter
+        """
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.load_model = load_model
+        # Модель загружается в фоне с момента запуска; запросы без этапа sqlinter ее не ждут
+        self.model_loader = BackgroundTask(load_model, name="sqlinter-model-loader")
+        self.sql_searcher = SQLSearcher()
+        # Клиенты GPT по ключу API
+        self.gpt_clients = {}
+        # Модель и клиенты не потокобезопасны - анализ выполняется по одному
+        self.lock = threading.Lock()
+        self.running = True
+
+    def _gpt_client(self, api_key):
+        if api_key not in self.gpt_clients:
+            self.gpt_clients[api_key] = create_gpt(api_key, [], [])
+        return self.gpt_clients[api_key]
+
+    def analyze(self, file, api_key=None, stages=STAGES):
+        api_key = api_key or self.api_key
+        with self.lock:
+            if "sqlinter" in stages and self.model_loader.failed():
+                # Предыдущая загрузка не удалась - повторяем ее для этого запроса
+                self.model_loader = BackgroundTask(self.load_model, name="sqlinter-model-loader")
+            processor = SQLQueryProcessor(
+                filename=os.path.abspath(file), api_key=api_key,
+                sql_searcher=self.sql_searcher,
+                gpt=self._gpt_client(api_key) if "gpt" in stages else None,
+                stages=stages, model_loader=self.model_loader)
+            return processor.analyze()
+
+    def handle(self, request):
+        """Обрабатывает разобранный запрос и возвращает ответ (None для уведомлений)."""
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return self._error(None, INVALID_REQUEST, "Invalid Request")
+        response = self._dispatch(request.get("id"), request["method"], request.get("params") or {})
+        # На уведомления (запросы без id) не отвечают, даже ошибкой
+        if "id" not in request:
+            return None
+        return response
+
+    def _dispatch(self, request_id, method, params):
+        """Выполняет метод и возвращает ответ JSON-RPC (результат или ошибку)."""
+        if not isinstance(params, dict):
+            return self._error(request_id, INVALID_PARAMS, "params must be an object")
+
+        try:
+            if method == "analyze":
+                if "file" not in params:
+                    return self._error(request_id, INVALID_PARAMS, "file is required")
+                stages = params.get("stages", list(STAGES))
+                if not isinstance(stages, list) or not all(isinstance(stage, str) for stage in stages):
+                    return self._error(request_id, INVALID_PARAMS, "stages must be a list of strings")
+                try:
+                    stages = parse_stages(",".join(stages))
+                except ValueError as error:
+                    return self._error(request_id, INVALID_PARAMS, str(error))
+                result = self.analyze(params["file"], params.get("api_key"), stages)
+            elif method == "ping":
+                result = "pong"
+            elif method == "shutdown":
+                self.running = False
+                result = None
+            else:
+                return self._error(request_id, METHOD_NOT_FOUND, f"Method not found: {method}")
+        except Exception as error:
+            return self._error(request_id, ANALYSIS_ERROR, str(error))
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def handle_line(self, line):
+        """Обрабатывает одну строку протокола и возвращает строку ответа (или None)."""
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = self._error(None, PARSE_ERROR, "Parse error")
+        else:
+            response = self.handle(request)
+        if response is None:
+            return None
+        return json.dumps(response, ensure_ascii=False)
+
+    @staticmethod
+    def _error(request_id, code, message):
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+    def serve_stdio(self, stdin=None, stdout=None):
+        """Обслуживает запросы через stdin/stdout до shutdown или конца ввода."""
+        stdin = stdin or sys.stdin
+        stdout = stdout or sys.stdout
+        for line in stdin:
+            response = self.handle_line(line)
+            if response is not None:
+                stdout.write(response + "\n")
+                stdout.flush()
+            if not self.running:
+                break
+
+    def serve_tcp(self, port, host="127.0.0.1"):
+        """Обслуживает запросы через локальный TCP-сокет (по строке на запрос)."""
+        import socketserver
+        server_ref = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw_line in self.rfile:
+                    response = server_ref.handle_line(raw_line.decode("utf-8"))
+                    if response is not None:
+                        self.wfile.write((response + "\n").encode("utf-8"))
+                        self.wfile.flush()
+                    if not server_ref.running:
+                        threading.Thread(target=self.server.shutdown, daemon=True).start()
+                        break
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        with socketserver.ThreadingTCPServer((host, port), Handler) as tcp_server:
+            tcp_server.daemon_threads = True
+            print(f"SQLinter server listening on {host}:{tcp_server.server_address[1]}", file=sys.stderr)
+            tcp_server.serve_forever()
+
+
+def serve(argv):
+    """Запуск сервера: main.py --serve [--port N] [--api-key KEY]"""
+    api_key = argv[argv.index("--api-key") + 1] if "--api-key" in argv else None
+    server = AnalysisServer(api_key=api_key)
+    if "--port" in argv:
+        server.serve_tcp(int(argv[argv.index("--port") + 1]))
+        return
+    # stdout занят протоколом: случайный вывод библиотек уходит в stderr
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        server.serve_stdio(stdout=protocol_out)
+    finally:
+        sys.stdout = protocol_out
+
+
 def main():
-    file_path = os.path.abspath(sys.argv[1])
-    api_key = sys.argv[2]
-    processor = SQLQueryProcessor(filename=file_path, api_key=api_key)
+    if "--serve" in sys.argv:
+        serve(sys.argv[1:])
+        return
+    # main.py <файл> [<ключ>] [--stages extract[,gpt][,sqlinter]] [--timings]
+    args = sys.argv[1:]
+    stages = STAGES
+    show_timings = "--timings" in args
+    if show_timings:
+        args.remove("--timings")
+    if "--stages" in args:
+        index = args.index("--stages")
+        stages = parse_stages(args[index + 1])
+        del args[index:index + 2]
+    file_path = os.path.abspath(args[0])
+    api_key = args[1] if len(args) > 1 else None
+    processor = SQLQueryProcessor(filename=file_path, api_key=api_key, stages=stages)
     print(processor.process())
+    if show_timings:
+        # В stderr, чтобы не смешивать с JSON результата
+        timings = {stage: round(seconds, 3) for stage, seconds in processor.stage_timings.items()}
+        print(json.dumps(timings), file=sys.stderr)
+        if processor._sqlinter_model is not None:
+            # Доля запросов, исправленных без лучевого поиска, и сэкономленное время
+            print(json.dumps({"adaptive": processor.sqlinter_model.adaptive_summary()}), file=sys.stderr)
 
 
 if __name__ == "__main__":
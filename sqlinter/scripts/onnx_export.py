@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Экспорт модели SQLinter (T5) в ONNX для SQLinterModel(backend="onnx").
+Создаются графы кодировщика, декодера и декодера с кэшем past_key_values
+(задача text2text-generation-with-past), рядом сохраняются конфигурация
+и токенизатор. Генерация (в том числе лучевой поиск) выполняется через
+ONNX Runtime на CPU тем же generate, что и для PyTorch.
+
+Требуется пакет optimum[onnxruntime] (только для этого бэкенда).
+
+Запуск:
+    python onnx_export.py [каталог_модели] [каталог_onnx]
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Optional, Union
+
+
+ONNX_SUBDIR = "onnx"
+ONNX_TASK = "text2text-generation-with-past"
+ENCODER_FILE = "encoder_model.onnx"
+
+
+def default_model_dir() -> Path:
+    """Каталог модели SQLinter (sqlinter/model)."""
+    return Path(__file__).parent.parent / "model"
+
+
+def default_onnx_dir(model_path: Union[str, Path, None] = None) -> Path:
+    """Каталог экспортированной модели: <каталог_модели>/onnx."""
+    return Path(model_path or default_model_dir()) / ONNX_SUBDIR
+
+
+def _require_optimum():
+    try:
+        import optimum.onnxruntime  # noqa: F401
+    except ImportError as error:
+        raise ImportError(
+            "Для backend=\"onnx\" нужен пакет optimum[onnxruntime]: pip install \"optimum[onnxruntime]\""
+        ) from error
+
+
+def export_onnx(model_path: Union[str, Path, None] = None,
+                output_dir: Union[str, Path, None] = None) -> Path:
+    """
+    Экспортирует модель в ONNX.
+
+    Args:
+        model_path: Каталог модели (по умолчанию sqlinter/model)
+        output_dir: Каталог для графов ONNX (по умолчанию <model_path>/onnx)
+
+    Returns:
+        Каталог с экспортированной моделью
+    """
+    _require_optimum()
+    from optimum.exporters.onnx import main_export
+
+    model_path = Path(model_path or default_model_dir())
+    output_dir = Path(output_dir or default_onnx_dir(model_path))
+    main_export(str(model_path), output=str(output_dir), task=ONNX_TASK, device="cpu")
+    return output_dir
+
+
+def load_onnx_model(onnx_dir: Union[str, Path]):
+    """
+    Загружает экспортированную модель для генерации на ONNX Runtime (CPU).
+
+    Raises:
+        FileNotFoundError: Модель еще не экспортирована
+    """
+    onnx_dir = Path(onnx_dir)
+    if not (onnx_dir / ENCODER_FILE).exists():
+        raise FileNotFoundError(
+            f"Модель ONNX не найдена в {onnx_dir}; выполните: python onnx_export.py"
+        )
+    _require_optimum()
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    return ORTModelForSeq2SeqLM.from_pretrained(str(onnx_dir), use_cache=True,
+                                                provider="CPUExecutionProvider")
+
+
+def main(argv: Optional[list] = None):
+    args = sys.argv[1:] if argv is None else argv
+    model_path = args[0] if args else None
+    output_dir = args[1] if len(args) > 1 else None
+    try:
+        exported = export_onnx(model_path, output_dir)
+    except ImportError as error:
+        print(error)
+        sys.exit(1)
+    files = sorted(name for name in os.listdir(exported) if name.endswith(".onnx"))
+    print(f"[OK] Модель экспортирована в {exported}: {', '.join(files)}")
+
+
+if __name__ == "__main__":
+    main()
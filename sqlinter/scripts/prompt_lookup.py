@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Черновики для спекулятивного декодирования копированием из входа (prompt lookup).
+Исправление запроса почти всегда повторяет вход с парой исправленных
+ключевых слов, поэтому продолжение сгенерированного текста ищется во входе:
+последние n токенов вывода находятся во входных токенах, и следующие за
+ними токены входа предлагаются модели как черновик. Модель проверяет весь
+черновик за один проход декодера (см. SQLinterModel.predict с prompt_lookup).
+"""
+
+from typing import Dict, List, Sequence
+
+
+def find_draft(source: Sequence[int], generated: Sequence[int], max_ngram: int = 3,
+               num_tokens: int = 10) -> List[int]:
+    """
+    Черновик продолжения, скопированный из входа.
+
+    Args:
+        source: Токены входа (запроса)
+        generated: Уже сгенерированные токены (без стартового токена декодера)
+        max_ngram: Наибольшая длина n-граммы, по которой ищется место во входе
+        num_tokens: Наибольшая длина черновика
+
+    Returns:
+        Токены черновика (пустой список, если совпадений нет)
+    """
+    if not generated:
+        # Исправление обычно начинается так же, как запрос
+        return list(source[:num_tokens])
+    for size in range(min(max_ngram, len(generated)), 0, -1):
+        ngram = list(generated[-size:])
+        first = ngram[0]
+        for start in range(len(source) - size):
+            if source[start] == first and list(source[start:start + size]) == ngram:
+                draft = list(source[start + size:start + size + num_tokens])
+                if draft:
+                    return draft
+    return []
+
+
+def accepted_prefix(draft: Sequence[int], predicted: Sequence[int]) -> int:
+    """
+    Длина принятой части черновика: predicted[i] - выбор модели после
+    префикса черновика длины i, черновик принимается до первого расхождения.
+    """
+    accepted = 0
+    while accepted < len(draft) and draft[accepted] == predicted[accepted]:
+        accepted += 1
+    return accepted
+
+
+def lookup_stats() -> Dict[str, int]:
+    """Пустые счетчики декодирования: шаги декодера, предложенные, принятые и выданные токены."""
+    return {'steps': 0, 'drafted': 0, 'accepted': 0, 'tokens': 0}
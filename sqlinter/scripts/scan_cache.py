@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Инкрементальный кэш результатов сканирования файлов (SQLite).
+Для каждого файла хранятся размер, mtime, SHA-256 содержимого и найденные
+SQL запросы. При повторном поиске по директории заново разбираются только
+изменившиеся файлы. Кэш привязан к отпечатку SQLSearcher (версия поиска,
+хеш файла паттернов, бэкенд опечаток) и очищается, если отпечаток изменился.
+Размер, mtime и хеш записываются для тех самых байтов, которые были
+разобраны (read_stamped), поэтому правка файла во время сканирования не
+выдает старые результаты за актуальные. После полного обхода каталога
+записи удаленных и переименованных файлов удаляются (prune).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from detection_cache import file_digest
+
+
+SCAN_CACHE_FILE = 'scan_cache.sqlite'
+
+
+def default_cache_dir() -> str:
+    """Каталог кэша: $XDG_CACHE_HOME/sqlinter или ~/.cache/sqlinter."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'sqlinter')
+
+
+class FileStamp(NamedTuple):
+    """Отметка версии файла, для которой сохраняются результаты."""
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+def read_stamped(file_path: str) -> Tuple[Optional[bytes], Optional[FileStamp]]:
+    """
+    Читает файл и возвращает (содержимое, отметка) или (None, None).
+
+    stat берется до чтения, а хеш считается по прочитанным байтам: если файл
+    изменят после stat, его новый mtime не совпадет с сохраненным, и при
+    следующем поиске сравнится хеш - результаты старого содержимого не
+    будут приняты за результаты нового.
+    """
+    try:
+        stat = os.stat(file_path)
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None, None
+    return data, FileStamp(stat.st_size, stat.st_mtime_ns, hashlib.sha256(data).hexdigest())
+
+
+class ScanCache:
+    """
+    Кэш найденных SQL запросов по файлам.
+
+    Запись считается актуальной, если совпадают размер и mtime файла;
+    если mtime изменился, а размер нет, сравнивается хеш содержимого
+    (например, после git checkout без реальных изменений).
+    """
+
+    def __init__(self, fingerprint: str, cache_file: Optional[str] = None):
+        """
+        Args:
+            fingerprint: Отпечаток SQLSearcher; при его изменении кэш сбрасывается
+            cache_file: Путь к файлу SQLite (по умолчанию в default_cache_dir())
+        """
+        self.cache_file = cache_file or os.path.join(default_cache_dir(), SCAN_CACHE_FILE)
+        directory = os.path.dirname(os.path.abspath(self.cache_file))
+        os.makedirs(directory, exist_ok=True)
+
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self._connection = sqlite3.connect(self.cache_file)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                queries TEXT NOT NULL
+            );
+        """)
+        self._check_fingerprint()
+
+    def _check_fingerprint(self):
+        """Очищает кэш, если он построен другой версией поиска или паттернов."""
+        row = self._connection.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if row is not None and row[0] == self.fingerprint:
+            return
+        with self._connection:
+            self._connection.execute("DELETE FROM files")
+            self._connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (self.fingerprint,)
+            )
+
+    @property
+    def hit_ratio(self) -> float:
+        """Доля файлов, результаты для которых взяты из кэша."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, file_path: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Возвращает сохраненные запросы файла или None, если файл изменился
+        или еще не сканировался.
+        """
+        path = os.path.abspath(file_path)
+        row = self._connection.execute(
+            "SELECT size, mtime_ns, sha256, queries FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        result = None
+        if row is not None:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+            if stat is not None and stat.st_size == row[0]:
+                if stat.st_mtime_ns == row[1]:
+                    result = json.loads(row[3])
+                elif file_digest(path) == row[2]:
+                    # Содержимое не изменилось - обновляем только mtime
+                    self._connection.execute(
+                        "UPDATE files SET mtime_ns = ? WHERE path = ?", (stat.st_mtime_ns, path)
+                    )
+                    result = json.loads(row[3])
+
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, file_path: str, queries: List[Dict[str, Any]], stamp: Optional[FileStamp]):
+        """
+        Сохраняет найденные в файле запросы.
+
+        Args:
+            file_path: Путь к файлу
+            queries: Запросы, найденные в разобранном содержимом
+            stamp: Отметка разобранного содержимого (read_stamped); None - не сохранять
+        """
+        if stamp is None:
+            return
+        self._connection.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256, queries) VALUES (?, ?, ?, ?, ?)",
+            (os.path.abspath(file_path), stamp.size, stamp.mtime_ns, stamp.sha256,
+             json.dumps(queries, ensure_ascii=False)),
+        )
+
+    def prune(self, root: str, visited: Iterable[str], recursive: bool = True) -> int:
+        """
+        Удаляет записи файлов под root, которых не было в завершенном обходе
+        (удаленные, переименованные, исключенные правилами).
+
+        Args:
+            root: Корень обхода
+            visited: Абсолютные пути файлов, выданных обходом
+            recursive: Был ли обход рекурсивным (иначе затрагиваются только файлы самого root)
+
+        Returns:
+            Число удаленных записей
+        """
+        root = os.path.abspath(root)
+        prefix = os.path.join(root, '')
+        visited = set(visited)
+        rows = self._connection.execute(
+            "SELECT path FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+        ).fetchall()
+        stale = [(path,) for (path,) in rows
+                 if path not in visited and (recursive or os.path.dirname(path) == root)]
+        self._connection.executemany("DELETE FROM files WHERE path = ?", stale)
+        return len(stale)
+
+    def commit(self):
+        """Записывает изменения на диск."""
+        self._connection.commit()
+
+    def close(self):
+        """Записывает изменения и закрывает базу."""
+        self._connection.commit()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
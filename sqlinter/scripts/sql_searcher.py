@@ -7,17 +7,85 @@
 """
 
 import ast
+import io
 import re
 import os
 import sys
 import json
-from typing import List, Dict, Any, Optional, Tuple
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from typo_matcher import TypoPatternMatcher
+from line_index import LineIndex
+from interval_index import IntervalIndex
+from string_literals import StringGroup, tokenize_string_groups
+from detection_cache import default_cache_path, file_digest, load_or_build
+from file_walker import DEFAULT_EXCLUDES, FileWalker
+
+# Модули режимов каталога, git, кэша и наблюдения (sqlite3, subprocess,
+# multiprocessing, ctypes) импортируются при использовании: поиск в одном
+# файле (main.py --stages extract) не должен платить за их загрузку
+if TYPE_CHECKING:
+    from scan_cache import FileStamp, ScanCache
+
+
+DEFAULT_TYPO_FILE = os.path.join(os.path.dirname(__file__), 'sql_typo_patterns.json')
+
+# Исходники, код и таблицы которых определяют сохраняемый матчер опечаток
+# каждого бэкенда: их хеш входит в ключ кэша детектора и в отпечаток кэша сканирования
+TYPO_BACKEND_SOURCES = {
+    backend: tuple(os.path.join(os.path.dirname(__file__), name) for name in names)
+    for backend, names in (
+        ('patterns', ('typo_matcher.py',)),
+        ('symspell', ('keyword_index.py', 'typo_generator.py')),
+    )
+}
+
+# Версия алгоритма поиска; увеличивать при изменении найденных запросов или их полей,
+# чтобы сбросить кэш сканирования (ScanCache)
+SEARCHER_VERSION = 1
+
+# Паттерны резервного лексера для строковых литералов.
+# Порядок важен: сначала более специфичные (тройные кавычки), потом обычные
+DIRECT_STRING_PATTERNS = [
+    re.compile(r'"""(.*?)"""', re.DOTALL),               # Тройные двойные кавычки
+    re.compile(r"'''(.*?)'''", re.DOTALL),               # Тройные одинарные кавычки
+    re.compile(r'"([^"\\]*(?:\\.[^"\\]*)*)"', re.DOTALL),  # Двойные кавычки
+    re.compile(r"'([^'\\]*(?:\\.[^'\\]*)*)'", re.DOTALL),  # Одинарные кавычки
+]
+
+# Бэкенды обнаружения опечаток: паттерны из JSON или индекс симметричного удаления
+TYPO_BACKENDS = ('patterns', 'symspell')
+
+# Параметры пакетов файлов для параллельного поиска: мелкие файлы собираются
+# в пакет, пока он не наберет CHUNK_BYTES байт или CHUNK_FILES файлов
+CHUNK_BYTES = 256 * 1024
+CHUNK_FILES = 64
+# Сколько пакетов на процесс держать в работе одновременно
+PENDING_CHUNKS_PER_WORKER = 2
+
+# Экземпляр SQLSearcher процесса-обработчика (создается один раз в _init_worker)
+_worker_searcher = None
 
 
 class SQLSearcher:
     """Класс для поиска SQL запросов в Python файлах."""
     
-    def __init__(self):
+    def __init__(self, typo_file: Optional[str] = None, use_cache: bool = True, typo_backend: str = 'patterns'):
+        """
+        Args:
+            typo_file: Путь к файлу паттернов опечаток (по умолчанию sql_typo_patterns.json)
+            use_cache: Загружать подготовленные матчеры из кэша рядом с файлом паттернов
+            typo_backend: 'patterns' - паттерны из JSON, 'symspell' - индекс KeywordTypoIndex
+        """
+        if typo_backend not in TYPO_BACKENDS:
+            raise ValueError(f"Неизвестный бэкенд опечаток: {typo_backend}")
+        self.typo_file = typo_file or DEFAULT_TYPO_FILE
+        self.typo_backend = typo_backend
+        self.use_cache = use_cache
+        # Индекс строк текущего файла (общий для всех преобразований позиций)
+        self._line_index: Optional[LineIndex] = None
+        self._typo_patterns = None
+        
         # SQL ключевые слова для поиска
         self.sql_keywords = [
             'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP', 'ALTER',
@@ -36,22 +104,72 @@ class SQLSearcher:
             'UPPER', 'LOWER', 'TRIM', 'COALESCE', 'ISNULL', 'IFNULL'
         ]
         
+        # Скомпилированные паттерны и матчер опечаток берем из кэша,
+        # чтобы не разбирать JSON с опечатками при каждом запуске
+        if use_cache:
+            state = load_or_build(self.typo_file, self._build_detection_state, self.detection_cache_key(),
+                                  default_cache_path(self.typo_file, self.typo_backend))
+        else:
+            state = self._build_detection_state()
+        self.sql_pattern = state['sql_pattern']
+        self.strong_sql_pattern = state['strong_sql_pattern']
+        self.typo_matcher = state['typo_matcher']
+    
+    def _build_detection_state(self) -> Dict[str, Any]:
+        """Строит подготовленное состояние детектора (паттерны и матчер опечаток)."""
         # Создаем регулярное выражение для поиска SQL запросов
         # Ищем строки, которые содержат SQL ключевые слова
         keywords_pattern = '|'.join(self.sql_keywords)
-        self.sql_pattern = re.compile(
+        sql_pattern = re.compile(
             rf'\b(?:{keywords_pattern})\b',
             re.IGNORECASE | re.MULTILINE | re.DOTALL
         )
         
         # Паттерн для более точного определения SQL запросов
-        self.strong_sql_pattern = re.compile(
+        strong_sql_pattern = re.compile(
             r'\b(SELECT|INSERT|UPDATE|DELETE|CREATE|DROP|ALTER|WITH|SHOW|DESCRIBE|EXPLAIN)\b',
             re.IGNORECASE | re.MULTILINE | re.DOTALL
         )
         
-        # Загружаем расширенные паттерны опечаток
-        self.typo_patterns = self._load_typo_patterns()
+        # Матчер опечаток строится один раз, а не на каждый вызов is_sql_query
+        if self.typo_backend == 'symspell':
+            from keyword_index import KeywordTypoIndex
+            typo_matcher = KeywordTypoIndex()
+        else:
+            typo_matcher = TypoPatternMatcher(self.typo_patterns)
+        
+        return {
+            'sql_pattern': sql_pattern,
+            'strong_sql_pattern': strong_sql_pattern,
+            'typo_matcher': typo_matcher,
+        }
+    
+    def detection_state(self) -> Dict[str, Any]:
+        """Текущее подготовленное состояние детектора (для сохранения в кэш)."""
+        return {
+            'sql_pattern': self.sql_pattern,
+            'strong_sql_pattern': self.strong_sql_pattern,
+            'typo_matcher': self.typo_matcher,
+        }
+    
+    def detection_cache_key(self) -> str:
+        """Отпечаток настроек и исходников, от которых зависит состояние детектора."""
+        sources = ':'.join(str(file_digest(path)) for path in TYPO_BACKEND_SOURCES[self.typo_backend])
+        return f"{self.typo_backend}:{'|'.join(self.sql_keywords)}:{sources}"
+    
+    def scan_fingerprint(self) -> str:
+        """
+        Отпечаток для кэша сканирования: версия поиска, хеш паттернов и ключ
+        детектора (с хешем исходников матчера опечаток).
+        """
+        return f"{SEARCHER_VERSION}:{file_digest(self.typo_file)}:{self.detection_cache_key()}"
+    
+    @property
+    def typo_patterns(self) -> Dict:
+        """Расширенные паттерны опечаток (JSON загружается только при обращении)."""
+        if self._typo_patterns is None:
+            self._typo_patterns = self._load_typo_patterns()
+        return self._typo_patterns
     
     def is_sql_query(self, text: str) -> bool:
         """
@@ -108,7 +226,7 @@ class SQLSearcher:
     
     def _load_typo_patterns(self) -> Dict:
         """Загружает паттерны опечаток из JSON файла."""
-        typo_file = os.path.join(os.path.dirname(__file__), 'sql_typo_patterns.json')
+        typo_file = self.typo_file
         
         if not os.path.exists(typo_file):
             return {'context_patterns': {}, 'word_patterns': {}}
@@ -122,39 +240,13 @@ class SQLSearcher:
     
     def _check_advanced_typo_patterns(self, text: str) -> bool:
         """Проверяет текст на соответствие расширенным паттернам опечаток."""
-        if not self.typo_patterns:
-            return False
-        
-        # Проверяем контекстные паттерны (приоритет - они более точные)
-        context_patterns = self.typo_patterns.get('context_patterns', {})
-        for pattern_name, pattern_data in context_patterns.items():
-            pattern = pattern_data.get('pattern', '')
-            if pattern:
-                try:
-                    if re.search(pattern, text, re.IGNORECASE | re.MULTILINE | re.DOTALL):
-                        return True
-                except re.error:
-                    # Игнорируем некорректные паттерны
-                    continue
-        
-        # Проверяем словарные паттерны (менее строгие)
-        word_patterns = self.typo_patterns.get('word_patterns', {})
-        word_matches = 0
-        
-        for pattern_name, pattern_data in word_patterns.items():
-            pattern = pattern_data.get('pattern', '')
-            if pattern:
-                try:
-                    if re.search(pattern, text, re.IGNORECASE | re.MULTILINE | re.DOTALL):
-                        word_matches += 1
-                        # Если найдено 2 или более совпадений с разными словами, считаем SQL
-                        if word_matches >= 2:
-                            return True
-                except re.error:
-                    # Игнорируем некорректные паттерны
-                    continue
-        
-        return False
+        return self.typo_matcher.matches(text)
+    
+    def _get_line_index(self, content: str) -> LineIndex:
+        """Возвращает индекс строк для содержимого файла (строится один раз на файл)."""
+        if self._line_index is None or self._line_index.content is not content:
+            self._line_index = LineIndex(content)
+        return self._line_index
     
     def find_sql_in_file(self, file_path: str) -> List[Dict[str, Any]]:
         """
@@ -171,84 +263,94 @@ class SQLSearcher:
                 content = f.read()
         except Exception as e:
             return []
-        
-        # Используем комбинированный подход: AST + прямой поиск
+        return self.find_sql_in_content(content)
+    
+    def find_sql_in_file_stamped(self, file_path: str) -> Tuple[List[Dict[str, Any]], Optional["FileStamp"]]:
+        """
+        Как find_sql_in_file, но дополнительно возвращает отметку (размер, mtime,
+        SHA-256) именно разобранных байтов - для сохранения в ScanCache.
+        """
+        from scan_cache import read_stamped
+        
+        data, stamp = read_stamped(file_path)
+        if data is None:
+            return [], None
+        # Декодирование как при open(..., 'r'): с универсальными переводами строк
+        content = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', errors='ignore').read()
+        return self.find_sql_in_content(content), stamp
+    
+    def find_sql_in_content(self, content: str) -> List[Dict[str, Any]]:
+        """Находит все SQL запросы в исходном коде Python."""
+        line_index = self._get_line_index(content)
         sql_queries = []
-        found_positions = set()  # Чтобы избежать дублирования
         
-        # Сначала пробуем AST подход
-        try:
-            tree = ast.parse(content)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Str):
-                    self._process_string_node_improved(node, content, sql_queries, node.s, found_positions)
-                elif isinstance(node, ast.Constant) and isinstance(node.value, str):
-                    self._process_string_node_improved(node, content, sql_queries, node.value, found_positions)
-                elif isinstance(node, ast.JoinedStr):
-                    self._process_fstring_node_improved(node, content, sql_queries, found_positions)
-        except SyntaxError:
-            pass  # Продолжаем с резервным методом
-        
-        # Дополняем результаты прямым поиском (для случаев, которые AST мог пропустить)
-        self._direct_string_search(content, sql_queries, found_positions)
+        # Один проход tokenize: каждый строковый литерал рассматривается ровно один раз,
+        # поэтому дубликаты не возникают и отдельная дедупликация не нужна
+        groups, stopped_at = tokenize_string_groups(content, line_index)
+        for group in groups:
+            query = self._process_string_group(content, group)
+            if query is not None:
+                sql_queries.append(query)
+        
+        # Если файл не токенизируется до конца (незакрытая строка и т.п.),
+        # остаток разбираем резервным лексером на регулярных выражениях
+        if stopped_at is not None:
+            found_positions = IntervalIndex((query['start_pos'], query['end_pos']) for query in sql_queries)
+            self._direct_string_search(content, sql_queries, found_positions, search_from=stopped_at)
         
         return sql_queries
     
-    def _process_string_node_improved(self, node: ast.AST, content: str, sql_queries: List[Dict], string_value: str, found_positions: set):
-        """Улучшенная обработка строкового узла AST."""
-        if self.is_sql_query(string_value):
-            positions = self._find_string_positions_improved(content, string_value, node.lineno, node.col_offset)
-            for start_pos, end_pos in positions:
-                # Корректируем позиции для содержимого строки
-                content_start_pos, content_end_pos = self._get_string_content_positions(content, start_pos, end_pos, string_value)
-                pos_key = (content_start_pos, content_end_pos)
-                if pos_key not in found_positions:
-                    found_positions.add(pos_key)
-                    # Добавляем расширенную информацию о позициях
-                    line_info = self._get_line_column_info(content, content_start_pos, content_end_pos)
-                    
-                    sql_queries.append({
-                        'sql_query': string_value,
-                        'start_pos': content_start_pos,
-                        'end_pos': content_end_pos,
-                        'line': node.lineno,
-                        'column': node.col_offset,
-                        # Добавляем точную информацию о строке и колонке
-                        'start_line': line_info['start_line'],
-                        'start_column': line_info['start_column'],
-                        'end_line': line_info['end_line'], 
-                        'end_column': line_info['end_column'],
-                        'line_content': line_info['line_content']
-                    })
-    
-    def _process_fstring_node_improved(self, node: ast.JoinedStr, content: str, sql_queries: List[Dict], found_positions: set):
-        """Улучшенная обработка f-string узла AST."""
-        fstring_content = self._reconstruct_fstring(node)
-        
-        if fstring_content and self.is_sql_query(fstring_content):
-            positions = self._find_fstring_positions_improved(content, node.lineno, node.col_offset)
-            for start_pos, end_pos in positions:
-                # Для f-strings используем более точную коррекцию позиций
-                content_start_pos, content_end_pos = self._get_fstring_content_positions(content, start_pos, end_pos)
-                pos_key = (content_start_pos, content_end_pos)
-                if pos_key not in found_positions:
-                    found_positions.add(pos_key)
-                    # Добавляем расширенную информацию о позициях для f-strings
-                    line_info = self._get_line_column_info(content, content_start_pos, content_end_pos)
-                    
-                    sql_queries.append({
-                        'sql_query': fstring_content,
-                        'start_pos': content_start_pos,
-                        'end_pos': content_end_pos,
-                        'line': node.lineno,
-                        'column': node.col_offset,
-                        # Добавляем точную информацию о строке и колонке
-                        'start_line': line_info['start_line'],
-                        'start_column': line_info['start_column'],
-                        'end_line': line_info['end_line'], 
-                        'end_column': line_info['end_column'],
-                        'line_content': line_info['line_content']
-                    })
+    def _process_string_group(self, content: str, group: StringGroup) -> Optional[Dict[str, Any]]:
+        """Проверяет строковое выражение из tokenize и возвращает запись о SQL запросе."""
+        string_value = self._string_group_value(content, group)
+        if not string_value or not self.is_sql_query(string_value):
+            return None
+        
+        literal_line, literal_column = self._get_line_index(content).offset_to_line_col(group.start)
+        return self._make_query_record(
+            content, string_value, group.content_start, group.content_end - 1, literal_line, literal_column
+        )
+    
+    def _string_group_value(self, content: str, group: StringGroup) -> str:
+        """
+        Значение строкового выражения: для обычных строк без экранирования это
+        просто текст между кавычками, f-строки и строки с экранированием
+        разбираются через ast. Байтовые строки берутся как есть из исходника.
+        """
+        bodies = [content[part.content_start:part.content_end] for part in group.parts]
+        if any(part.is_bytes for part in group.parts):
+            return ''.join(bodies)
+        if not any(part.is_fstring or ('\\' in body and not part.is_raw)
+                   for part, body in zip(group.parts, bodies)):
+            return ''.join(bodies)
+        
+        try:
+            node = ast.parse('(' + content[group.start:group.end] + '\n)', mode='eval').body
+        except (SyntaxError, ValueError):
+            return ''.join(bodies)
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        if isinstance(node, ast.JoinedStr):
+            return self._reconstruct_fstring(node)
+        return ''.join(bodies)
+    
+    def _make_query_record(self, content: str, sql_query: str, start_pos: int, end_pos: int,
+                           line: int, column: int) -> Dict[str, Any]:
+        """Формирует запись о найденном SQL запросе с информацией о позициях."""
+        line_info = self._get_line_column_info(content, start_pos, end_pos)
+        return {
+            'sql_query': sql_query,
+            'start_pos': start_pos,
+            'end_pos': end_pos,
+            'line': line,
+            'column': column,
+            # Добавляем точную информацию о строке и колонке
+            'start_line': line_info['start_line'],
+            'start_column': line_info['start_column'],
+            'end_line': line_info['end_line'],
+            'end_column': line_info['end_column'],
+            'line_content': line_info['line_content']
+        }
     
     def _reconstruct_fstring(self, node: ast.JoinedStr) -> str:
         """Восстанавливает содержимое f-string из AST."""
@@ -270,136 +372,6 @@ class SQLSearcher:
                     parts.append("{variable}")
         return ''.join(parts)
     
-    def _find_string_positions(self, node: ast.AST, content: str, string_value: str) -> Tuple[Optional[int], Optional[int]]:
-        """Находит абсолютные позиции строки в файле."""
-        lines = content.split('\n')
-        
-        # Пытаемся найти точную позицию строки
-        if hasattr(node, 'lineno') and hasattr(node, 'col_offset'):
-            line_idx = node.lineno - 1
-            col_offset = node.col_offset
-            
-            if line_idx < len(lines):
-                # Вычисляем абсолютную позицию начала
-                start_pos = sum(len(line) + 1 for line in lines[:line_idx]) + col_offset
-                
-                # Ищем конец строки
-                line_content = lines[line_idx]
-                string_in_line = self._find_string_in_line(line_content, col_offset, string_value)
-                
-                if string_in_line:
-                    end_pos = start_pos + len(string_in_line) - 1
-                    return start_pos, end_pos
-        
-        return None, None
-    
-    def _find_fstring_positions(self, node: ast.JoinedStr, content: str) -> Tuple[Optional[int], Optional[int]]:
-        """Находит абсолютные позиции f-string в файле."""
-        lines = content.split('\n')
-        
-        if hasattr(node, 'lineno') and hasattr(node, 'col_offset'):
-            line_idx = node.lineno - 1
-            col_offset = node.col_offset
-            
-            if line_idx < len(lines):
-                # Вычисляем абсолютную позицию начала
-                start_pos = sum(len(line) + 1 for line in lines[:line_idx]) + col_offset
-                
-                # Для f-strings ищем от f" до закрывающей кавычки
-                line_content = lines[line_idx][col_offset:]
-                match = re.search(r'f["\'].*?["\']', line_content, re.DOTALL)
-                
-                if match:
-                    end_pos = start_pos + match.end() - 1
-                    return start_pos, end_pos
-        
-        return None, None
-    
-    def _find_string_in_line(self, line: str, col_offset: int, string_value: str) -> Optional[str]:
-        """Находит строку в строке кода."""
-        # Ищем строку, начинающуюся с кавычки
-        for quote in ['"', "'", '"""', "'''"]:
-            if line[col_offset:].startswith(quote):
-                # Ищем закрывающую кавычку
-                end_quote_pos = line.find(quote, col_offset + len(quote))
-                if end_quote_pos != -1:
-                    return line[col_offset:end_quote_pos + len(quote)]
-        
-        return None
-    
-    def _find_string_positions_improved(self, content: str, string_value: str, approx_line: int, approx_col: int) -> List[Tuple[int, int]]:
-        """Улучшенный поиск позиций строки в содержимом файла."""
-        positions = []
-        
-        # Экранируем специальные символы в строке для поиска  
-        escaped_value = re.escape(string_value)
-        
-        # Ищем строку в окрестности указанной позиции (более точный поиск)
-        lines = content.split('\n')
-        if approx_line - 1 < len(lines):
-            # Ищем в окрестности указанной строки
-            search_start = max(0, approx_line - 3)
-            search_end = min(len(lines), approx_line + 3)
-            
-            # Соединяем строки для поиска
-            search_lines = lines[search_start:search_end]
-            search_content = '\n'.join(search_lines)
-            
-            # Вычисляем смещение для корректировки позиций
-            offset = sum(len(lines[i]) + 1 for i in range(search_start))
-            
-            # Паттерны для поиска с разными типами кавычек
-            quote_patterns = [
-                rf'"""({escaped_value})"""',     # Тройные двойные кавычки
-                rf"'''({escaped_value})'''",     # Тройные одинарные кавычки  
-                rf'"({escaped_value})"',         # Двойные кавычки
-                rf"'({escaped_value})'",         # Одинарные кавычки
-            ]
-            
-            for pattern in quote_patterns:
-                for match in re.finditer(pattern, search_content, re.DOTALL):
-                    # Корректируем позиции с учетом смещения
-                    start_pos = offset + match.start()
-                    end_pos = offset + match.end() - 1
-                    positions.append((start_pos, end_pos))
-        
-        return positions
-    
-    def _find_fstring_positions_improved(self, content: str, approx_line: int, approx_col: int) -> List[Tuple[int, int]]:
-        """Улучшенный поиск позиций f-string в содержимом файла."""
-        positions = []
-        
-        # Паттерны для поиска различных типов f-strings
-        fstring_patterns = [
-            r"f'''(.*?)'''",    # f'''...'''
-            r'f"""(.*?)"""',    # f"""..."""
-            r"f'([^'\\]*(?:\\.[^'\\]*)*)'",    # f'...'
-            r'f"([^"\\]*(?:\\.[^"\\]*)*)"',    # f"..."
-        ]
-        
-        # Ищем в окрестности указанной позиции  
-        lines = content.split('\n')
-        if approx_line - 1 < len(lines):
-            # Берем контекст вокруг указанной строки
-            search_start = max(0, approx_line - 3)
-            search_end = min(len(lines), approx_line + 3)
-            
-            # Соединяем строки для поиска
-            search_lines = lines[search_start:search_end]
-            search_content = '\n'.join(search_lines)
-            
-            # Вычисляем смещение для корректировки позиций
-            offset = sum(len(lines[i]) + 1 for i in range(search_start))
-            
-            for pattern in fstring_patterns:
-                for match in re.finditer(pattern, search_content, re.DOTALL):
-                    # Корректируем позиции с учетом смещения
-                    start_pos = offset + match.start()
-                    end_pos = offset + match.end() - 1
-                    positions.append((start_pos, end_pos))
-        
-        return positions
-    
     def _get_string_content_positions(self, content: str, full_start: int, full_end: int, string_content: str) -> Tuple[int, int]:
         """
         Определяет позиции содержимого строки (без кавычек).
@@ -443,36 +415,14 @@ class SQLSearcher:
         Returns:
             Словарь с информацией о строке и колонке
         """
-        lines = content.split('\n')
-        
-        # Находим строку и колонку для начальной позиции
-        current_pos = 0
-        start_line = 1
-        start_column = 0
-        
-        for line_num, line in enumerate(lines, 1):
-            line_end = current_pos + len(line)
-            if start_pos <= line_end:
-                start_line = line_num
-                start_column = start_pos - current_pos
-                break
-            current_pos = line_end + 1  # +1 для символа \n
-        
-        # Находим строку и колонку для конечной позиции
-        current_pos = 0
-        end_line = 1
-        end_column = 0
-        
-        for line_num, line in enumerate(lines, 1):
-            line_end = current_pos + len(line)
-            if end_pos <= line_end:
-                end_line = line_num
-                end_column = end_pos - current_pos
-                break
-            current_pos = line_end + 1  # +1 для символа \n
+        line_index = self._get_line_index(content)
+        
+        # Находим строку и колонку для начальной и конечной позиции
+        start_line, start_column = self._offset_to_line_col(line_index, start_pos)
+        end_line, end_column = self._offset_to_line_col(line_index, end_pos)
         
         # Получаем содержимое строки для отладки
-        line_content = lines[start_line - 1] if start_line <= len(lines) else ""
+        line_content = line_index.line_text(start_line)
         
         return {
             'start_line': start_line,
@@ -481,164 +431,378 @@ class SQLSearcher:
             'end_column': end_column,
             'line_content': line_content,
             # Добавляем альтернативные позиции через line+column
-            'alt_start_pos': self._line_column_to_pos(content, start_line, start_column),
-            'alt_end_pos': self._line_column_to_pos(content, end_line, end_column)
+            'alt_start_pos': line_index.line_col_to_offset(start_line, start_column),
+            'alt_end_pos': line_index.line_col_to_offset(end_line, end_column)
         }
     
-    def _line_column_to_pos(self, content: str, line: int, column: int) -> int:
-        """
-        Преобразует номер строки и колонки в абсолютную позицию.
-        
-        Args:
-            content: Полное содержимое файла
-            line: Номер строки (1-based)
-            column: Номер колонки (0-based)
-            
-        Returns:
-            Абсолютная позиция в файле
-        """
-        lines = content.split('\n')
-        if line <= 0 or line > len(lines):
-            return 0
-        
-        # Суммируем длины всех предыдущих строк + символы \n
-        pos = sum(len(lines[i]) + 1 for i in range(line - 1))
-        pos += column
-        
-        return pos
+    def _offset_to_line_col(self, line_index: LineIndex, pos: int) -> Tuple[int, int]:
+        """Строка и колонка для позиции; для позиции за концом файла - (1, 0)."""
+        if pos > len(line_index.content):
+            return 1, 0
+        return line_index.offset_to_line_col(pos)
     
-    def _get_fstring_content_positions(self, content: str, full_start: int, full_end: int) -> Tuple[int, int]:
+    def _direct_string_search(self, content: str, sql_queries: List[Dict], found_positions: IntervalIndex, search_from: int = 0):
         """
-        Определяет позиции содержимого f-string (без f" и ").
+        Прямой поиск строковых литералов в тексте файла (резервный лексер для
+        файлов, которые не удалось токенизировать).
         
         Args:
             content: Полное содержимое файла
-            full_start: Начальная позиция f-string
-            full_end: Конечная позиция f-string
-            
-        Returns:
-            Tuple с позициями начала и конца содержимого f-string
+            sql_queries: Список, в который добавляются найденные запросы
+            found_positions: Уже найденные позиции содержимого (для дедупликации)
+            search_from: Позиция, с которой начинать поиск
         """
-        # Получаем полную f-string
-        full_fstring = content[full_start:full_end + 1]
-        
-        # Определяем тип кавычек и корректируем позиции
-        if full_fstring.startswith("f'''") or full_fstring.startswith('f"""'):
-            # f'''...''' или f"""..."""
-            content_start = full_start + 4  # f''' или f"""
-            content_end = full_end - 3      # ''' или """
-        elif full_fstring.startswith("f'") or full_fstring.startswith('f"'):
-            # f'...' или f"..."
-            content_start = full_start + 2  # f' или f"
-            content_end = full_end - 1      # ' или "
-        else:
-            # Если не удается определить, возвращаем исходные позиции
-            return full_start, full_end
-        
-        return content_start, content_end
-    
-    def _direct_string_search(self, content: str, sql_queries: List[Dict], found_positions: set):
-        """Прямой поиск строковых литералов в тексте файла."""
-        # Паттерны для поиска различных типов строковых литералов
-        # Порядок важен: сначала более специфичные (тройные кавычки), потом обычные
-        string_patterns = [
-            r'"""(.*?)"""',  # Тройные двойные кавычки
-            r"'''(.*?)'''",  # Тройные одинарные кавычки
-            r'"([^"\\]*(?:\\.[^"\\]*)*)"',  # Двойные кавычки
-            r"'([^'\\]*(?:\\.[^'\\]*)*)'",  # Одинарные кавычки
-        ]
+        line_index = self._get_line_index(content)
         
         # Отслеживаем уже обработанные диапазоны, чтобы избежать перекрытий
-        processed_ranges = []
+        # (включая уже найденные запросы)
+        processed_ranges = IntervalIndex((query['start_pos'], query['end_pos']) for query in sql_queries)
         
-        for pattern in string_patterns:
-            for match in re.finditer(pattern, content, re.DOTALL):
+        for pattern in DIRECT_STRING_PATTERNS:
+            for match in pattern.finditer(content, search_from):
                 start_pos = match.start()
                 end_pos = match.end() - 1
                 string_content = match.group(1)
                 
                 # Проверяем, не пересекается ли с уже обработанными диапазонами
-                is_overlapping = any(
-                    start_pos < proc_end and end_pos > proc_start 
-                    for proc_start, proc_end in processed_ranges
-                )
-                
-                if not is_overlapping and self.is_sql_query(string_content):
+                if not processed_ranges.overlaps(start_pos, end_pos) and self.is_sql_query(string_content):
                     # Корректируем позиции, чтобы они указывали на содержимое строки, а не на кавычки
                     content_start_pos, content_end_pos = self._get_string_content_positions(content, start_pos, end_pos, string_content)
                     pos_key = (content_start_pos, content_end_pos)
                     
                     if pos_key not in found_positions:
-                        found_positions.add(pos_key)
-                        processed_ranges.append((start_pos, end_pos))
-                        
-                        # Добавляем расширенную информацию о позициях для прямого поиска
-                        line_info = self._get_line_column_info(content, content_start_pos, content_end_pos)
+                        found_positions.add(*pos_key)
+                        processed_ranges.add(start_pos, end_pos)
                         
-                        sql_queries.append({
-                            'sql_query': string_content,
-                            'start_pos': content_start_pos,
-                            'end_pos': content_end_pos,
-                            'line': content[:start_pos].count('\n') + 1,
-                            'column': len(content[:start_pos].split('\n')[-1]),
-                            # Добавляем точную информацию о строке и колонке
-                            'start_line': line_info['start_line'],
-                            'start_column': line_info['start_column'],
-                            'end_line': line_info['end_line'], 
-                            'end_column': line_info['end_column'],
-                            'line_content': line_info['line_content']
-                        })
+                        literal_line, literal_column = line_index.offset_to_line_col(start_pos)
+                        sql_queries.append(self._make_query_record(
+                            content, string_content, content_start_pos, content_end_pos, literal_line, literal_column
+                        ))
     
     def _fallback_search(self, content: str) -> List[Dict[str, Any]]:
         """Резервный метод поиска SQL в тексте (для обратной совместимости)."""
         sql_queries = []
-        found_positions = set()
+        found_positions = IntervalIndex()
         self._direct_string_search(content, sql_queries, found_positions)
         return sql_queries
     
-    def search_in_directory(self, directory: str, recursive: bool = True) -> Dict[str, List[Dict[str, Any]]]:
+    def search_in_directory(self, directory: str, recursive: bool = True,
+                            workers: Optional[int] = None,
+                            cache: Optional["ScanCache"] = None,
+                            walker: Optional[FileWalker] = None) -> Dict[str, List[Dict[str, Any]]]:
         """
         Ищет SQL запросы во всех Python файлах в директории.
         
         Args:
             directory: Путь к директории
             recursive: Искать ли в поддиректориях
+            workers: Число процессов для параллельного поиска
+                     (None или 1 - в текущем процессе, 0 - по числу ядер)
+            cache: Кэш сканирования; разбираются только файлы, изменившиеся
+                   с прошлого запуска
+            walker: Обходчик файлов (по умолчанию FileWalker со стандартными
+                    исключениями и учетом .gitignore)
             
         Returns:
-            Словарь с результатами поиска по файлам
+            Словарь с результатами поиска по файлам (в порядке обхода директории)
+        """
+        return dict(self.iter_sql_in_directory(directory, recursive, workers=workers, cache=cache, walker=walker))
+    
+    def iter_sql_in_directory(self, directory: str, recursive: bool = True,
+                              workers: Optional[int] = None,
+                              cache: Optional["ScanCache"] = None,
+                              walker: Optional[FileWalker] = None) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
         """
-        results = {}
-        
-        if recursive:
-            for root, dirs, files in os.walk(directory):
-                for file in files:
-                    if file.endswith('.py'):
-                        file_path = os.path.join(root, file)
-                        sql_queries = self.find_sql_in_file(file_path)
-                        if sql_queries:
-                            results[file_path] = sql_queries
+        Потоковый вариант search_in_directory: выдает (путь, запросы) по мере
+        обработки файлов, в порядке обхода директории. Файлы без SQL пропускаются.
+        Память не растет с размером репозитория: обход ленивый, а при
+        параллельном поиске в работе держится ограниченное число пакетов.
+        
+        Args: как у search_in_directory
+        """
+        walker = walker or FileWalker()
+        if cache is None:
+            return self.iter_sql_in_files(walker.walk(directory, recursive), workers=workers)
+        return self._iter_directory_cached(directory, recursive, workers, cache, walker)
+    
+    def _iter_directory_cached(self, directory: str, recursive: bool, workers: Optional[int],
+                               cache: "ScanCache", walker: FileWalker):
+        """Поиск по директории с кэшем; после полного обхода из кэша удаляются исчезнувшие файлы."""
+        visited = set()
+        
+        def walk():
+            for file_path in walker.walk(directory, recursive):
+                visited.add(os.path.abspath(file_path))
+                yield file_path
+        
+        yield from self.iter_sql_in_files(walk(), workers=workers, cache=cache)
+        # Сюда доходим только если обход не прерван: остальные записи под directory устарели
+        cache.prune(directory, visited, recursive)
+        cache.commit()
+    
+    def iter_sql_in_files(self, files: Iterable[str], workers: Optional[int] = None,
+                          cache: Optional["ScanCache"] = None) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Ищет SQL в заданных файлах и выдает (путь, запросы) в порядке файлов.
+        Файлы без SQL пропускаются.
+        
+        Args:
+            files: Пути к файлам (может быть ленивым итератором)
+            workers: Число процессов (None или 1 - в текущем процессе, 0 - по числу ядер)
+            cache: Кэш сканирования
+        """
+        if workers == 0:
+            workers = os.cpu_count() or 1
+        if not workers or workers <= 1:
+            found = self._iter_files_serial(files, cache)
         else:
-            for file in os.listdir(directory):
-                if file.endswith('.py'):
-                    file_path = os.path.join(directory, file)
-                    if os.path.isfile(file_path):
-                        sql_queries = self.find_sql_in_file(file_path)
-                        if sql_queries:
-                            results[file_path] = sql_queries
-        
-        return results
+            found = self._iter_files_parallel(files, workers, cache)
+        try:
+            for file_path, sql_queries in found:
+                if sql_queries:
+                    yield file_path, sql_queries
+        finally:
+            if cache is not None:
+                cache.commit()
+    
+    def iter_sql_in_git_changes(self, repo_dir: str = '.', since: Optional[str] = None,
+                                staged: bool = False, changed_lines_only: bool = False,
+                                workers: Optional[int] = None,
+                                cache: Optional["ScanCache"] = None) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Ищет SQL только в .py файлах, измененных по данным git.
+        
+        Args:
+            repo_dir: Каталог внутри репозитория
+            since: Ревизия для сравнения (git diff <since>)
+            staged: Брать изменения из индекса (git diff --cached)
+            changed_lines_only: Оставлять только запросы, пересекающиеся с измененными строками
+            workers: Число процессов для параллельного поиска
+            cache: Кэш сканирования
+        """
+        from git_changes import changed_line_ranges, filter_changed_queries
+        
+        changes = changed_line_ranges(repo_dir, since, staged)
+        files = sorted(path for path in changes if os.path.isfile(path))
+        for file_path, sql_queries in self.iter_sql_in_files(files, workers=workers, cache=cache):
+            if changed_lines_only:
+                sql_queries = filter_changed_queries(sql_queries, changes[file_path])
+            if sql_queries:
+                yield file_path, sql_queries
+    
+    def _iter_files_serial(self, files: Iterable[str], cache: Optional["ScanCache"] = None):
+        """Ищет SQL в файлах в текущем процессе, используя кэш сканирования."""
+        for file_path in files:
+            if cache is None:
+                yield file_path, self.find_sql_in_file(file_path)
+                continue
+            sql_queries = cache.get(file_path)
+            if sql_queries is None:
+                sql_queries, stamp = self.find_sql_in_file_stamped(file_path)
+                cache.put(file_path, sql_queries, stamp)
+            yield file_path, sql_queries
+    
+    def _iter_files_parallel(self, files: Iterable[str], workers: int, cache: Optional["ScanCache"] = None):
+        """
+        Ищет SQL в файлах пулом процессов. Файлы раздаются пакетами,
+        результаты возвращаются в исходном порядке файлов. Одновременно
+        в работе не больше PENDING_CHUNKS_PER_WORKER пакетов на процесс.
+        """
+        # Готовим кэш детектора заранее, чтобы обработчики не собирали его одновременно
+        if self.use_cache:
+            load_or_build(self.typo_file, self._build_detection_state, self.detection_cache_key(),
+                          default_cache_path(self.typo_file, self.typo_backend))
+        
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.typo_file, self.use_cache, self.typo_backend)) as executor:
+            pending = deque()
+            for chunk in chunk_files(files):
+                cached = {}
+                if cache is not None:
+                    for file_path in chunk:
+                        sql_queries = cache.get(file_path)
+                        if sql_queries is not None:
+                            cached[file_path] = sql_queries
+                to_scan = [file_path for file_path in chunk if file_path not in cached]
+                future = executor.submit(_search_chunk, to_scan, cache is not None) if to_scan else None
+                pending.append((chunk, cached, future))
+                # Ограничиваем число пакетов в работе, чтобы результаты не копились в памяти
+                while len(pending) >= workers * PENDING_CHUNKS_PER_WORKER:
+                    yield from self._collect_chunk(pending.popleft(), cache)
+            while pending:
+                yield from self._collect_chunk(pending.popleft(), cache)
+    
+    def _collect_chunk(self, item, cache: Optional["ScanCache"] = None):
+        """Выдает результаты пакета в исходном порядке файлов."""
+        chunk, cached, future = item
+        scanned = {file_path: (sql_queries, stamp) for file_path, sql_queries, stamp in future.result()} \
+            if future is not None else {}
+        for file_path in chunk:
+            if file_path in cached:
+                yield file_path, cached[file_path]
+            else:
+                sql_queries, stamp = scanned[file_path]
+                if cache is not None:
+                    cache.put(file_path, sql_queries, stamp)
+                yield file_path, sql_queries
+
+
+def chunk_files(files: Iterable[str], chunk_bytes: int = CHUNK_BYTES, max_files: int = CHUNK_FILES) -> Iterator[List[str]]:
+    """
+    Делит поток файлов на пакеты для обработчиков, сохраняя порядок.
+    Мелкие файлы объединяются, чтобы уменьшить накладные расходы на передачу.
+    """
+    current = []
+    current_bytes = 0
+    for file_path in files:
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+        current.append(file_path)
+        current_bytes += size
+        if current_bytes >= chunk_bytes or len(current) >= max_files:
+            yield current
+            current = []
+            current_bytes = 0
+    if current:
+        yield current
+
+
+def _init_worker(typo_file: str, use_cache: bool, typo_backend: str):
+    """Создает SQLSearcher процесса-обработчика один раз на весь пул."""
+    global _worker_searcher
+    _worker_searcher = SQLSearcher(typo_file=typo_file, use_cache=use_cache, typo_backend=typo_backend)
+
+
+def _search_chunk(files: List[str], stamped: bool = False) -> List[Tuple[str, List[Dict[str, Any]], Optional["FileStamp"]]]:
+    """
+    Обрабатывает пакет файлов в процессе-обработчике.
+    С stamped к результату файла добавляется отметка разобранных байтов (для кэша).
+    """
+    if stamped:
+        return [(file_path, *_worker_searcher.find_sql_in_file_stamped(file_path)) for file_path in files]
+    return [(file_path, _worker_searcher.find_sql_in_file(file_path), None) for file_path in files]
+
+
+def write_jsonl(file_path: str, queries: List[Dict[str, Any]], stream=None):
+    """Пишет запросы файла в формате JSON Lines (одна запись на запрос)."""
+    stream = stream or sys.stdout
+    for query in queries:
+        stream.write(json.dumps({'file': file_path, **query}, ensure_ascii=False) + '\n')
+    stream.flush()
 
 
 def main():
     """Основная функция для запуска скрипта."""
     if len(sys.argv) < 2:
-        print("Использование: python sql_searcher.py <путь_к_файлу_или_директории> [--recursive]")
+        print("Использование: python sql_searcher.py <путь_к_файлу_или_директории> [--recursive] [--symspell] [--workers N] [--cache | --cache-file PATH] [--jsonl] [--exclude PATTERN ...] [--no-gitignore] [--follow-symlinks] [--changed-since REV | --staged [--changed-lines]] [--watch [--polling] [--poll-interval S]]")
         sys.exit(1)
     
+    from scan_cache import ScanCache
+    from git_changes import GitError
+    from sql_watcher import SQLWatcher, emit_jsonl
+    
     path = sys.argv[1]
     recursive = '--recursive' in sys.argv or '-r' in sys.argv
+    typo_backend = 'symspell' if '--symspell' in sys.argv else 'patterns'
+    workers = None
+    if '--workers' in sys.argv:
+        workers = int(sys.argv[sys.argv.index('--workers') + 1])
+    cache_file = None
+    if '--cache-file' in sys.argv:
+        cache_file = sys.argv[sys.argv.index('--cache-file') + 1]
+    use_scan_cache = '--cache' in sys.argv or cache_file is not None
+    jsonl = '--jsonl' in sys.argv
+    # Дополнительные исключения (синтаксис .gitignore), флаг можно повторять
+    excludes = [sys.argv[i + 1] for i, arg in enumerate(sys.argv[:-1]) if arg == '--exclude']
+    walker = FileWalker(exclude=DEFAULT_EXCLUDES + tuple(excludes),
+                        use_gitignore='--no-gitignore' not in sys.argv,
+                        follow_symlinks='--follow-symlinks' in sys.argv)
+    
+    # Режим изменений git: путь - каталог репозитория
+    since = None
+    if '--changed-since' in sys.argv:
+        since = sys.argv[sys.argv.index('--changed-since') + 1]
+    staged = '--staged' in sys.argv
     
-    searcher = SQLSearcher()
+    searcher = SQLSearcher(typo_backend=typo_backend)
+    
+    if '--watch' in sys.argv:
+        # Наблюдение за каталогом: события изменений запросов в формате JSON Lines
+        if not os.path.isdir(path):
+            print(f"Каталог {path} не существует", file=sys.stderr)
+            sys.exit(1)
+        poll_interval = 1.0
+        if '--poll-interval' in sys.argv:
+            poll_interval = float(sys.argv[sys.argv.index('--poll-interval') + 1])
+        watcher = SQLWatcher(searcher, path, walker=walker, poll_interval=poll_interval,
+                             use_inotify='--polling' not in sys.argv)
+        print(f"Наблюдение за {path} ({watcher.mode})", file=sys.stderr)
+        try:
+            watcher.run(emit_jsonl)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+        return
+    
+    if since is not None or staged:
+        cache = ScanCache(searcher.scan_fingerprint(), cache_file) if use_scan_cache else None
+        try:
+            results = searcher.iter_sql_in_git_changes(path, since=since, staged=staged,
+                                                       changed_lines_only='--changed-lines' in sys.argv,
+                                                       workers=workers, cache=cache)
+            total_queries = 0
+            for file_path, queries in results:
+                total_queries += len(queries)
+                if jsonl:
+                    write_jsonl(file_path, queries)
+                    continue
+                print(f"\nФайл: {file_path}")
+                for i, query in enumerate(queries, 1):
+                    print(f"   {i}. Строка {query.get('line', 'N/A')}, позиция {query['start_pos']}-{query['end_pos']}")
+                    print(f"      Запрос: {repr(query['sql_query'][:80])}...")
+        except GitError as error:
+            print(f"Ошибка git: {error}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if cache is not None:
+                cache.close()
+        if not jsonl:
+            print(f"\nНайдено SQL запросов в измененных файлах: {total_queries}")
+        return
+    
+    if jsonl:
+        # Построчный JSON: по записи на запрос сразу по мере обработки файлов
+        if os.path.isfile(path):
+            write_jsonl(path, searcher.find_sql_in_file(path))
+        elif os.path.isdir(path):
+            cache = ScanCache(searcher.scan_fingerprint(), cache_file) if use_scan_cache else None
+            try:
+                for file_path, queries in searcher.iter_sql_in_directory(path, recursive, workers=workers,
+                                                                            cache=cache, walker=walker):
+                    write_jsonl(file_path, queries)
+            except BrokenPipeError:
+                # Потребитель закрыл канал (например, head) - завершаемся без трассировки
+                devnull = os.open(os.devnull, os.O_WRONLY)
+                os.dup2(devnull, sys.stdout.fileno())
+                sys.exit(1)
+            finally:
+                if cache is not None:
+                    cache.close()
+            print(f"Пропущено: каталогов {walker.skipped_dirs}, файлов {walker.skipped_files} "
+                  f"({walker.skipped_bytes} байт)", file=sys.stderr)
+            if cache is not None:
+                print(f"Кэш сканирования: {cache.hits} из {cache.hits + cache.misses} файлов "
+                      f"({cache.hit_ratio:.1%} попаданий)", file=sys.stderr)
+        else:
+            print(f"Путь {path} не существует", file=sys.stderr)
+            sys.exit(1)
+        return
     
     if os.path.isfile(path):
         # Поиск в одном файле
@@ -654,10 +818,20 @@ def main():
     
     elif os.path.isdir(path):
         # Поиск в директории
-        results = searcher.search_in_directory(path, recursive)
+        cache = ScanCache(searcher.scan_fingerprint(), cache_file) if use_scan_cache else None
+        try:
+            results = searcher.search_in_directory(path, recursive, workers=workers, cache=cache, walker=walker)
+        finally:
+            if cache is not None:
+                cache.close()
         total_queries = sum(len(queries) for queries in results.values())
         
         print(f"Найдено SQL запросов в {len(results)} файлах: {total_queries}")
+        print(f"Пропущено: каталогов {walker.skipped_dirs}, файлов {walker.skipped_files} "
+              f"({walker.skipped_bytes} байт)")
+        if cache is not None:
+            print(f"Кэш сканирования: {cache.hits} из {cache.hits + cache.misses} файлов "
+                  f"({cache.hit_ratio:.1%} попаданий)")
         
         for file_path, queries in results.items():
             print(f"\nФайл: {file_path}")
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Режим наблюдения за каталогом (sql_searcher.py --watch).
+Хранит последние найденные запросы по каждому файлу, отслеживает изменения
+через inotify (Linux, через ctypes) или опросом mtime и заново разбирает
+только изменившиеся файлы. Изменения выдаются событиями added / removed /
+changed в формате JSON Lines.
+"""
+
+import ctypes
+import ctypes.util
+import difflib
+import json
+import os
+import select
+import struct
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from file_walker import FileWalker
+
+
+# Константы inotify из <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct('iIII')
+
+# Пауза для накопления событий одного сохранения (редакторы пишут файл в несколько шагов)
+DEBOUNCE_SECONDS = 0.1
+
+
+def query_delta(file_path: str, old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    События изменения запросов файла.
+    Запросы сопоставляются по тексту в порядке следования; запрос, текст
+    которого не изменился, события не порождает, даже если сдвинулся.
+
+    Returns:
+        Список событий {'event': 'added'|'removed'|'changed', 'file', 'query', ['previous']}
+    """
+    events = []
+    matcher = difflib.SequenceMatcher(None, [q['sql_query'] for q in old],
+                                      [q['sql_query'] for q in new], autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        old_part = old[old_start:old_end]
+        new_part = new[new_start:new_end]
+        # Замена один к одному - изменение запроса, остаток - добавления и удаления
+        paired = min(len(old_part), len(new_part)) if tag == 'replace' else 0
+        for previous, query in zip(old_part[:paired], new_part[:paired]):
+            events.append({'event': 'changed', 'file': file_path, 'query': query, 'previous': previous})
+        for query in old_part[paired:]:
+            events.append({'event': 'removed', 'file': file_path, 'query': query})
+        for query in new_part[paired:]:
+            events.append({'event': 'added', 'file': file_path, 'query': query})
+    return events
+
+
+class InotifyBackend:
+    """Источник изменений на inotify (через ctypes, без внешних зависимостей)."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: Dict[int, str] = {}
+        self._watched: Set[str] = set()
+
+    @staticmethod
+    def available() -> bool:
+        """Поддерживает ли система inotify."""
+        if not sys.platform.startswith('linux'):
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6')
+            return hasattr(libc, 'inotify_init1')
+        except OSError:
+            return False
+
+    def watch(self, directories: Iterable[str]):
+        """Добавляет наблюдение за каталогами (уже наблюдаемые пропускаются)."""
+        for directory in directories:
+            if directory in self._watched:
+                continue
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                # ENOENT - каталог успел исчезнуть; остальное (лимит наблюдений) - ошибка
+                if errno == 2:
+                    continue
+                raise OSError(errno, f"inotify_add_watch failed: {directory}")
+            self._watches[wd] = directory
+            self._watched.add(directory)
+
+    def wait(self, timeout: Optional[float]) -> Tuple[Set[str], bool]:
+        """
+        Ждет изменений.
+
+        Returns:
+            (измененные пути файлов, нужен ли полный пересмотр дерева).
+            Полный пересмотр нужен при появлении новых файлов и каталогов
+            (чтобы применить правила исключений) и при переполнении очереди.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set(), False
+        # Дожидаемся остальных событий того же сохранения
+        time.sleep(DEBOUNCE_SECONDS)
+
+        paths: Set[str] = set()
+        rescan = False
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += _EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    rescan = True
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    self._watches.pop(wd, None)
+                    self._watched.discard(directory)
+                    rescan = True
+                    continue
+                if mask & IN_ISDIR:
+                    rescan = True
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    rescan = True
+                paths.add(os.path.join(directory, os.fsdecode(name)))
+        return paths, rescan
+
+    def close(self):
+        os.close(self._fd)
+
+
+class SQLWatcher:
+    """
+    Наблюдатель за каталогом: держит результаты поиска по файлам в памяти
+    и пересматривает только изменившиеся файлы.
+    """
+
+    def __init__(self, searcher, directory: str, walker: Optional[FileWalker] = None,
+                 poll_interval: float = 1.0, use_inotify: bool = True):
+        """
+        Args:
+            searcher: Экземпляр SQLSearcher
+            directory: Наблюдаемый каталог
+            walker: Обходчик файлов (по умолчанию FileWalker)
+            poll_interval: Период опроса mtime, если inotify недоступен
+            use_inotify: Использовать inotify, если он доступен
+        """
+        self.searcher = searcher
+        self.directory = directory
+        self.walker = walker or FileWalker()
+        self.poll_interval = poll_interval
+        self.results: Dict[str, List[Dict[str, Any]]] = {}
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self.backend: Optional[InotifyBackend] = None
+        if use_inotify and InotifyBackend.available():
+            try:
+                self.backend = InotifyBackend()
+            except OSError:
+                self.backend = None
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self.backend is not None else 'polling'
+
+    @staticmethod
+    def _file_stat(file_path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _update_file(self, file_path: str, stat: Optional[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        """Пересматривает файл (или удаляет его, если stat is None) и возвращает события."""
+        old = self.results.get(file_path, [])
+        if stat is None:
+            self.results.pop(file_path, None)
+            self._stats.pop(file_path, None)
+            new = []
+        else:
+            self._stats[file_path] = stat
+            new = self.searcher.find_sql_in_file(file_path)
+            self.results[file_path] = new
+        return query_delta(file_path, old, new)
+
+    def rescan(self) -> List[Dict[str, Any]]:
+        """Полный обход дерева: пересматриваются новые, измененные и удаленные файлы."""
+        events = []
+        current = set()
+        for file_path in self.walker.walk(self.directory):
+            current.add(file_path)
+            stat = self._file_stat(file_path)
+            if stat is not None and self._stats.get(file_path) != stat:
+                events.extend(self._update_file(file_path, stat))
+        for file_path in sorted(set(self._stats) - current):
+            events.extend(self._update_file(file_path, None))
+        if self.backend is not None:
+            try:
+                self.backend.watch(self.walker.directories)
+            except OSError:
+                # Например, исчерпан лимит наблюдений inotify - переходим на опрос
+                self.backend.close()
+                self.backend = None
+        return events
+
+    def refresh_paths(self, paths: Iterable[str]) -> List[Dict[str, Any]]:
+        """Пересматривает только указанные (уже известные) файлы."""
+        events = []
+        for file_path in sorted(paths):
+            if file_path not in self._stats:
+                continue
+            stat = self._file_stat(file_path)
+            if stat != self._stats[file_path]:
+                events.extend(self._update_file(file_path, stat))
+        return events
+
+    def poll(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Ждет изменений (не дольше timeout) и возвращает события."""
+        if self.backend is None:
+            time.sleep(self.poll_interval if timeout is None else min(timeout, self.poll_interval))
+            return self.rescan()
+        paths, full = self.backend.wait(timeout)
+        if full:
+            return self.rescan()
+        return self.refresh_paths(paths)
+
+    def run(self, emit: Callable[[Dict[str, Any]], None], initial: bool = True):
+        """
+        Основной цикл: первый обход, затем выдача событий по мере изменений.
+
+        Args:
+            emit: Обработчик события
+            initial: Выдавать ли найденные при первом обходе запросы как added
+        """
+        events = self.rescan()
+        if initial:
+            for event in events:
+                emit(event)
+        while True:
+            for event in self.poll():
+                emit(event)
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+
+
+def emit_jsonl(event: Dict[str, Any], stream=None):
+    """Пишет событие одной строкой JSON."""
+    stream = stream or sys.stdout
+    stream.write(json.dumps(event, ensure_ascii=False) + '\n')
+    stream.flush()
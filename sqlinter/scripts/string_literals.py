@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Точные границы строковых литералов Python по данным модуля tokenize.
+Каждый STRING-токен (и f-строка из FSTRING_START..FSTRING_END в Python 3.12+)
+разбирается один раз: префикс (r, b, f, rb, ...), тип кавычек и абсолютные
+позиции литерала и его содержимого без кавычек. Соседние литералы
+(неявная конкатенация "a" "b") объединяются в одно строковое выражение.
+"""
+
+import io
+import tokenize
+from typing import List, NamedTuple, Optional, Tuple
+
+from line_index import LineIndex
+
+
+_QUOTES = ('"""', "'''", '"', "'")
+_FSTRING_START = getattr(tokenize, 'FSTRING_START', None)
+_FSTRING_END = getattr(tokenize, 'FSTRING_END', None)
+# Токены, которые могут стоять между частями неявной конкатенации
+_CONCAT_GAP_TOKENS = (tokenize.NL, tokenize.COMMENT)
+
+
+class StringLiteral(NamedTuple):
+    """Строковый литерал в исходном тексте (позиции абсолютные, конец не включается)."""
+    start: int           # Начало литерала (с префиксом)
+    end: int             # Конец литерала (после закрывающей кавычки)
+    prefix: str          # Префикс как в исходнике: '', 'r', 'f', 'rb', 'F'...
+    quote: str           # Кавычки: ', ", ''' или \"\"\"
+    content_start: int   # Начало содержимого (после открывающей кавычки)
+    content_end: int     # Конец содержимого (перед закрывающей кавычкой)
+
+    @property
+    def is_fstring(self) -> bool:
+        return 'f' in self.prefix.lower()
+
+    @property
+    def is_bytes(self) -> bool:
+        return 'b' in self.prefix.lower()
+
+    @property
+    def is_raw(self) -> bool:
+        return 'r' in self.prefix.lower()
+
+
+class StringGroup(NamedTuple):
+    """Строковое выражение: один литерал или несколько при неявной конкатенации."""
+    parts: Tuple[StringLiteral, ...]
+
+    @property
+    def start(self) -> int:
+        return self.parts[0].start
+
+    @property
+    def end(self) -> int:
+        return self.parts[-1].end
+
+    @property
+    def content_start(self) -> int:
+        return self.parts[0].content_start
+
+    @property
+    def content_end(self) -> int:
+        return self.parts[-1].content_end
+
+
+def split_prefix(token_text: str):
+    """Разбирает начало литерала на префикс и кавычки."""
+    prefix_len = 0
+    while prefix_len < len(token_text) and token_text[prefix_len] not in '"\'':
+        prefix_len += 1
+    for quote in _QUOTES:
+        if token_text.startswith(quote, prefix_len):
+            return token_text[:prefix_len], quote
+    return token_text[:prefix_len], ''
+
+
+def make_literal(start: int, end: int, opening_text: str) -> Optional[StringLiteral]:
+    """Строит StringLiteral по границам и тексту начала литерала."""
+    prefix, quote = split_prefix(opening_text)
+    if not quote:
+        return None
+    content_start = start + len(prefix) + len(quote)
+    content_end = max(end - len(quote), content_start)
+    return StringLiteral(start, end, prefix, quote, content_start, content_end)
+
+
+def _resume_position(content: str, error: Exception, reached: int, to_offset) -> int:
+    """
+    Позиция, с которой продолжать поиск после ошибки tokenize.
+    Для незакрытого многострочного литерала - сразу после его открывающей
+    кавычки, чтобы литералы внутри остатка файла все равно нашлись.
+    """
+    # У TokenError args[1] - (строка, колонка); у SyntaxError (в том числе
+    # IndentationError при неверном отступе) args[1] - (файл, строка, колонка, текст)
+    if isinstance(error, SyntaxError):
+        location = (error.lineno, error.offset)
+    else:
+        location = error.args[1] if len(error.args) > 1 else None
+    if (isinstance(location, tuple) and len(location) == 2
+            and all(type(value) is int for value in location)):
+        start = to_offset(location[0], location[1])
+        prefix, quote = split_prefix(content[start:start + 5])
+        # Префикс литерала - только буквы (rb, f, u ...), а не произвольный код до кавычки
+        if quote and (not prefix or prefix.isalpha()) and start >= reached:
+            return start + len(prefix) + len(quote)
+    return reached
+
+
+def tokenize_string_groups(content: str, line_index: Optional[LineIndex] = None) -> Tuple[List[StringGroup], Optional[int]]:
+    """
+    Находит все строковые выражения файла за один проход tokenize.
+
+    Args:
+        content: Содержимое файла
+        line_index: Индекс строк для content (строится, если не передан)
+
+    Returns:
+        (выражения в порядке следования в файле, позиция остановки).
+        Позиция остановки - None, если файл токенизирован полностью, иначе
+        абсолютная позиция, после которой tokenize не смог разобрать текст.
+    """
+    line_index = line_index or LineIndex(content)
+    to_offset = line_index.line_col_to_offset
+    groups: List[StringGroup] = []
+    current: List[StringLiteral] = []
+    fstring_depth = 0
+    fstring_start = None
+    # Конец последнего токена в координатах tokenize; в позицию переводится
+    # только при ошибке, чтобы не считать смещение для каждого токена
+    reached = (1, 0)
+    string_type = tokenize.STRING
+
+    def close_group():
+        if current:
+            groups.append(StringGroup(tuple(current)))
+            current.clear()
+
+    try:
+        for token_type, token_string, token_start, token_end, _ in tokenize.generate_tokens(io.StringIO(content).readline):
+            reached = token_end
+            if token_type == string_type and not fstring_depth:
+                literal = make_literal(to_offset(*token_start), to_offset(*token_end), token_string)
+                if literal is not None:
+                    current.append(literal)
+            # Python 3.12+: f-строка приходит набором токенов FSTRING_START..FSTRING_END,
+            # вложенные токены (выражения в {}) к литералам не относятся
+            elif token_type == _FSTRING_START:
+                if fstring_depth == 0:
+                    fstring_start = (to_offset(*token_start), token_string)
+                fstring_depth += 1
+            elif token_type == _FSTRING_END and fstring_depth:
+                fstring_depth -= 1
+                if fstring_depth == 0:
+                    literal = make_literal(fstring_start[0], to_offset(*token_end), fstring_start[1])
+                    if literal is not None:
+                        current.append(literal)
+            elif current and not fstring_depth and token_type not in _CONCAT_GAP_TOKENS:
+                close_group()
+    except (tokenize.TokenError, SyntaxError) as error:
+        close_group()
+        return groups, _resume_position(content, error, to_offset(*reached), to_offset)
+
+    close_group()
+    return groups, None
@@ -52,6 +52,21 @@ class TypoGenerator:
             'N': 'Т', 'M': 'Ь'
         }
         
+        # Основные SQL команды с их контекстом
+        self.sql_contexts = {
+            'SELECT': ['FROM', 'WHERE', 'ORDER', 'GROUP', 'HAVING', 'LIMIT'],
+            'INSERT': ['INTO', 'VALUES', 'SELECT'],
+            'UPDATE': ['SET', 'WHERE'],
+            'DELETE': ['FROM', 'WHERE'],
+            'CREATE': ['TABLE', 'INDEX', 'VIEW', 'DATABASE'],
+            'DROP': ['TABLE', 'INDEX', 'VIEW', 'DATABASE'],
+            'ALTER': ['TABLE', 'ADD', 'DROP', 'MODIFY'],
+            'WITH': ['SELECT', 'AS'],
+            'SHOW': ['TABLES', 'DATABASES', 'COLUMNS'],
+            'DESCRIBE': ['TABLE'],
+            'EXPLAIN': ['SELECT', 'INSERT', 'UPDATE', 'DELETE']
+        }
+        
         self.generated_typos = set()
         self.typo_patterns = {}
     
@@ -185,22 +200,7 @@ class TypoGenerator:
         """Генерирует контекстные паттерны для обнаружения SQL."""
         patterns = {}
         
-        # Основные SQL команды с их контекстом
-        sql_contexts = {
-            'SELECT': ['FROM', 'WHERE', 'ORDER', 'GROUP', 'HAVING', 'LIMIT'],
-            'INSERT': ['INTO', 'VALUES', 'SELECT'],
-            'UPDATE': ['SET', 'WHERE'],
-            'DELETE': ['FROM', 'WHERE'],
-            'CREATE': ['TABLE', 'INDEX', 'VIEW', 'DATABASE'],
-            'DROP': ['TABLE', 'INDEX', 'VIEW', 'DATABASE'],
-            'ALTER': ['TABLE', 'ADD', 'DROP', 'MODIFY'],
-            'WITH': ['SELECT', 'AS'],
-            'SHOW': ['TABLES', 'DATABASES', 'COLUMNS'],
-            'DESCRIBE': ['TABLE'],
-            'EXPLAIN': ['SELECT', 'INSERT', 'UPDATE', 'DELETE']
-        }
-        
-        for main_word, context_words in sql_contexts.items():
+        for main_word, context_words in self.sql_contexts.items():
             main_typos = self.generate_all_typos_for_word(main_word)
             
             for context_word in context_words:
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Предкомпилированный матчер паттернов опечаток SQL.
+Вместо прогона сотен регулярных выражений из sql_typo_patterns.json на каждую
+строку токенизирует текст один раз и проверяет токены по хеш-словарю опечаток.
+Результат совпадает с результатом исходных регулярных выражений.
+"""
+
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+
+# Формы паттернов, которые генерирует typo_generator.py
+_ALT_GROUP = r'\\b\((?P<{name}>[^()]*)\)\\b'
+_PLAIN_WORD = r'\\b(?P<{name}>\w+)\\b'
+_WORD_PATTERN_RE = re.compile('^' + _ALT_GROUP.format(name='left') + '$')
+_CONTEXT_PATTERN_RE = re.compile(
+    '^(?:' + _ALT_GROUP.format(name='left_alt') + '|' + _PLAIN_WORD.format(name='left_word') + ')'
+    r'\.\*'
+    '(?:' + _ALT_GROUP.format(name='right_alt') + '|' + _PLAIN_WORD.format(name='right_word') + ')$'
+)
+_UNESCAPE_RE = re.compile(r'\\(.)')
+_TOKEN_RE = re.compile(r'\w+')
+_REGEX_FLAGS = re.IGNORECASE | re.MULTILINE | re.DOTALL
+
+
+class TypoPatternMatcher:
+    """
+    Матчер опечаток, построенный один раз по данным sql_typo_patterns.json.
+
+    Словарные паттерны вида \\b(typo1|typo2)\\b превращаются в словарь
+    опечатка -> ключевые слова, контекстные паттерны вида \\bA\\b.*\\bB\\b —
+    в правила совместной встречаемости токенов A и B (A раньше B).
+    Паттерны другой формы компилируются один раз и проверяются как регулярки.
+    """
+
+    def __init__(self, typo_patterns: Optional[Dict] = None):
+        typo_patterns = typo_patterns or {}
+        # Лексикон: свернутый токен -> индексы словарных паттернов (ключевых слов)
+        self.word_lexicon: Dict[str, Tuple[int, ...]] = {}
+        self.word_keywords: List[str] = []
+        # Лексикон контекстных правил: свернутый токен -> ((индекс_правила, сторона), ...)
+        self.context_lexicon: Dict[str, Tuple[Tuple[int, int], ...]] = {}
+        self.context_rules: List[str] = []
+        # Паттерны нестандартной формы, проверяемые регулярками
+        self.fallback_context_patterns: List[re.Pattern] = []
+        self.fallback_word_patterns: List[re.Pattern] = []
+        # Алфавит лексикона и кэш свертки символов
+        self._alphabet: Set[str] = set()
+        self._fold_cache: Dict[str, str] = {}
+
+        word_lexicon: Dict[str, Set[int]] = {}
+        context_lexicon: Dict[str, Set[Tuple[int, int]]] = {}
+
+        for name, pattern_data in typo_patterns.get('context_patterns', {}).items():
+            pattern = pattern_data.get('pattern', '')
+            if not pattern:
+                continue
+            sides = self._parse_context_pattern(pattern)
+            if sides is None:
+                self._add_fallback(self.fallback_context_patterns, pattern)
+                continue
+            rule_idx = len(self.context_rules)
+            self.context_rules.append(name)
+            for side, words in enumerate(sides):
+                for word in words:
+                    context_lexicon.setdefault(word, set()).add((rule_idx, side))
+
+        for name, pattern_data in typo_patterns.get('word_patterns', {}).items():
+            pattern = pattern_data.get('pattern', '')
+            if not pattern:
+                continue
+            words = self._parse_word_pattern(pattern)
+            if words is None:
+                self._add_fallback(self.fallback_word_patterns, pattern)
+                continue
+            keyword_idx = len(self.word_keywords)
+            self.word_keywords.append(name[:-len('_typos')] if name.endswith('_typos') else name)
+            for word in words:
+                word_lexicon.setdefault(word, set()).add(keyword_idx)
+
+        self.word_lexicon = {word: tuple(sorted(idx)) for word, idx in word_lexicon.items()}
+        self.context_lexicon = {word: tuple(sorted(refs)) for word, refs in context_lexicon.items()}
+
+    def _add_fallback(self, target: List[re.Pattern], pattern: str):
+        """Компилирует паттерн нестандартной формы (некорректные игнорируются)."""
+        try:
+            target.append(re.compile(pattern, _REGEX_FLAGS))
+        except re.error:
+            pass
+
+    def _split_alternatives(self, group: str) -> Set[str]:
+        """Разбирает альтернативы re.escape(...)|... в набор свернутых слов."""
+        words = set()
+        for alternative in group.split('|'):
+            word = _UNESCAPE_RE.sub(r'\1', alternative)
+            if word:
+                words.add(self._register(word))
+        return words
+
+    def _register(self, word: str) -> str:
+        """Добавляет слово в алфавит лексикона и возвращает его в нижнем регистре."""
+        word = word.lower()
+        self._alphabet.update(word)
+        return word
+
+    def _parse_word_pattern(self, pattern: str) -> Optional[Set[str]]:
+        """Разбирает паттерн \\b(alt)\\b; None для нестандартной формы."""
+        match = _WORD_PATTERN_RE.match(pattern)
+        if not match:
+            return None
+        words = self._split_alternatives(match.group('left'))
+        # Альтернативы должны состоять только из символов слова, иначе \b-семантика другая
+        if not all(_TOKEN_RE.fullmatch(word) for word in words):
+            return None
+        return words
+
+    def _parse_context_pattern(self, pattern: str) -> Optional[Tuple[Set[str], Set[str]]]:
+        """Разбирает паттерн \\bA\\b.*\\bB\\b; None для нестандартной формы."""
+        match = _CONTEXT_PATTERN_RE.match(pattern)
+        if not match:
+            return None
+        sides = []
+        for side in ('left', 'right'):
+            alt = match.group(f'{side}_alt')
+            words = self._split_alternatives(alt) if alt is not None else {self._register(match.group(f'{side}_word'))}
+            if not all(_TOKEN_RE.fullmatch(word) for word in words):
+                return None
+            sides.append(words)
+        return sides[0], sides[1]
+
+    def _fold_char(self, char: str) -> str:
+        """
+        Сворачивает символ так же, как его сравнивает re.IGNORECASE.
+        Для символов вне алфавита лексикона возвращает сам символ.
+        """
+        folded = self._fold_cache.get(char)
+        if folded is not None:
+            return folded
+        folded = char.lower()
+        if len(folded) != 1 or folded not in self._alphabet:
+            folded = char
+            # Редкие эквивалентности re (например, 'ſ' ~ 's') проверяем самим re
+            for letter in self._alphabet:
+                if re.fullmatch(re.escape(letter), char, re.IGNORECASE):
+                    folded = letter
+                    break
+        self._fold_cache[char] = folded
+        return folded
+
+    def fold(self, token: str) -> str:
+        """Приводит токен к виду, в котором хранятся ключи лексикона."""
+        lowered = token.lower()
+        if lowered.isascii() and len(lowered) == len(token):
+            return lowered
+        return ''.join(self._fold_char(char) for char in token)
+
+    def tokenize(self, text: str) -> List[str]:
+        """Разбивает текст на свернутые токены (границы как у \\b в re)."""
+        return [self.fold(token) for token in _TOKEN_RE.findall(text)]
+
+    def word_matches(self, tokens: List[str]) -> Set[int]:
+        """Возвращает индексы словарных паттернов, найденных среди токенов."""
+        matched = set()
+        lexicon = self.word_lexicon
+        for token in tokens:
+            hits = lexicon.get(token)
+            if hits:
+                matched.update(hits)
+        return matched
+
+    def has_context_match(self, tokens: List[str]) -> bool:
+        """Проверяет, есть ли токен левой части правила раньше токена правой части."""
+        lexicon = self.context_lexicon
+        seen_left = set()
+        for token in tokens:
+            refs = lexicon.get(token)
+            if not refs:
+                continue
+            # Сначала правая сторона: токен не может быть одновременно A и B одного совпадения
+            for rule_idx, side in refs:
+                if side == 1 and rule_idx in seen_left:
+                    return True
+            for rule_idx, side in refs:
+                if side == 0:
+                    seen_left.add(rule_idx)
+        return False
+
+    def matches(self, text: str) -> bool:
+        """
+        Проверяет текст на опечатки в SQL ключевых словах.
+
+        Args:
+            text: Очищенный текст строки
+
+        Returns:
+            True, если сработал контекстный паттерн или 2+ словарных паттерна
+        """
+        tokens = self.tokenize(text)
+
+        # Контекстные паттерны (приоритет - они более точные)
+        if self.has_context_match(tokens):
+            return True
+        for pattern in self.fallback_context_patterns:
+            if pattern.search(text):
+                return True
+
+        # Словарные паттерны: нужно 2 или более совпадений с разными словами
+        word_matches = len(self.word_matches(tokens))
+        if word_matches >= 2:
+            return True
+        for pattern in self.fallback_word_patterns:
+            if pattern.search(text):
+                word_matches += 1
+                if word_matches >= 2:
+                    return True
+
+        return False
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк пропускной способности SQLSearcher (МБ/с исходного кода).
+
+Запуск:
+    python benchmark_searcher.py [путь ...] [--repeat N]
+    python benchmark_searcher.py [каталог ...] --scaling [--max-workers N]
+
+С --scaling измеряется ускорение search_in_directory(workers=n)
+для n от 1 до числа ядер.
+
+По умолчанию сканируются каталог sqlinter и стандартная библиотека Python
+(без site-packages).
+"""
+
+import os
+import sys
+import sysconfig
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from sql_searcher import SQLSearcher
+
+
+def collect_files(paths):
+    """Все .py файлы по указанным путям (рекурсивно)."""
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+        for root, dirs, names in os.walk(path):
+            # Сторонние пакеты к бенчмарку не относятся
+            dirs[:] = sorted(d for d in dirs if d != 'site-packages')
+            files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith('.py'))
+    return files
+
+
+def run(files, searcher, repeat=1):
+    """Сканирует файлы repeat раз, возвращает (лучшее время, число запросов)."""
+    best = None
+    queries = 0
+    for _ in range(repeat):
+        queries = 0
+        started = time.perf_counter()
+        for file_path in files:
+            queries += len(searcher.find_sql_in_file(file_path))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, queries
+
+
+def run_scaling(directories, searcher, max_workers):
+    """Время поиска по каталогам для 1..max_workers процессов."""
+    timings = []
+    for workers in range(1, max_workers + 1):
+        started = time.perf_counter()
+        queries = 0
+        for directory in directories:
+            results = searcher.search_in_directory(directory, workers=workers)
+            queries += sum(len(found) for found in results.values())
+        timings.append((workers, time.perf_counter() - started, queries))
+    return timings
+
+
+def _pop_option(args, name, default):
+    if name in args:
+        index = args.index(name)
+        value = int(args[index + 1])
+        del args[index:index + 2]
+        return value
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    repeat = _pop_option(args, '--repeat', 3)
+    max_workers = _pop_option(args, '--max-workers', os.cpu_count() or 1)
+    scaling = '--scaling' in args
+    if scaling:
+        args.remove('--scaling')
+
+    paths = args or [
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'),
+        sysconfig.get_paths()['stdlib'],
+    ]
+    files = collect_files(paths)
+    size = sum(os.path.getsize(file_path) for file_path in files)
+    megabytes = size / (1024 * 1024)
+
+    searcher = SQLSearcher()
+    if scaling:
+        directories = [path for path in paths if os.path.isdir(path)]
+        print(f"Файлов: {len(files)}, объем: {megabytes:.2f} МБ")
+        timings = run_scaling(directories, searcher, max_workers)
+        base = timings[0][1]
+        for workers, elapsed, queries in timings:
+            print(f"workers={workers}: {elapsed:.2f} с, {megabytes / elapsed:.2f} МБ/с, "
+                  f"ускорение x{base / elapsed:.2f}, запросов {queries}")
+        return
+
+    elapsed, queries = run(files, searcher, repeat)
+
+    print(f"Файлов: {len(files)}, объем: {megabytes:.2f} МБ")
+    print(f"Найдено запросов: {queries}")
+    print(f"Время (лучшее из {repeat}): {elapsed:.2f} с")
+    print(f"Пропускная способность: {megabytes / elapsed:.2f} МБ/с")
+
+
+if __name__ == "__main__":
+    main()
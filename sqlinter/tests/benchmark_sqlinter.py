@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк исправления запросов моделью SQLinter (запросов в секунду).
+
+Запуск:
+    python benchmark_sqlinter.py [файл.py ...] [--limit N] [--batch-size N] [--max-tokens N]
+                                 [--backend torch|onnx] [--precision fp32|bf16|int8]
+    python benchmark_sqlinter.py [файл.py ...] --compare-backends torch,onnx
+    python benchmark_sqlinter.py [файл.py ...] --compare-precisions fp32,bf16,int8
+    python benchmark_sqlinter.py [файл.py ...] --prompt-lookup
+    python benchmark_sqlinter.py [файл.py ...] --adaptive
+
+Запросы извлекаются из указанных файлов через SQLSearcher (по умолчанию -
+из примеров в каталоге tests) и исправляются дважды: по одному через
+predict и пакетами через predict_batch. Печатается пропускная способность,
+доля полезных токенов в пакетах (с группировкой по длине и без нее)
+и доля совпавших исправлений.
+
+С --compare-backends и --compare-precisions каждый вариант модели
+замеряется в отдельном процессе (загрузка, жадное декодирование, лучевой
+поиск, пиковый RSS), и исправления сравниваются с первым вариантом списка:
+точное совпадение и совпадение после нормализации пробелов. Для проверки
+точности режимов передайте файлы с запросами, не входившими в обучение.
+
+С --prompt-lookup жадное декодирование сравнивается с декодированием
+с черновиками из входа (по умолчанию на запросах из test_sql_examples.py):
+токены в секунду, совпадение исправлений, доля принятых токенов черновика.
+
+С --adaptive лучевой поиск сравнивается с адаптивным декодированием
+(жадное, затем лучевой поиск для неуверенных запросов): время, доля
+запросов, принятых без лучевого поиска, и совпадение исправлений.
+"""
+
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from correction_cache import normalize_query
+from length_batching import padding_stats, plan_batches
+from sql_searcher import SQLSearcher
+
+
+def collect_queries(files, limit):
+    """Тексты SQL запросов из файлов (не больше limit)."""
+    searcher = SQLSearcher()
+    queries = []
+    for file_path in files:
+        queries.extend(result['sql_query'] for result in searcher.find_sql_in_file(file_path))
+    return queries[:limit]
+
+
+def _option(args, name, default, cast=int):
+    if name in args:
+        index = args.index(name)
+        value = cast(args[index + 1])
+        del args[index:index + 2]
+        return value
+    return default
+
+
+def parse_variant(variant):
+    """Вариант модели "бэкенд[:точность]" -> (бэкенд, точность)."""
+    backend, _, precision = variant.partition(':')
+    return backend, precision or 'fp32'
+
+
+def measure_variant(variant, queries, batch_size, max_tokens):
+    """Замер варианта модели: время загрузки и генерации, пиковый RSS, исправления."""
+    import resource
+    from SQLinterModel import SQLinterModel
+
+    backend, precision = parse_variant(variant)
+    started = time.perf_counter()
+    model = SQLinterModel(use_cache=False, backend=backend, precision=precision)
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    greedy = model.predict_batch(queries, batch_size=batch_size, max_tokens=max_tokens, num_beams=1)
+    greedy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    beam = model.predict_batch(queries, batch_size=batch_size, max_tokens=max_tokens)
+    beam_seconds = time.perf_counter() - started
+
+    return {
+        'variant': f"{backend}:{model.precision}",
+        'load_seconds': load_seconds,
+        'greedy_seconds': greedy_seconds,
+        'beam_seconds': beam_seconds,
+        # ru_maxrss в Linux - в килобайтах
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'greedy': greedy,
+        'beam': beam,
+    }
+
+
+def compare_variants(variants, files, limit, batch_size, max_tokens):
+    """Замеряет варианты модели в отдельных процессах и сравнивает их исправления."""
+    results = []
+    for variant in variants:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *files, '--limit', str(limit),
+             '--batch-size', str(batch_size), '--max-tokens', str(max_tokens), '--measure', variant],
+            stdout=subprocess.PIPE, check=True,
+        )
+        results.append(json.loads(completed.stdout.decode('utf-8').splitlines()[-1]))
+
+    baseline = results[0]
+    count = len(baseline['beam'])
+    print(f"Запросов: {count}")
+    print(f"{'вариант':11} {'загрузка, с':>12} {'жадный, мс/запр':>16} {'луч, мс/запр':>13} {'RSS, МБ':>8} "
+          f"{'= жадный':>9} {'= луч':>9} {'≈ луч':>9}")
+    for result in results:
+        same_greedy = sum(a == b for a, b in zip(baseline['greedy'], result['greedy']))
+        same_beam = sum(a == b for a, b in zip(baseline['beam'], result['beam']))
+        close_beam = sum(normalize_query(a) == normalize_query(b) for a, b in zip(baseline['beam'], result['beam']))
+        print(f"{result['variant']:11} {result['load_seconds']:12.2f} "
+              f"{1000 * result['greedy_seconds'] / max(count, 1):16.1f} "
+              f"{1000 * result['beam_seconds'] / max(count, 1):13.1f} {result['peak_rss_mb']:8.0f} "
+              f"{same_greedy:>4}/{count:<4} {same_beam:>4}/{count:<4} {close_beam:>4}/{count:<4}")
+
+
+def benchmark_prompt_lookup(queries, precision):
+    """Жадное декодирование против prompt lookup на тех же запросах."""
+    from SQLinterModel import SQLinterModel
+    model = SQLinterModel(use_cache=False, precision=precision)
+
+    started = time.perf_counter()
+    greedy = [model.predict(query, num_beams=1) for query in queries]
+    greedy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    lookup = [model.predict(query, prompt_lookup=True) for query in queries]
+    lookup_seconds = time.perf_counter() - started
+
+    stats = model.lookup_stats
+    tokens = stats['tokens']
+    print(f"Жадный:        {greedy_seconds:7.2f} с, {tokens / greedy_seconds:7.1f} токенов/с")
+    print(f"Prompt lookup: {lookup_seconds:7.2f} с, {tokens / lookup_seconds:7.1f} токенов/с "
+          f"(ускорение x{greedy_seconds / lookup_seconds:.2f})")
+    print(f"Принято токенов черновика: {stats['accepted']}/{stats['drafted']}, "
+          f"токенов за шаг декодера: {tokens / max(stats['steps'], 1):.2f}")
+    same = sum(a == b for a, b in zip(greedy, lookup))
+    print(f"Совпадение с жадным: {same}/{len(queries)}")
+
+
+def benchmark_adaptive(queries, precision, batch_size, max_tokens):
+    """Лучевой поиск для всех запросов против адаптивного декодирования."""
+    from SQLinterModel import SQLinterModel
+    model = SQLinterModel(use_cache=False, precision=precision)
+
+    started = time.perf_counter()
+    beam = model.predict_batch(queries, batch_size=batch_size, max_tokens=max_tokens)
+    beam_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    adaptive = model.predict_batch(queries, batch_size=batch_size, max_tokens=max_tokens, adaptive=True)
+    adaptive_seconds = time.perf_counter() - started
+
+    summary = model.adaptive_summary()
+    print(f"Лучевой поиск: {beam_seconds:7.2f} с")
+    print(f"Адаптивное:    {adaptive_seconds:7.2f} с (ускорение x{beam_seconds / adaptive_seconds:.2f}), "
+          f"принято жадно {summary['accepted']}/{summary['queries']} ({summary['acceptance_rate']:.1%})")
+    if summary['estimated_saved_seconds'] is not None:
+        print(f"Оценка сэкономленного времени: {summary['estimated_saved_seconds']:.2f} с")
+    same = sum(a == b for a, b in zip(beam, adaptive))
+    print(f"Совпадение с лучевым поиском: {same}/{len(queries)}")
+
+
+def main():
+    args = sys.argv[1:]
+    limit = _option(args, '--limit', 64)
+    batch_size = _option(args, '--batch-size', 16)
+    max_tokens = _option(args, '--max-tokens', 2048)
+    backend = _option(args, '--backend', 'torch', cast=str)
+    precision = _option(args, '--precision', 'fp32', cast=str)
+    compare_backends = _option(args, '--compare-backends', None, cast=str)
+    compare_precisions = _option(args, '--compare-precisions', None, cast=str)
+    measure = _option(args, '--measure', None, cast=str)
+    adaptive = '--adaptive' in args
+    if adaptive:
+        args.remove('--adaptive')
+    prompt_lookup = '--prompt-lookup' in args
+    if prompt_lookup:
+        args.remove('--prompt-lookup')
+        args = args or [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_sql_examples.py')]
+    files = args or sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py')))
+
+    if compare_backends:
+        compare_variants(compare_backends.split(','), files, limit, batch_size, max_tokens)
+        return
+    if compare_precisions:
+        variants = [f"torch:{name}" for name in compare_precisions.split(',')]
+        compare_variants(variants, files, limit, batch_size, max_tokens)
+        return
+
+    queries = collect_queries(files, limit)
+    if measure:
+        # Служебный режим для сравнения вариантов: результат одной строкой JSON
+        print(json.dumps(measure_variant(measure, queries, batch_size, max_tokens), ensure_ascii=False))
+        return
+    if not queries:
+        print("Запросы не найдены")
+        return
+    print(f"Запросов: {len(queries)}")
+    if prompt_lookup:
+        benchmark_prompt_lookup(queries, precision)
+        return
+    if adaptive:
+        benchmark_adaptive(queries, precision, batch_size, max_tokens)
+        return
+
+    from SQLinterModel import SQLinterModel
+    # Без кэша исправлений: иначе второй проход брал бы результаты первого
+    model = SQLinterModel(use_cache=False, backend=backend, precision=precision)
+
+    started = time.perf_counter()
+    single = [model.predict(query) for query in queries]
+    single_seconds = time.perf_counter() - started
+    print(f"predict:       {single_seconds:7.2f} с, {len(queries) / single_seconds:6.2f} запр/с")
+
+    started = time.perf_counter()
+    batched = model.predict_batch(queries, batch_size=batch_size, max_tokens=max_tokens)
+    batch_seconds = time.perf_counter() - started
+    print(f"predict_batch: {batch_seconds:7.2f} с, {len(queries) / batch_seconds:6.2f} запр/с "
+          f"(batch_size={batch_size}, max_tokens={max_tokens}, ускорение x{single_seconds / batch_seconds:.2f})")
+
+    lengths = [len(ids) for ids in model.tokenizer(queries)["input_ids"]]
+    naive = padding_stats(lengths, plan_batches(lengths, max_tokens, batch_size, sort_by_length=False))
+    print(f"Полезные токены: {model.batch_stats['padding_efficiency']:.1%} "
+          f"в {model.batch_stats['batches']} пакетах по длине, "
+          f"{naive['padding_efficiency']:.1%} в {naive['batches']} пакетах по порядку")
+
+    same = sum(1 for a, b in zip(single, batched) if a == b)
+    print(f"Совпадение исправлений: {same}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты правил адаптивной ширины луча: принятие жадного результата,
+предел длины исправления и сводка по сэкономленному времени.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from adaptive_decoding import CONFIDENCE_THRESHOLD, accept_greedy, adaptive_stats, output_limit, summarize
+
+
+def test_accept_greedy():
+    query = "SELECT *  FROM users"
+    assert accept_greedy(query, "SELECT * FROM users WHERE id = 1", CONFIDENCE_THRESHOLD)
+    # Неуверенный результат принимается, только если совпадает с запросом (без учета пробелов)
+    assert accept_greedy(query, "SELECT * FROM users", 0.2)
+    assert not accept_greedy(query, "SELECT id FROM users", 0.2)
+
+
+def test_output_limit_grows_with_input():
+    assert output_limit(10) < output_limit(100) < output_limit(400)
+    assert output_limit(400) > 400
+
+
+def test_summary():
+    stats = adaptive_stats()
+    assert summarize(stats)['acceptance_rate'] == 0.0
+    assert summarize(stats)['estimated_saved_seconds'] is None
+
+    stats.update(queries=10, accepted=8, escalated=2, greedy_seconds=1.0, beam_seconds=2.0)
+    summary = summarize(stats)
+    assert summary['acceptance_rate'] == 0.8
+    # 8 принятых запросов по 1 с лучевого поиска минус 1 с жадного прохода
+    assert summary['estimated_saved_seconds'] == 7.0
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты кэша исправлений SQLinter: нормализация запросов, два уровня хранения
+и привязка записей к весам модели и параметрам генерации.
+"""
+
+import hashlib
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from correction_cache import CorrectionCache, normalize_query
+from detection_cache import file_digest
+
+
+PARAMS = {"max_new_tokens": 200, "num_beams": 5, "early_stopping": True}
+
+
+def test_normalize_collapses_whitespace_outside_literals():
+    assert normalize_query("  SELECT *\n\tFROM  users ") == "SELECT * FROM users"
+    assert normalize_query("SELECT 'a   b'  FROM t") == "SELECT 'a   b' FROM t"
+    assert normalize_query('SELECT "x  y",  \'it\'\'s  \'') == 'SELECT "x  y", \'it\'\'s  \''
+
+
+def test_memory_and_disk_levels(tmp_path):
+    cache_file = str(tmp_path / 'corrections.sqlite')
+    with CorrectionCache('ckpt', cache_file) as cache:
+        assert cache.get("SELECT * FORM users", PARAMS) is None
+        cache.put("SELECT * FORM users", PARAMS, "SELECT * FROM users")
+        assert cache.get("SELECT *   FORM users\n", PARAMS) == "SELECT * FROM users"
+        assert (cache.memory_hits, cache.disk_hits, cache.misses) == (1, 0, 1)
+
+    with CorrectionCache('ckpt', cache_file) as cache:
+        assert cache.get("SELECT * FORM users", PARAMS) == "SELECT * FROM users"
+        assert cache.get("SELECT * FORM users", PARAMS) == "SELECT * FROM users"
+        assert (cache.memory_hits, cache.disk_hits, cache.misses) == (1, 1, 0)
+        assert cache.hit_ratio == 1.0
+
+
+def test_key_depends_on_checkpoint_and_params(tmp_path):
+    cache_file = str(tmp_path / 'corrections.sqlite')
+    with CorrectionCache('ckpt-1', cache_file) as cache:
+        cache.put("SELECT 1", PARAMS, "SELECT 1;")
+        assert cache.get("SELECT 1", dict(PARAMS, num_beams=1)) is None
+    with CorrectionCache('ckpt-2', cache_file) as cache:
+        assert cache.get("SELECT 1", PARAMS) is None
+
+
+def test_memory_level_is_bounded(tmp_path):
+    with CorrectionCache('ckpt', str(tmp_path / 'c.sqlite'), memory_size=2) as cache:
+        for i in range(3):
+            cache.put(f"SELECT {i}", PARAMS, f"SELECT {i};")
+        assert len(cache._memory) == 2
+        # Вытесненная из памяти запись читается с диска
+        assert cache.get("SELECT 0", PARAMS) == "SELECT 0;"
+        assert cache.disk_hits == 1
+
+
+def test_checkpoint_digest(tmp_path):
+    weights = tmp_path / 'model.safetensors'
+    weights.write_bytes(b'\0' * (3 << 20))
+    assert file_digest(str(weights), chunk_size=1 << 10) == hashlib.sha256(weights.read_bytes()).hexdigest()
+    assert file_digest(str(tmp_path / 'missing')) is None
+
+
+def test_checkpoint_digest_is_memoized(tmp_path, monkeypatch):
+    import correction_cache
+
+    weights = tmp_path / 'model.safetensors'
+    weights.write_bytes(b'weights')
+    cache_file = str(tmp_path / 'c.sqlite')
+    with CorrectionCache.for_checkpoint(str(weights), 'torch', cache_file) as cache:
+        first = cache.checkpoint
+    assert first == file_digest(str(weights)) + ':torch'
+
+    calls = []
+    monkeypatch.setattr(correction_cache, 'file_digest', lambda path: calls.append(path) or file_digest(path))
+    with CorrectionCache.for_checkpoint(str(weights), 'torch', cache_file) as cache:
+        assert cache.checkpoint == first
+    assert calls == []
+
+    # Изменение файла (размер и mtime) - хеш пересчитывается
+    weights.write_bytes(b'new weights')
+    with CorrectionCache.for_checkpoint(str(weights), 'torch', cache_file) as cache:
+        assert cache.checkpoint != first
+    assert len(calls) == 1
+    assert CorrectionCache.for_checkpoint(str(tmp_path / 'missing'), 'torch', cache_file) is None
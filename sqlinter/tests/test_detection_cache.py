@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты персистентного кэша подготовленного состояния детектора SQL.
+"""
+
+import json
+import os
+import shutil
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import pytest
+
+import sql_searcher
+from detection_cache import default_cache_path, load_or_build
+from sql_searcher import SQLSearcher
+
+
+TYPO_FILE = os.path.join(os.path.dirname(__file__), '..', 'scripts', 'sql_typo_patterns.json')
+
+
+def test_cache_is_written_and_reused(tmp_path):
+    typo_file = tmp_path / 'sql_typo_patterns.json'
+    shutil.copy(TYPO_FILE, typo_file)
+
+    searcher = SQLSearcher(typo_file=str(typo_file))
+    cache_file = default_cache_path(str(typo_file), 'patterns')
+    assert cache_file.endswith('sql_typo_patterns.patterns.cache.pickle')
+    assert os.path.exists(cache_file)
+    assert searcher.is_sql_query("SELCT * FORM users")
+
+    def fail():
+        raise AssertionError("кэш должен был использоваться")
+
+    state = load_or_build(str(typo_file), fail, searcher.detection_cache_key(), cache_file)
+    assert state['typo_matcher'].matches("SELCT * FORM users")
+
+
+def test_stale_cache_is_rebuilt(tmp_path):
+    typo_file = tmp_path / 'sql_typo_patterns.json'
+    shutil.copy(TYPO_FILE, typo_file)
+    assert SQLSearcher(typo_file=str(typo_file)).is_sql_query("SELCT * FORM users")
+
+    # Меняем файл паттернов - кэш должен пересобраться
+    typo_file.write_text(json.dumps({'context_patterns': {}, 'word_patterns': {}}), encoding='utf-8')
+    assert not SQLSearcher(typo_file=str(typo_file)).is_sql_query("SELCT * FORM users")
+
+
+def test_cached_and_fresh_state_agree(tmp_path):
+    typo_file = tmp_path / 'sql_typo_patterns.json'
+    shutil.copy(TYPO_FILE, typo_file)
+    SQLSearcher(typo_file=str(typo_file))
+
+    cached = SQLSearcher(typo_file=str(typo_file))
+    fresh = SQLSearcher(typo_file=str(typo_file), use_cache=False)
+    for text in ["SELECT 1", "DELET FROM old_data", "Hello world", "CREAT TABLE users (id INT)"]:
+        assert cached.is_sql_query(text) == fresh.is_sql_query(text)
+
+
+def test_backends_keep_separate_caches(tmp_path):
+    typo_file = tmp_path / 'sql_typo_patterns.json'
+    shutil.copy(TYPO_FILE, typo_file)
+    patterns = SQLSearcher(typo_file=str(typo_file))
+    SQLSearcher(typo_file=str(typo_file), typo_backend='symspell')
+
+    def fail():
+        raise AssertionError("кэш другого бэкенда не должен затираться")
+
+    # После запуска с symspell кэш паттернов по-прежнему действителен
+    load_or_build(str(typo_file), fail, patterns.detection_cache_key(),
+                  default_cache_path(str(typo_file), 'patterns'))
+
+
+@pytest.mark.parametrize("backend, source_name", [
+    ('patterns', 'typo_matcher.py'),
+    ('symspell', 'typo_generator.py'),
+])
+def test_key_tracks_matcher_sources(tmp_path, monkeypatch, backend, source_name):
+    source = tmp_path / source_name
+    source.write_text('TABLE = 1\n', encoding='utf-8')
+    monkeypatch.setitem(sql_searcher.TYPO_BACKEND_SOURCES, backend, (str(source),))
+    searcher = SQLSearcher(typo_backend=backend, use_cache=False)
+    key, fingerprint = searcher.detection_cache_key(), searcher.scan_fingerprint()
+
+    # Изменился код или таблицы, из которых строится матчер, - старый кэш не подходит
+    source.write_text('TABLE = 2\n', encoding='utf-8')
+    assert searcher.detection_cache_key() != key
+    assert searcher.scan_fingerprint() != fingerprint
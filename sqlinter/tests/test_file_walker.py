@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты FileWalker: отсечение служебных каталогов, правила .gitignore,
+циклы символических ссылок и повторы по inode.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import pytest
+
+from file_walker import FileWalker, is_ignored, parse_ignore_pattern
+
+
+def _touch(path, text='x = 1\n'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+
+
+def _walk(walker, root):
+    return [os.path.relpath(path, root).replace(os.sep, '/') for path in walker.walk(str(root))]
+
+
+@pytest.mark.parametrize("pattern, path, is_dir, expected", [
+    ('*.pyc', 'a/b.pyc', False, True),
+    ('/build', 'build', True, True),
+    ('/build', 'pkg/build', True, False),
+    ('docs/', 'docs', False, False),
+    ('a/**/z.py', 'a/x/y/z.py', False, True),
+    ('a/**/z.py', 'a/z.py', False, True),
+    ('gen_*.py', 'pkg/gen_models.py', False, True),
+])
+def test_ignore_patterns(pattern, path, is_dir, expected):
+    assert is_ignored([parse_ignore_pattern(pattern)], path, is_dir) == expected
+
+
+def test_prunes_default_and_gitignored_paths(tmp_path):
+    _touch(tmp_path / "app.py")
+    _touch(tmp_path / "node_modules" / "flatted.py")
+    _touch(tmp_path / ".venv" / "lib" / "site.py")
+    _touch(tmp_path / "pkg" / "models.py")
+    _touch(tmp_path / "pkg" / "generated.py", 'x = 12345\n')
+    _touch(tmp_path / "pkg" / "keep_generated.py")
+    (tmp_path / "pkg" / ".gitignore").write_text("*generated.py\n!keep_*.py\n", encoding='utf-8')
+
+    walker = FileWalker()
+    assert _walk(walker, tmp_path) == ['app.py', 'pkg/keep_generated.py', 'pkg/models.py']
+    assert walker.skipped_dirs == 2
+    assert walker.skipped_files == 1
+    assert walker.skipped_bytes == len('x = 12345\n')
+
+
+def test_custom_excludes(tmp_path):
+    _touch(tmp_path / "app.py")
+    _touch(tmp_path / "migrations" / "0001_initial.py")
+    walker = FileWalker(exclude=('migrations/',))
+    assert _walk(walker, tmp_path) == ['app.py']
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason="нужны символические ссылки")
+def test_symlink_loop_and_duplicate_inodes(tmp_path):
+    _touch(tmp_path / "pkg" / "models.py")
+    os.symlink(str(tmp_path), str(tmp_path / "pkg" / "loop"))
+    os.link(str(tmp_path / "pkg" / "models.py"), str(tmp_path / "pkg" / "models_link.py"))
+
+    walker = FileWalker(follow_symlinks=True)
+    assert _walk(walker, tmp_path) == ['pkg/models.py']
+    assert walker.skipped_dirs == 1
+    assert walker.skipped_files == 1
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason="нужны символические ссылки")
+def test_directory_symlinks_are_not_followed_by_default(tmp_path):
+    _touch(tmp_path / "outside" / "vendor.py")
+    _touch(tmp_path / "root" / "app.py")
+    os.symlink(str(tmp_path / "outside"), str(tmp_path / "root" / "linked"))
+    os.symlink(str(tmp_path / "outside" / "vendor.py"), str(tmp_path / "root" / "alias.py"))
+
+    assert _walk(FileWalker(), tmp_path / "root") == ['alias.py', 'app.py']
+    assert _walk(FileWalker(follow_symlinks=True), tmp_path / "root") == ['alias.py', 'app.py']
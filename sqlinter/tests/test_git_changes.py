@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты режима измененных файлов: файлы и строки берутся из git diff,
+в отчет попадают только запросы из измененных строк.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import pytest
+
+from git_changes import changed_line_ranges, filter_changed_queries, unquote_path
+from sql_searcher import SQLSearcher
+
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="нужен git")
+
+SEARCHER = SQLSearcher()
+
+
+def _git(repo, *args):
+    subprocess.run(['git', '-C', str(repo), '-c', 'user.name=test', '-c', 'user.email=test@example.com']
+                   + list(args), check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, 'init', '-q')
+    (tmp_path / "old.py").write_text('a = "SELECT id FROM users"\nb = 1\n', encoding='utf-8')
+    (tmp_path / "same.py").write_text('c = "SELECT 1 FROM t"\n', encoding='utf-8')
+    _git(tmp_path, 'add', '.')
+    _git(tmp_path, 'commit', '-q', '-m', 'init')
+    return tmp_path
+
+
+def test_changed_line_ranges(repo):
+    (repo / "old.py").write_text('a = "SELECT id FROM users"\nb = "DELETE FROM users WHERE id = 1"\n',
+                                 encoding='utf-8')
+    (repo / "new.py").write_text('d = "UPDATE t SET x = 1"\n', encoding='utf-8')
+
+    changes = changed_line_ranges(str(repo), since='HEAD')
+    assert changes == {str(repo / "old.py"): [(2, 3)], str(repo / "new.py"): None}
+
+    _git(repo, 'add', 'old.py')
+    assert changed_line_ranges(str(repo), staged=True) == {str(repo / "old.py"): [(2, 3)]}
+
+
+def test_changed_lines_only_reports_touched_queries(repo):
+    (repo / "old.py").write_text('a = "SELECT id FROM users"\nb = "DELETE FROM users WHERE id = 1"\n',
+                                 encoding='utf-8')
+    whole = dict(SEARCHER.iter_sql_in_git_changes(str(repo), since='HEAD'))
+    touched = dict(SEARCHER.iter_sql_in_git_changes(str(repo), since='HEAD', changed_lines_only=True))
+    assert list(whole) == list(touched) == [str(repo / "old.py")]
+    assert len(whole[str(repo / "old.py")]) == 2
+    assert [q['sql_query'] for q in touched[str(repo / "old.py")]] == ['DELETE FROM users WHERE id = 1']
+
+
+def test_filter_keeps_multiline_query_overlapping_hunk():
+    queries = [{'start_line': 3, 'end_line': 6}, {'start_line': 8, 'end_line': 8}]
+    assert filter_changed_queries(queries, [(5, 6)]) == queries[:1]
+    assert filter_changed_queries(queries, None) == queries
+
+
+def test_quoted_paths(repo):
+    names = ['tab\tname.py', 'quote"name.py', 'back\\slash.py', 'кириллица "q".py']
+    for name in names:
+        (repo / name).write_text('x = 1\n', encoding='utf-8')
+    _git(repo, 'add', '.')
+    _git(repo, 'commit', '-q', '-m', 'quoted')
+    for name in names:
+        (repo / name).write_text('x = "SELECT id FROM users"\n', encoding='utf-8')
+
+    assert changed_line_ranges(str(repo), since='HEAD') == {str(repo / name): [(1, 2)] for name in names}
+    assert unquote_path('"b/\\321\\217.py"') == 'b/я.py'
+    assert unquote_path('b/plain.py') == 'b/plain.py'
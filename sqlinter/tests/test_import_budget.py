@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бюджет времени импорта main.py: этап извлечения (--stages extract) не должен
+загружать torch, transformers, openai и модули режимов каталога.
+Проверяется по выводу python -X importtime в отдельном процессе.
+"""
+
+import os
+import subprocess
+import sys
+
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+
+# Суммарное время импорта main (мкс); с запасом для медленных CI-машин
+IMPORT_BUDGET_US = 250_000
+FORBIDDEN_MODULES = {'torch', 'transformers', 'openai', 'GPT_model', 'SQLinterModel',
+                     'sqlite3', 'multiprocessing', 'ctypes', 'subprocess'}
+
+
+def _import_times(module):
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SCRIPTS_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+    )
+    times = {}
+    for line in completed.stderr.decode('utf-8', errors='replace').splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_main_import_skips_heavy_modules():
+    times = _import_times('main')
+    loaded_roots = {name.split('.')[0] for name in times}
+    assert not loaded_roots & FORBIDDEN_MODULES
+    assert times['main'] < IMPORT_BUDGET_US
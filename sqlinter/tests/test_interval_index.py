@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты IntervalIndex: результаты должны совпадать с линейной проверкой
+пересечений, которую раньше выполнял SQLSearcher._direct_string_search.
+"""
+
+import os
+import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from interval_index import IntervalIndex
+
+
+def test_matches_linear_overlap_check():
+    rng = random.Random(7)
+    for _ in range(200):
+        index = IntervalIndex()
+        ranges = []
+        for _ in range(50):
+            start = rng.randrange(0, 500)
+            end = start + rng.randrange(0, 30)
+            expected = any(start < proc_end and end > proc_start for proc_start, proc_end in ranges)
+            assert index.overlaps(start, end) == expected
+            if not expected and (start, end) not in ranges:
+                assert index.add(start, end)
+                ranges.append((start, end))
+        assert sorted(ranges) == list(index)
+
+
+def test_exact_membership_and_touching_ends():
+    index = IntervalIndex([(10, 20), (0, 5)])
+    assert (10, 20) in index
+    assert (10, 19) not in index
+    assert not index.overlaps(20, 30)
+    assert index.overlaps(19, 30)
+    assert not index.add(12, 14)
+    assert len(index) == 2
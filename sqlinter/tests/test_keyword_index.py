@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты индекса симметричного удаления для поиска опечаток в ключевых словах.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import pytest
+
+from keyword_index import KeywordTypoIndex
+from sql_searcher import SQLSearcher
+from SQLCallVisitor import SQLCallVisitor
+
+
+INDEX = KeywordTypoIndex()
+
+
+@pytest.mark.parametrize("token, keyword", [
+    ("SELCT", "SELECT"),       # пропуск символа
+    ("FORM", "FROM"),          # перестановка
+    ("sekect", "SELECT"),      # соседняя клавиша
+    ("ЫУДУСЕ", "SELECT"),      # русская раскладка
+    ("SLECTT", "SELECT"),      # две правки
+    ("WERE", "WHERE"),
+])
+def test_finds_nearest_keyword(token, keyword):
+    assert INDEX.find_typo(token) == keyword
+
+
+@pytest.mark.parametrize("token", ["SELECT", "from", "hello", "data", "x"])
+def test_no_typo_for_exact_or_unrelated_words(token):
+    assert INDEX.find_typo(token) is None
+
+
+def test_neighbor_key_is_cheaper_than_other_substitution():
+    assert INDEX.weighted_distance("SEKECT", "SELECT") < INDEX.weighted_distance("SEMECT", "SELECT")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("SELCT * FORM users", True),
+    ("SELEKT nmae FRMO users", True),
+    ("DORP INDEX old_index", True),
+    ("Hello world", False),
+    ("Please choose your option", False),
+])
+def test_matches_text(text, expected):
+    assert INDEX.matches(text) == expected
+
+
+def test_searcher_symspell_backend():
+    searcher = SQLSearcher(typo_backend='symspell', use_cache=False)
+    assert searcher.is_sql_query("SELEKT nmae FRMO users")
+    assert not searcher.is_sql_query("Hello world")
+
+
+def test_visitor_uses_typo_index():
+    visitor = SQLCallVisitor("", typo_index=INDEX)
+    assert visitor._maybe_sql("SLECT id FORM users")
+    assert not visitor._maybe_sql("hello world")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты формирования пакетов по длине: каждый вход попадает ровно в один
+пакет, пакеты укладываются в бюджет, а группировка по длине сокращает паддинг.
+"""
+
+import os
+import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from length_batching import merge_padding_stats, padding_stats, plan_batches
+
+
+def test_batches_cover_inputs_within_budget():
+    rng = random.Random(3)
+    lengths = [rng.choice([rng.randint(15, 30), rng.randint(300, 400)]) for _ in range(200)]
+    batches = plan_batches(lengths, max_tokens=2048, max_batch_size=16)
+
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    for batch in batches:
+        assert len(batch) <= 16
+        assert len(batch) * max(lengths[i] for i in batch) <= 2048
+
+
+def test_oversized_input_gets_own_batch():
+    batches = plan_batches([10, 5000, 12], max_tokens=1000, max_batch_size=8)
+    assert [1] in batches
+    assert sorted(i for batch in batches for i in batch) == [0, 1, 2]
+
+
+def test_sorting_improves_padding_efficiency():
+    lengths = [20, 400] * 16
+    bucketed = padding_stats(lengths, plan_batches(lengths, 4096, 16))
+    naive = padding_stats(lengths, plan_batches(lengths, 4096, 16, sort_by_length=False))
+
+    assert bucketed['tokens'] == naive['tokens']
+    assert bucketed['padding_efficiency'] > 0.9
+    assert naive['padding_efficiency'] < 0.6
+
+
+def test_empty_input():
+    assert plan_batches([], 2048, 16) == []
+    assert padding_stats([], [])['padding_efficiency'] == 1.0
+
+
+def test_merged_stats_cover_all_passes():
+    greedy = padding_stats([10, 30], [[0, 1]])
+    beam = padding_stats([30], [[0]])
+    merged = merge_padding_stats([greedy, beam])
+
+    assert (merged['batches'], merged['tokens'], merged['padded_tokens']) == (2, 70, 90)
+    assert merged['padding_efficiency'] == 70 / 90
+    assert merge_padding_stats([greedy]) == greedy
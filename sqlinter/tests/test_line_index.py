@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты индекса строк: преобразования позиций должны совпадать
+с прямым подсчетом через content.split('\\n').
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from line_index import LineIndex
+
+
+CONTENT = 'first line\n\nquery = "SELECT 1"\n  last'
+
+
+def _naive_offset(content, line, column):
+    lines = content.split('\n')
+    if line <= 0 or line > len(lines):
+        return 0
+    return sum(len(lines[i]) + 1 for i in range(line - 1)) + column
+
+
+def test_round_trip_for_every_position():
+    index = LineIndex(CONTENT)
+    for pos in range(len(CONTENT) + 1):
+        line, column = index.offset_to_line_col(pos)
+        assert index.line_col_to_offset(line, column) == pos
+        assert _naive_offset(CONTENT, line, column) == pos
+
+
+def test_newline_belongs_to_the_line_it_ends():
+    index = LineIndex(CONTENT)
+    assert index.offset_to_line_col(CONTENT.index('\n')) == (1, len('first line'))
+
+
+def test_line_text():
+    index = LineIndex(CONTENT)
+    lines = CONTENT.split('\n')
+    assert index.line_count == len(lines)
+    for line in range(1, len(lines) + 1):
+        assert index.line_text(line) == lines[line - 1]
+
+
+def test_out_of_range_line_gives_zero():
+    index = LineIndex(CONTENT)
+    assert index.line_col_to_offset(0, 5) == 0
+    assert index.line_col_to_offset(index.line_count + 1, 0) == 0
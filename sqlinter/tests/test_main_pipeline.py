@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Конвейер SQLQueryProcessor: этапы GPT и SQLinter выполняются одновременно,
+результаты обоих этапов объединяются в queries_data.
+Модель и клиент GPT передаются готовыми объектами с той же сигнатурой методов.
+Сервер анализа отвечает на запросы JSON-RPC с тем же id и не отвечает
+на уведомления (запросы без id); модель передается функцией загрузки.
+Фоновая загрузка модели начинается при создании SQLQueryProcessor.
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import pytest
+
+import main
+from main import METHOD_NOT_FOUND, AnalysisServer, SQLQueryProcessor
+
+
+STAGE_SECONDS = 0.3
+
+
+class SlowGPT:
+    def analyze(self, sqlquerries, queries_data):
+        time.sleep(STAGE_SECONDS)
+        for item in queries_data:
+            item.update({"verdict": "Warning", "reason": "SELECT *"})
+        return queries_data
+
+
+class SlowModel:
+    def predict_batch(self, texts, adaptive=False):
+        time.sleep(STAGE_SECONDS)
+        return [text.upper() for text in texts]
+
+
+class FastModel:
+    def predict_batch(self, texts, adaptive=False):
+        return [text + ";" for text in texts]
+
+
+def _write_source(tmp_path):
+    source = tmp_path / "queries.py"
+    source.write_text(
+        'a = "SELECT * FROM users WHERE id = 1"\n'
+        'b = "DELETE FROM orders WHERE id = 2"\n',
+        encoding='utf-8',
+    )
+    return str(source)
+
+
+def test_stages_run_concurrently_and_merge(tmp_path):
+    processor = SQLQueryProcessor(_write_source(tmp_path), "key", sqlinter_model=SlowModel(), gpt=SlowGPT())
+    data = processor.analyze()
+
+    assert len(data) == 2
+    for item in data:
+        assert item["verdict"] == "Warning"
+        assert item["correction"] == item["query"].upper()
+
+    timings = processor.stage_timings
+    assert set(timings) == {"extract", "gpt", "sqlinter", "total"}
+    # Время анализа близко к самому долгому этапу, а не к их сумме
+    assert timings["total"] < timings["gpt"] + timings["sqlinter"] - STAGE_SECONDS / 2
+
+
+def test_single_stage_is_timed(tmp_path):
+    processor = SQLQueryProcessor(_write_source(tmp_path), "key", sqlinter_model=SlowModel(),
+                                  stages=("extract", "sqlinter"))
+    data = processor.analyze()
+
+    assert [item["verdict"] for item in data] == ["", ""]
+    assert all(item["correction"] for item in data)
+    assert set(processor.stage_timings) == {"extract", "sqlinter", "total"}
+
+
+def test_server_does_not_answer_notifications():
+    server = AnalysisServer(api_key="key", load_model=FastModel)
+    assert server.handle_line('{"jsonrpc": "2.0", "method": "missing"}') is None
+    assert server.handle_line('{"jsonrpc": "2.0", "method": "analyze", "params": {}}') is None
+    assert server.handle_line('{"jsonrpc": "2.0", "method": "ping", "params": []}') is None
+
+    response = json.loads(server.handle_line('{"jsonrpc": "2.0", "id": 7, "method": "missing"}'))
+    assert response["id"] == 7 and response["error"]["code"] == METHOD_NOT_FOUND
+    assert json.loads(server.handle_line('{"jsonrpc": "2.0", "id": 8, "method": "ping"}'))["result"] == "pong"
+
+
+def test_server_analyze_round_trip(tmp_path):
+    server = AnalysisServer(api_key="key", load_model=FastModel)
+    requests = [
+        {"jsonrpc": "2.0", "id": "a-1", "method": "analyze",
+         "params": {"file": _write_source(tmp_path), "stages": ["extract", "sqlinter"]}},
+        {"jsonrpc": "2.0", "id": 2, "method": "shutdown"},
+        {"jsonrpc": "2.0", "id": 3, "method": "ping"},
+    ]
+    stdout = io.StringIO()
+    server.serve_stdio(io.StringIO("".join(json.dumps(request) + "\n" for request in requests)), stdout)
+
+    # После shutdown запросы не читаются
+    analyzed, stopped = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert analyzed["id"] == "a-1"
+    assert [item["query"] for item in analyzed["result"]] == [
+        "SELECT * FROM users WHERE id = 1", "DELETE FROM orders WHERE id = 2"]
+    assert all(item["correction"] == item["query"] + ";" for item in analyzed["result"])
+    assert stopped == {"jsonrpc": "2.0", "id": 2, "result": None}
+
+
+def test_model_preload_starts_at_construction(tmp_path, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def load():
+        started.set()
+        release.wait(5)
+        return FastModel()
+
+    monkeypatch.setattr(main, "load_sqlinter_model", load)
+    processor = SQLQueryProcessor(_write_source(tmp_path), "key", stages=("extract", "sqlinter"))
+    # Загрузка идет с момента создания, еще до извлечения запросов
+    assert started.wait(5)
+    processor.extract_queries()
+
+    worker = threading.Thread(target=processor.process_with_sqlinter)
+    worker.start()
+    worker.join(STAGE_SECONDS)
+    assert worker.is_alive()
+    # Исправления появляются сразу после окончания загрузки
+    release.set()
+    worker.join(5)
+    assert not worker.is_alive()
+    assert [item["correction"] for item in processor.queries_data] == [
+        item["query"] + ";" for item in processor.queries_data]
+
+
+def test_model_load_error_reaches_caller(tmp_path, monkeypatch):
+    def load():
+        raise RuntimeError("нет весов модели")
+
+    monkeypatch.setattr(main, "load_sqlinter_model", load)
+    processor = SQLQueryProcessor(_write_source(tmp_path), "key", stages=("extract", "sqlinter"))
+    processor.extract_queries()
+    with pytest.raises(RuntimeError, match="нет весов модели"):
+        processor.process_with_sqlinter()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты черновиков prompt lookup. Декодер заменен известной жадной
+последовательностью: проверяется, что схема "черновик + проверка" выдает
+ровно ее и экономит шаги, когда исправление близко ко входу.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from prompt_lookup import accepted_prefix, find_draft
+
+
+def _decode(source, target, max_ngram=3, num_tokens=10):
+    """Цикл SQLinterModel._prompt_lookup_decode; argmax модели - следующий токен target."""
+    generated, steps = [], 0
+    while len(generated) < len(target):
+        draft = find_draft(source, generated, max_ngram, min(num_tokens, len(target) - len(generated) - 1))
+        predicted = target[len(generated):len(generated) + len(draft) + 1]
+        predicted += [None] * (len(draft) + 1 - len(predicted))
+        accepted = accepted_prefix(draft, predicted)
+        generated.extend(draft[:accepted] + [predicted[accepted]])
+        steps += 1
+    return generated, steps
+
+
+def test_draft_continues_matching_ngram():
+    source = [5, 6, 7, 8, 9, 2]
+    assert find_draft(source, [], num_tokens=3) == [5, 6, 7]
+    assert find_draft(source, [1, 6, 7], num_tokens=2) == [8, 9]
+    # Последняя n-грамма во входе не встречается - черновика нет
+    assert find_draft(source, [42], num_tokens=2) == []
+
+
+def test_accepted_prefix():
+    assert accepted_prefix([1, 2, 3], [1, 2, 4, 9]) == 2
+    assert accepted_prefix([], [7]) == 0
+    assert accepted_prefix([1, 2], [1, 2, 3]) == 2
+
+
+def test_decoding_reproduces_greedy_output():
+    source = [11, 12, 13, 14, 15, 16, 17, 18, 2]
+    # Одна опечатка исправлена (13 -> 30), остальное скопировано
+    target = [11, 12, 30, 14, 15, 16, 17, 18, 2]
+    generated, steps = _decode(source, target)
+    assert generated == target
+    assert steps < len(target)
+
+    # Вывод, не связанный со входом, тоже воспроизводится (по токену за шаг)
+    unrelated = [40, 41, 42, 43]
+    assert _decode(source, unrelated) == (unrelated, len(unrelated))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты инкрементального кэша сканирования: повторный поиск берет
+неизменившиеся файлы из кэша и заново разбирает только измененные.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from scan_cache import ScanCache, read_stamped
+from sql_searcher import SQLSearcher
+
+
+SEARCHER = SQLSearcher()
+
+
+def _make_tree(root):
+    (root / "a.py").write_text('q = "SELECT id FROM users"\n', encoding='utf-8')
+    (root / "b.py").write_text('x = "plain text"\n', encoding='utf-8')
+
+
+def test_rescan_uses_cache_and_picks_up_changes(tmp_path):
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    _make_tree(tree)
+    cache_file = str(tmp_path / "scan.sqlite")
+    fresh = SEARCHER.search_in_directory(str(tree))
+
+    with ScanCache(SEARCHER.scan_fingerprint(), cache_file) as cache:
+        assert SEARCHER.search_in_directory(str(tree), cache=cache) == fresh
+        assert (cache.hits, cache.misses) == (0, 2)
+
+    (tree / "b.py").write_text('x = "DELETE FROM users WHERE id = 1"\n', encoding='utf-8')
+    with ScanCache(SEARCHER.scan_fingerprint(), cache_file) as cache:
+        results = SEARCHER.search_in_directory(str(tree), cache=cache)
+        assert (cache.hits, cache.misses) == (1, 1)
+    assert results == SEARCHER.search_in_directory(str(tree))
+    assert len(results) == 2
+
+
+def test_fingerprint_change_resets_cache(tmp_path):
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    _make_tree(tree)
+    cache_file = str(tmp_path / "scan.sqlite")
+
+    with ScanCache('v1', cache_file) as cache:
+        SEARCHER.search_in_directory(str(tree), cache=cache)
+    with ScanCache('v2', cache_file) as cache:
+        SEARCHER.search_in_directory(str(tree), cache=cache)
+        assert cache.hits == 0
+
+
+def test_removed_files_are_pruned(tmp_path):
+    tree = tmp_path / "tree"
+    (tree / "pkg").mkdir(parents=True)
+    _make_tree(tree)
+    (tree / "pkg" / "c.py").write_text('q = "SELECT 1 FROM t"\n', encoding='utf-8')
+    other = tmp_path / "other.py"
+    other.write_text('q = "SELECT 2 FROM t"\n', encoding='utf-8')
+    cache_file = str(tmp_path / "scan.sqlite")
+
+    with ScanCache(SEARCHER.scan_fingerprint(), cache_file) as cache:
+        SEARCHER.search_in_directory(str(tree), cache=cache)
+        SEARCHER.search_in_directory(str(tmp_path), recursive=False, cache=cache)
+    (tree / "a.py").rename(tree / "renamed.py")
+
+    with ScanCache(SEARCHER.scan_fingerprint(), cache_file) as cache:
+        # Нерекурсивный обход не трогает записи подкаталогов
+        SEARCHER.search_in_directory(str(tree), recursive=False, cache=cache)
+        assert cache.get(str(tree / "pkg" / "c.py")) is not None
+        SEARCHER.search_in_directory(str(tree), cache=cache)
+        paths = {row[0] for row in cache._connection.execute("SELECT path FROM files")}
+    assert paths == {str(tree / name) for name in ("renamed.py", "b.py", "pkg/c.py")} | {str(other)}
+
+
+def test_edit_during_scan_is_not_cached_as_fresh(tmp_path):
+    source = tmp_path / "a.py"
+    source.write_text('q = "SELECT id FROM users"\n', encoding='utf-8')
+    cache_file = str(tmp_path / "scan.sqlite")
+
+    with ScanCache('v1', cache_file) as cache:
+        queries, stamp = SEARCHER.find_sql_in_file_stamped(str(source))
+        # Файл изменили после чтения, но до сохранения результатов
+        source.write_text('q = "DELETE FROM users WHERE id = 1"\n', encoding='utf-8')
+        os.utime(source, ns=(stamp.mtime_ns + 10 ** 9, stamp.mtime_ns + 10 ** 9))
+        cache.put(str(source), queries, stamp)
+        assert cache.get(str(source)) is None
+
+
+def test_stamp_matches_scanned_bytes(tmp_path):
+    source = tmp_path / "a.py"
+    source.write_bytes(b'q = "SELECT id FROM users"\r\n')
+    data, stamp = read_stamped(str(source))
+    assert stamp.size == len(data)
+    queries, _ = SEARCHER.find_sql_in_file_stamped(str(source))
+    assert queries == SEARCHER.find_sql_in_file(str(source))
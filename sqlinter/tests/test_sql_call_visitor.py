@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты SQLCallVisitor: быстрая фаззи-проверка должна давать те же ответы,
+что и прямое сравнение difflib.SequenceMatcher(...).ratio() > 0.8.
+"""
+
+import difflib
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import pytest
+
+from SQLCallVisitor import SQLCallVisitor, is_fuzzy_keyword
+
+
+CORPUS = [
+    "SELCT * FORM users",
+    "SLECT id",
+    "ELECT",
+    "INSRT INTO t",
+    "UPDTAE users",
+    "DELTE FROM t",
+    "CRATE TABLE t",
+    "DORP TABLE t",
+    "ALTR TABLE t",
+    "djfshskdfhkjsdf",
+    "hello world",
+    "selected items",
+    "deleted_at",
+    "creator",
+    "altar drop-in",
+    "",
+]
+
+
+def _difflib_maybe_sql(text):
+    """Исходная реализация проверки через difflib."""
+    upper_text = text.upper()
+    for keyword in SQLCallVisitor.SQL_KEYWORDS:
+        if keyword in upper_text:
+            return True
+    for keyword in SQLCallVisitor.SQL_KEYWORDS:
+        for word in upper_text.split():
+            if difflib.SequenceMatcher(None, word, keyword).ratio() > 0.8:
+                return True
+    return False
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_maybe_sql_matches_difflib(text):
+    assert SQLCallVisitor("")._maybe_sql(text) == _difflib_maybe_sql(text)
+
+
+def test_fuzzy_keyword_is_memoized():
+    is_fuzzy_keyword.cache_clear()
+    is_fuzzy_keyword("SELCT", SQLCallVisitor.SQL_KEYWORDS)
+    is_fuzzy_keyword("SELCT", SQLCallVisitor.SQL_KEYWORDS)
+    assert is_fuzzy_keyword.cache_info().hits == 1
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты SQLSearcher.find_sql_in_file: позиции должны указывать ровно на
+содержимое литерала (без префикса и кавычек).
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import pytest
+
+from sql_searcher import SQLSearcher
+
+
+SEARCHER = SQLSearcher()
+
+
+def _find(tmp_path, code):
+    test_file = tmp_path / "example.py"
+    test_file.write_text(code, encoding='utf-8')
+    return code, SEARCHER.find_sql_in_file(str(test_file))
+
+
+def _spans(code, results):
+    return [code[q['start_pos']:q['end_pos'] + 1] for q in results]
+
+
+@pytest.mark.parametrize("literal, body", [
+    ('"SELECT * FROM users"', 'SELECT * FROM users'),
+    ("'''SELECT id\n  FROM users'''", 'SELECT id\n  FROM users'),
+    ('r"SELECT * FROM t WHERE x ~ \'\\d+\'"', "SELECT * FROM t WHERE x ~ '\\d+'"),
+    ('f"SELECT * FROM {table} WHERE id = 1"', 'SELECT * FROM {table} WHERE id = 1'),
+    ('rf"""DELETE FROM {table}"""', 'DELETE FROM {table}'),
+])
+def test_span_covers_literal_body(tmp_path, literal, body):
+    code, results = _find(tmp_path, f"query = {literal}\n")
+    assert _spans(code, results) == [body]
+
+
+def test_repeated_value_nearby_gets_own_span(tmp_path):
+    code = 'a = "SELECT 1 FROM t"\nb = "SELECT 1 FROM t"\n'
+    code, results = _find(tmp_path, code)
+    starts = sorted(q['start_pos'] for q in results)
+    assert starts == [code.index('SELECT'), code.rindex('SELECT')]
+
+
+def test_non_ascii_before_literal(tmp_path):
+    code = 'print("Привет", "SELECT name FROM users")\n'
+    code, results = _find(tmp_path, code)
+    assert _spans(code, results) == ['SELECT name FROM users']
+
+
+def test_implicit_concatenation_is_one_query(tmp_path):
+    code = 'q = ("SELECT id "\n     "FROM users")\n'
+    code, results = _find(tmp_path, code)
+    assert [q['sql_query'] for q in results] == ['SELECT id FROM users']
+    assert _spans(code, results) == ['SELECT id "\n     "FROM users']
+
+
+def test_fstring_does_not_claim_neighbouring_fstrings(tmp_path):
+    code = 'name = f"user {x}"\nq = f"SELECT * FROM {t}"\nmsg = f"done {y}"\n'
+    code, results = _find(tmp_path, code)
+    assert _spans(code, results) == ['SELECT * FROM {t}']
+
+
+def test_each_literal_reported_once(tmp_path):
+    code = 'a = "SELECT id FROM users"\nb = "SELECT id FROM users"\nc = "not sql"\n'
+    code, results = _find(tmp_path, code)
+    spans = [(q['start_pos'], q['end_pos']) for q in results]
+    assert len(spans) == len(set(spans)) == 2
+
+
+def test_recovers_after_unterminated_string(tmp_path):
+    code = 'a = "SELECT id FROM users"\nb = """\nc = "DELETE FROM t WHERE x = 1"\n'
+    code, results = _find(tmp_path, code)
+    assert [q['sql_query'] for q in results] == ['SELECT id FROM users', 'DELETE FROM t WHERE x = 1']
+    assert _spans(code, results) == ['SELECT id FROM users', 'DELETE FROM t WHERE x = 1']
+
+
+def test_inconsistent_dedent_falls_back_to_text_search(tmp_path):
+    # tokenize сообщает о неверном отступе IndentationError, а не TokenError
+    code, results = _find(tmp_path, 'def f():\n        a = "SELECT 1 FROM t"\n    b = "UPDATE t SET x = 1"\n')
+    assert [q['sql_query'] for q in results] == ['SELECT 1 FROM t', 'UPDATE t SET x = 1']
+    assert _spans(code, results) == ['SELECT 1 FROM t', 'UPDATE t SET x = 1']
+
+
+def test_parallel_directory_search_matches_serial(tmp_path):
+    for i in range(5):
+        (tmp_path / f"mod{i}.py").write_text(f'q = "SELECT id FROM t{i}"\nx = "text"\n', encoding='utf-8')
+    (tmp_path / "empty.py").write_text('x = 1\n', encoding='utf-8')
+    serial = SEARCHER.search_in_directory(str(tmp_path))
+    parallel = SEARCHER.search_in_directory(str(tmp_path), workers=2)
+    assert list(parallel.items()) == list(serial.items())
+    assert len(serial) == 5
+
+
+def test_iter_sql_in_directory_streams_in_walk_order(tmp_path):
+    for i in range(3):
+        (tmp_path / f"mod{i}.py").write_text(f'q = "SELECT id FROM t{i}"\n', encoding='utf-8')
+    stream = SEARCHER.iter_sql_in_directory(str(tmp_path))
+    first_path, first_queries = next(stream)
+    assert first_queries[0]['sql_query'].startswith('SELECT id FROM t')
+    assert [first_path] + [path for path, _ in stream] == list(SEARCHER.search_in_directory(str(tmp_path)))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты режима наблюдения: события added / removed / changed и пересмотр
+только изменившихся файлов.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import pytest
+
+from sql_searcher import SQLSearcher
+from sql_watcher import InotifyBackend, SQLWatcher, query_delta
+
+
+SEARCHER = SQLSearcher()
+
+
+def _write(path, text, mtime_ns=None):
+    path.write_text(text, encoding='utf-8')
+    if mtime_ns is not None:
+        os.utime(str(path), ns=(mtime_ns, mtime_ns))
+
+
+def _summary(events):
+    return [(event['event'], os.path.basename(event['file']), event['query']['sql_query']) for event in events]
+
+
+def test_query_delta():
+    old = [{'sql_query': 'SELECT 1 FROM a'}, {'sql_query': 'SELECT 2 FROM b'}]
+    new = [{'sql_query': 'SELECT 1 FROM a'}, {'sql_query': 'SELECT 3 FROM b'}, {'sql_query': 'DELETE FROM c'}]
+    events = query_delta('f.py', old, new)
+    assert _summary(events) == [('changed', 'f.py', 'SELECT 3 FROM b'), ('added', 'f.py', 'DELETE FROM c')]
+    assert events[0]['previous'] == old[1]
+    assert _summary(query_delta('f.py', new, [])) == [('removed', 'f.py', q['sql_query']) for q in new]
+
+
+def test_polling_rescans_only_changed_files(tmp_path):
+    _write(tmp_path / "a.py", 'q = "SELECT id FROM users"\n', 10 ** 18)
+    _write(tmp_path / "b.py", 'q = "SELECT id FROM orders"\n', 10 ** 18)
+    watcher = SQLWatcher(SEARCHER, str(tmp_path), use_inotify=False)
+    assert len(watcher.rescan()) == 2
+    assert watcher.rescan() == []
+
+    _write(tmp_path / "a.py", 'q = "SELECT id, name FROM users"\n', 2 * 10 ** 18)
+    (tmp_path / "b.py").unlink()
+    _write(tmp_path / "c.py", 'q = "DELETE FROM users WHERE id = 1"\n')
+    assert _summary(watcher.rescan()) == [
+        ('changed', 'a.py', 'SELECT id, name FROM users'),
+        ('added', 'c.py', 'DELETE FROM users WHERE id = 1'),
+        ('removed', 'b.py', 'SELECT id FROM orders'),
+    ]
+    assert sorted(os.path.basename(path) for path in watcher.results) == ['a.py', 'c.py']
+
+
+@pytest.mark.skipif(not InotifyBackend.available(), reason="нужен inotify")
+def test_inotify_reports_modification(tmp_path):
+    _write(tmp_path / "a.py", 'q = "SELECT id FROM users"\n')
+    watcher = SQLWatcher(SEARCHER, str(tmp_path))
+    try:
+        watcher.rescan()
+        _write(tmp_path / "a.py", 'q = "DELETE FROM users WHERE id = 1"\n')
+        events = []
+        for _ in range(5):
+            events.extend(watcher.poll(timeout=1.0))
+            if events:
+                break
+        assert _summary(events) == [('changed', 'a.py', 'DELETE FROM users WHERE id = 1')]
+    finally:
+        watcher.close()
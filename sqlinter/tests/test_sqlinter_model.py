@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты SQLinterModel.predict_batch без весов модели: токенизатор и модель
+заменены заглушками (символ - токен, generate возвращает вход), поэтому
+проверяется только группировка по длине и порядок результатов.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from SQLinterModel import SQLinterModel
+
+
+class _Batch(dict):
+    def to(self, device):
+        return self
+
+
+class StubTokenizer:
+    pad_token_id = 0
+
+    def __call__(self, texts):
+        return {"input_ids": [[ord(char) for char in text] for text in texts]}
+
+    def pad(self, encoded, padding=True, return_tensors="pt"):
+        rows = encoded["input_ids"]
+        width = max(len(row) for row in rows)
+        input_ids = torch.tensor([row + [self.pad_token_id] * (width - len(row)) for row in rows])
+        return _Batch(input_ids=input_ids, attention_mask=(input_ids != self.pad_token_id).long())
+
+    def batch_decode(self, outputs, skip_special_tokens=True):
+        return ["".join(chr(token) for token in row if token).upper() for row in outputs.tolist()]
+
+
+class StubModel:
+    def __init__(self):
+        # Длины запросов каждого вызова generate
+        self.calls = []
+
+    def generate(self, input_ids, attention_mask=None, **kwargs):
+        self.calls.append(attention_mask.sum(dim=1).tolist())
+        return input_ids
+
+
+def _model():
+    model = SQLinterModel.__new__(SQLinterModel)
+    model.tokenizer = StubTokenizer()
+    model.model = StubModel()
+    model.device = torch.device("cpu")
+    model.precision = "fp32"
+    model.backend = "torch"
+    model.cache = None
+    model.batch_stats = {}
+    return model
+
+
+def test_results_keep_input_order_after_length_sorting():
+    texts = [
+        "select name from users where id = 1",
+        "select 1",
+        "delete from t",
+        "select 1",
+        "update orders set status = 'done' where id = 2",
+        "drop table x",
+    ]
+    model = _model()
+    assert model.predict_batch(texts, batch_size=2) == [text.upper() for text in texts]
+
+    # Одинаковые запросы генерируются один раз, пакеты идут по возрастанию длины
+    lengths = [length for call in model.model.calls for length in call]
+    assert lengths == sorted(len(text) for text in set(texts))
+    assert all(len(call) <= 2 for call in model.model.calls)
+    assert model.batch_stats['batches'] == len(model.model.calls)
+
+
+def test_empty_input():
+    model = _model()
+    assert model.predict_batch([]) == []
+    assert model.model.calls == []
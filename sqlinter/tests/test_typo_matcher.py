@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты предкомпилированного матчера опечаток: результат должен совпадать
+с прямым прогоном регулярных выражений из sql_typo_patterns.json.
+"""
+
+import os
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import pytest
+
+from sql_searcher import SQLSearcher
+from typo_matcher import TypoPatternMatcher
+
+
+SEARCHER = SQLSearcher()
+
+SAMPLES = [
+    "SELCT * FORM users",
+    "INSERTT INTO users VALUES (1)",
+    "UPDAT users SET name = 'test'",
+    "DELET FROM old_data",
+    "SELCT name FORM users WERE id > 10",
+    "CREAT TABLE users (id INT)",
+    "DORP INDEX old_index",
+    "ЫУДУСЕ * FROM users",
+    "ſelct * form users",
+    "Hello world",
+    "This is not SQL",
+    "Please choose your option",
+    "form_data = request.form",
+    "FORM SELCT",
+    "",
+]
+
+
+def _regex_check(typo_patterns, text):
+    """Исходная реализация проверки через регулярные выражения."""
+    flags = re.IGNORECASE | re.MULTILINE | re.DOTALL
+    for pattern_data in typo_patterns.get('context_patterns', {}).values():
+        if re.search(pattern_data['pattern'], text, flags):
+            return True
+    word_matches = 0
+    for pattern_data in typo_patterns.get('word_patterns', {}).values():
+        if re.search(pattern_data['pattern'], text, flags):
+            word_matches += 1
+            if word_matches >= 2:
+                return True
+    return False
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_matches_regex_patterns(text):
+    expected = _regex_check(SEARCHER.typo_patterns, text)
+    assert SEARCHER.typo_matcher.matches(text) == expected
+
+
+def test_context_rule_requires_order():
+    matcher = TypoPatternMatcher({
+        'context_patterns': {
+            'SELECT_typos_with_FROM': {'pattern': r'\b(SELCT|SLECT)\b.*\bFROM\b'},
+        },
+        'word_patterns': {},
+    })
+    assert matcher.matches("slect * from users")
+    assert not matcher.matches("from users slect")
+
+
+def test_unparsed_patterns_fall_back_to_regex():
+    matcher = TypoPatternMatcher({
+        'context_patterns': {'custom': {'pattern': r'SEL\s+FRM'}},
+        'word_patterns': {},
+    })
+    assert not matcher.context_rules
+    assert matcher.matches("sel   frm")